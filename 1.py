@@ -6,12 +6,17 @@
 # - 可编辑脚本（修改坐标、键值、延迟）
 # - 可保存、加载多个脚本（JSON）
 # - 支持循环回放
+# - 可记录完整鼠标轨迹（按容差简化后保存，回放时插值）
 # - 全中文界面 + 提示
 
+import gc
+import itertools
 import json
+import sys
 import threading
 import time
 import tkinter as tk
+from array import array
 from tkinter import ttk, filedialog, simpledialog, messagebox
 
 try:
@@ -19,30 +24,522 @@ try:
     from pynput.mouse import Button, Controller as MouseController
     from pynput.keyboard import Key, Controller as KeyboardController
 except Exception as e:
-    raise SystemExit("缺少必要依赖 pynput，请先运行： pip install pynput\n" + str(e))
+    if "--benchmark" not in sys.argv:
+        raise SystemExit("缺少必要依赖 pynput，请先运行： pip install pynput\n" + str(e))
+    # 基准测试只使用空操作控制器：没有 pynput 或没有显示器时用同名枚举代替鼠标键和特殊键
+    import enum
+    mouse = keyboard = MouseController = KeyboardController = None
+    Button = enum.Enum("Button", "left right middle")
+    Key = enum.Enum("Key", "alt ctrl shift enter esc space tab backspace")
 
 
 # 每个动作的数据结构说明：
 # {
-#     "type": "move" | "click" | "scroll" | "key_down" | "key_up" | "wait",
+#     "type": "move" | "path" | "click" | "scroll" | "key_down" | "key_up" | "wait",
 #     "x": int, "y": int,                       # 鼠标坐标
 #     "button": "left"/"right"/"middle",        # 鼠标按键
 #     "count": 1,                               # 点击次数
 #     "dx": int, "dy": int,                     # 滚轮滚动
 #     "key": "a" 或 "Key.enter",                # 键盘按键
+#     "points": [[t, x, y], ...],               # 鼠标轨迹（type 为 path，t 为相对首点的秒数）
 #     "delay": float                            # 当前动作之后的延迟
 # }
 
 
+# =======================
+#   监听线程 → 界面线程的事件缓冲
+# =======================
+# 事件类型（监听回调只记录类型和原始参数，转换为动作在界面线程完成）
+EV_MOVE, EV_CLICK, EV_SCROLL, EV_KEY_DOWN, EV_KEY_UP = range(5)
+
+
+class EventRing:
+    """
+    预先分配槽位的环形缓冲区，不加锁：
+    写入方（鼠标、键盘监听线程）从 itertools.count 取一个序号（GIL 下原子），把事件写进对应槽位；
+    读取方（界面线程）按序号成批取出，遇到尚未写完的槽位就留到下一次；写入方追上读取方时最旧的事件被覆盖并计数
+    """
+
+    def __init__(self, capacity=1 << 16):
+        # 容量取 2 的幂，序号用位与换算成槽位
+        self.capacity = 1 << max(1, (capacity - 1).bit_length())
+        self.mask = self.capacity - 1
+        self.slots = [None] * self.capacity
+        self._seq = itertools.count()
+        self.read_seq = 0
+        self.dropped = 0
+
+    def push(self, kind, a=0, b=0, extra=None):
+        # 事件：(序号, perf_counter 时间戳, 类型, 参数a, 参数b, 附加对象)
+        seq = next(self._seq)
+        self.slots[seq & self.mask] = (seq, time.perf_counter(), kind, a, b, extra)
+
+    def drain(self):
+        events = []
+        seq = self.read_seq
+        slots = self.slots
+        mask = self.mask
+        while True:
+            event = slots[seq & mask]
+            if event is None or event[0] < seq:
+                break  # 尚未写入
+            if event[0] > seq:
+                # 已被覆盖：写入方超过了一整圈，从仍保留在缓冲区中的最旧序号继续读
+                oldest = event[0] - self.capacity + 1
+                self.dropped += oldest - seq
+                seq = oldest
+                continue
+            events.append(event)
+            seq += 1
+        self.read_seq = seq
+        return events
+
+
+# =======================
+#      播放定时调度
+# =======================
+class PlaybackScheduler:
+    """
+    按绝对截止时间播放：每个动作的计划时刻 = 开始时刻 + 累计延迟 / 速度倍数，
+    误差不会随动作数与循环次数累积；先 sleep 到截止前 spin 秒，再忙等补足最后一小段。
+    spin 按 sleep 实测的超时自动调整（Linux 约 0.1 毫秒，Windows 约 1~2 毫秒），忙等只占很小一段
+    """
+
+    SPIN_MIN = 0.0002
+    SPIN_MAX = 0.004
+
+    def __init__(self, speed=1.0, spin=0.001):
+        self.speed = speed
+        self.spin = spin
+        self.oversleep = spin / 2   # sleep 超时的滑动平均
+        self.start()
+
+    def start(self):
+        self.origin = time.perf_counter()
+        self.offset = 0.0          # 已排定的计划时间（秒，已按倍速换算）
+        self.waits = 0
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+
+    def wait(self, delay):
+        if delay <= 0:
+            return
+        self.offset += delay / self.speed
+        deadline = self.origin + self.offset
+
+        remaining = deadline - time.perf_counter()
+        if remaining > self.spin:
+            target = deadline - self.spin
+            time.sleep(remaining - self.spin)
+            over = time.perf_counter() - target
+            self.oversleep += (over - self.oversleep) * 0.2
+            self.spin = min(self.SPIN_MAX, max(self.SPIN_MIN, self.oversleep * 2))
+        while time.perf_counter() < deadline:
+            pass
+
+        # 实际到达时刻与截止时间之差（前一个动作执行太久时为正）
+        late = time.perf_counter() - deadline
+        self.waits += 1
+        self.jitter_total += late
+        if late > self.jitter_max:
+            self.jitter_max = late
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.origin
+        drift = elapsed - self.offset
+        mean = self.jitter_total / self.waits if self.waits else 0.0
+        return (f"用时 {elapsed:.3f} 秒（计划 {self.offset:.3f} 秒，{self.speed:g} 倍速，漂移 {drift * 1000:+.1f} 毫秒），"
+                f"定时误差 平均 {mean * 1000:.2f} / 最大 {self.jitter_max * 1000:.2f} 毫秒")
+
+
+# =======================
+#      鼠标轨迹简化
+# =======================
+def simplify_path(ts, xs, ys, tolerance):
+    """
+    Ramer-Douglas-Peucker 简化，距离按同一时刻计算（实际位置与首尾两点按时间线性插值位置之差），
+    回放插值时每个采样点的误差都不超过 tolerance 像素；返回保留点的下标
+    """
+    n = len(ts)
+    if n <= 2:
+        return list(range(n))
+
+    keep = bytearray(n)
+    keep[0] = keep[n - 1] = 1
+    tol2 = tolerance * tolerance
+    stack = [(0, n - 1)]
+
+    while stack:
+        a, b = stack.pop()
+        ta, xa, ya = ts[a], xs[a], ys[a]
+        span = ts[b] - ta
+        vx = xs[b] - xa
+        vy = ys[b] - ya
+
+        worst = tol2
+        index = -1
+        for i in range(a + 1, b):
+            f = (ts[i] - ta) / span if span > 0 else 0.0
+            dx = xa + vx * f - xs[i]
+            dy = ya + vy * f - ys[i]
+            d = dx * dx + dy * dy
+            if d > worst:
+                worst = d
+                index = i
+
+        if index >= 0:
+            keep[index] = 1
+            stack.append((a, index))
+            stack.append((index, b))
+
+    return [i for i in range(n) if keep[i]]
+
+
+# =======================
+#   播放前编译动作列表
+# =======================
+BUTTONS = {"left": Button.left, "right": Button.right, "middle": Button.middle}
+PATH_STEP = 0.01   # 轨迹回放的插值间隔（秒）
+
+
+def resolve_key(k):
+    # "Key.enter" → Key.enter；普通字符原样返回；无法识别的特殊键返回 None
+    if k.startswith("Key."):
+        return getattr(Key, k.split(".", 1)[1], None)
+    return k
+
+
+class PlanStep:
+    """编译后的一步：依次调用的 (函数, 参数) 与之后的延迟"""
+    __slots__ = ("ops", "delay")
+
+    def __init__(self, ops, delay):
+        self.ops = ops
+        self.delay = delay
+
+
+def compile_actions(actions, mouse_controller, keyboard_controller):
+    """
+    播放前把动作列表编译一次：动作类型、按键名、鼠标键名都在这里解析成绑定方法和参数，
+    播放循环只需逐步调用，不再做字符串判断与字典查找
+    """
+    mc = mouse_controller
+    kc = keyboard_controller
+    plan = []
+
+    # 编译期间会创建大量小对象，暂停循环垃圾回收避免反复扫描
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for act in actions:
+            if act["type"] == "path":
+                plan.extend(_compile_path(act, mc))
+            else:
+                plan.append(_compile_action(act, mc, kc))
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return plan
+
+
+def _compile_action(act, mc, kc):
+    # 单个动作 → PlanStep；无法执行的动作（未知类型、未知特殊键）编译为空操作，只保留延迟
+    atype = act["type"]
+    ops = ()
+    try:
+        if atype == "move":
+            ops = ((setattr, (mc, "position", (act["x"], act["y"]))),)
+
+        elif atype == "click":
+            btn = BUTTONS.get(act["button"], Button.middle)
+            ops = ((setattr, (mc, "position", (act["x"], act["y"]))),
+                   (mc.click, (btn, act.get("count", 1))))
+
+        elif atype == "scroll":
+            ops = ((mc.scroll, (act.get("dx", 0), act.get("dy", 0))),)
+
+        elif atype in ("key_down", "key_up"):
+            keyobj = resolve_key(act["key"])
+            if keyobj is not None:
+                ops = ((kc.press if atype == "key_down" else kc.release, (keyobj,)),)
+
+    except Exception as e:
+        print("编译动作发生错误：", e, act)
+
+    return PlanStep(ops, float(act.get("delay", 0)))
+
+
+def _compile_path(act, mc):
+    # 轨迹 → 一串移动步骤：相邻保留点之间按 PATH_STEP 线性插值，由播放调度器按绝对时间执行
+    delay = float(act.get("delay", 0))
+    points = act.get("points") or []
+    if not points:
+        return [PlanStep((), delay)]
+
+    steps = []
+    t0, x0, y0 = points[0]
+    pos = (x0, y0)
+    for t1, x1, y1 in points[1:]:
+        dt = max(0.0, t1 - t0)
+        n = max(1, round(dt / PATH_STEP))
+        for k in range(1, n + 1):
+            steps.append(PlanStep(((setattr, (mc, "position", pos)),), dt / n))
+            f = k / n
+            pos = (round(x0 + (x1 - x0) * f), round(y0 + (y1 - y0) * f))
+        t0, x0, y0 = t1, x1, y1
+    steps.append(PlanStep(((setattr, (mc, "position", pos)),), delay))
+    return steps
+
+
+# =======================
+#     动作列表模型
+# =======================
+class ActionListModel:
+    """持有动作列表；每次修改只通知变化的位置，界面据此增量更新"""
+
+    def __init__(self, actions=None):
+        self.actions = actions if actions is not None else []
+        self.listeners = []
+
+    def __len__(self):
+        return len(self.actions)
+
+    def __getitem__(self, index):
+        return self.actions[index]
+
+    def subscribe(self, callback):
+        # callback(kind, index)，kind 为 reset / insert / remove / update
+        self.listeners.append(callback)
+
+    def _notify(self, kind, index):
+        for callback in self.listeners:
+            callback(kind, index)
+
+    def reset(self, actions):
+        self.actions = actions
+        self._notify("reset", 0)
+
+    def append(self, act):
+        self.actions.append(act)
+        self._notify("insert", len(self.actions) - 1)
+
+    def insert(self, index, act):
+        index = max(0, min(index, len(self.actions)))
+        self.actions.insert(index, act)
+        self._notify("insert", index)
+
+    def remove(self, index):
+        del self.actions[index]
+        self._notify("remove", index)
+
+    def replace(self, index, act):
+        self.actions[index] = act
+        self._notify("update", index)
+
+    def changed(self, index):
+        # 动作被原地修改（如合并移动、累加延迟）后调用
+        self._notify("update", index)
+
+
+# =======================
+#     虚拟化动作列表
+# =======================
+class VirtualActionList:
+    """
+    Treeview 中只保留可见的几十行，滚动时复用这些行显示对应位置的动作；
+    十万条动作也只渲染一屏，录制时新增一行的开销与脚本长度无关
+    """
+
+    def __init__(self, parent, model, describe, columns, headings, widths):
+        self.model = model
+        self.describe = describe        # describe(index, act) -> 一行的 values
+        self.top = 0                    # 第一行可见行对应的动作编号
+        self.page = 30                  # 可见行数，随窗口大小更新
+        self.selected = None            # 选中的动作编号（可以不在可见范围内）
+        self.follow_tail = True         # 停在末尾时新增的动作自动滚动到可见
+        self._shown = {}                # 行号 → 当前显示的 values，内容不变时不重复写入
+        self._selected_slot = None      # 渲染时选中的行号（由此产生的选中事件不再换算）
+        self._render_pending = False
+
+        self.frame = ttk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=columns, show="headings", selectmode="browse")
+        for col, text, width in zip(columns, headings, widths):
+            self.tree.heading(col, text=text)
+            self.tree.column(col, width=width)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.yview)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        try:
+            self.row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        except (tk.TclError, ValueError):
+            self.row_height = 20
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Up>", lambda e: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self._move_selection(-self.page))
+        self.tree.bind("<Next>", lambda e: self._move_selection(self.page))
+
+        model.subscribe(self.on_model_change)
+
+    def pack(self, **kw):
+        self.frame.pack(**kw)
+
+    def bind(self, sequence, func):
+        self.tree.bind(sequence, func)
+
+    # ---------- 模型变化 ----------
+    def on_model_change(self, kind, index):
+        total = len(self.model)
+        if kind == "reset":
+            self.top = 0
+            self.selected = None
+            self.follow_tail = True
+        elif kind == "insert":
+            if self.selected is not None and index <= self.selected:
+                self.selected += 1
+            if self.follow_tail:
+                self.top = max(0, total - self.page)
+            elif index < self.top:
+                self.top += 1  # 可见内容保持不动
+        elif kind == "remove":
+            if self.selected is not None:
+                if index < self.selected:
+                    self.selected -= 1
+                elif index == self.selected:
+                    self.selected = min(index, total - 1) if total else None
+            if index < self.top:
+                self.top -= 1
+        elif kind == "update":
+            if not self.top <= index < self.top + self.page:
+                return  # 不可见的行无需重绘
+        self._schedule_render()
+
+    def refresh(self):
+        # 全量重绘（只有可见行）
+        self._shown.clear()
+        self._schedule_render()
+
+    def _schedule_render(self):
+        # 同一轮事件中的多次修改只重绘一次
+        if not self._render_pending:
+            self._render_pending = True
+            self.tree.after_idle(self.render)
+
+    def render(self):
+        self._render_pending = False
+        total = len(self.model)
+        self.top = max(0, min(self.top, total - self.page))
+        rows = min(self.page, total - self.top)
+
+        count = len(self.tree.get_children())
+        for slot in range(count, rows):
+            self.tree.insert("", "end", iid=str(slot))
+        for slot in range(rows, count):
+            self.tree.delete(str(slot))
+            self._shown.pop(slot, None)
+
+        for slot in range(rows):
+            index = self.top + slot
+            values = self.describe(index, self.model[index])
+            if self._shown.get(slot) != values:
+                self.tree.item(str(slot), values=values)
+                self._shown[slot] = values
+
+        if self.selected is not None and self.top <= self.selected < self.top + rows:
+            slot = str(self.selected - self.top)
+        else:
+            slot = None
+        if slot != self._selected_slot or self.tree.selection() != ((slot,) if slot else ()):
+            self._selected_slot = slot
+            self.tree.selection_set(slot if slot else ())
+
+        if total:
+            self.scrollbar.set(self.top / total, (self.top + rows) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    # ---------- 滚动 ----------
+    def scroll_to(self, top):
+        total = len(self.model)
+        self.top = max(0, min(int(top), total - self.page))
+        self.follow_tail = self.top + self.page >= total
+        self._schedule_render()
+
+    def scroll(self, rows):
+        self.scroll_to(self.top + rows)
+        return "break"
+
+    def yview(self, *args):
+        # 滚动条回调：("moveto", 比例) 或 ("scroll", 数量, "units"/"pages")
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * len(self.model))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self.page if args[2] == "pages" else 1)
+            self.scroll(step)
+
+    def see(self, index):
+        if index < self.top:
+            self.scroll_to(index)
+        elif index >= self.top + self.page:
+            self.scroll_to(index - self.page + 1)
+
+    def _on_resize(self, event):
+        # 减去表头占用的一行
+        page = max(1, event.height // self.row_height - 1)
+        if page != self.page:
+            self.page = page
+            if self.follow_tail:
+                self.top = max(0, len(self.model) - page)
+            self._schedule_render()
+
+    # ---------- 选中 ----------
+    def _on_select(self, event):
+        # 用户点击了另一行；渲染时设置的选中不需要换算
+        sel = self.tree.selection()
+        if sel and sel[0] != self._selected_slot:
+            self._selected_slot = sel[0]
+            self.selected = self.top + int(sel[0])
+
+    def _move_selection(self, step):
+        total = len(self.model)
+        if not total:
+            return "break"
+        current = self.selected if self.selected is not None else (self.top if step > 0 else self.top + self.page - 1)
+        self.select(max(0, min(current + step, total - 1)))
+        return "break"
+
+    def select(self, index):
+        self.selected = index
+        self.see(index)
+        self._schedule_render()
+
+    def selected_index(self):
+        return self.selected
+
+
 class MacroRecorderApp:
     def __init__(self, root):
         self.root = root
         self.root.title("中文鼠标键盘录制器")
         self.scripts = {}        # 脚本名称 → 动作列表
         self.current_script_name = "未命名脚本"
-        self.current_actions = []
+        self.model = ActionListModel()   # 当前动作列表（current_actions）及其变化通知
         self.recording = False
         self.last_time = None
+        self.events = EventRing()    # 监听线程写入、界面线程定时取出
+        self.trajectory = False      # 本次录制是否记录完整鼠标轨迹
+        self.path_t = array("d")     # 尚未写入列表的轨迹采样
+        self.path_x = array("i")
+        self.path_y = array("i")
+        self.drain_interval_ms = 15
+        self._drain_job = None
 
         self.mouse_controller = MouseController()
         self.keyboard_controller = KeyboardController()
@@ -52,6 +549,15 @@ class MacroRecorderApp:
 
         self.setup_ui()
 
+    # 当前脚本的动作列表；整体替换时列表视图随之重置
+    @property
+    def current_actions(self):
+        return self.model.actions
+
+    @current_actions.setter
+    def current_actions(self, actions):
+        self.model.reset(actions)
+
 
     # =======================
     #     构建中文界面
@@ -84,11 +590,23 @@ class MacroRecorderApp:
 
         ttk.Button(rec_frame, text="停止录制（Stop）", command=self.stop_record).pack(fill="x", pady=5)
 
+        # 轨迹模式：记录全部鼠标移动采样，按容差简化为 path 动作
+        self.trajectory_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(rec_frame, text="记录鼠标轨迹", variable=self.trajectory_var).pack()
+        ttk.Label(rec_frame, text="轨迹容差（像素）：").pack()
+        self.tolerance_var = tk.DoubleVar(value=2.0)
+        ttk.Entry(rec_frame, textvariable=self.tolerance_var, width=8).pack()
+
         # 播放准备时间
         ttk.Label(rec_frame, text="播放前准备秒数：").pack()
         self.prepare_var = tk.DoubleVar(value=1.5)
         ttk.Entry(rec_frame, textvariable=self.prepare_var, width=8).pack()
 
+        # 播放速度倍数（2 = 两倍速，0.5 = 半速）
+        ttk.Label(rec_frame, text="播放速度倍数：").pack()
+        self.speed_var = tk.DoubleVar(value=1.0)
+        ttk.Entry(rec_frame, textvariable=self.speed_var, width=8).pack()
+
         ttk.Button(rec_frame, text="播放一次", command=lambda: self.play_script(loop=1)).pack(fill="x", pady=5)
 
         loop_frame = ttk.Frame(rec_frame)
@@ -111,22 +629,16 @@ class MacroRecorderApp:
         ttk.Button(btns, text="删除选中动作", command=self.delete_selected).pack(side="left", padx=5)
         ttk.Button(btns, text="编辑选中动作", command=self.edit_selected).pack(side="left", padx=5)
 
-        # 动作列表表格
-        cols = ("idx", "type", "desc", "delay")
-        self.tree = ttk.Treeview(edit_frame, columns=cols, show="headings", selectmode="browse")
-
-        self.tree.heading("idx", text="编号")
-        self.tree.heading("type", text="动作类型")
-        self.tree.heading("desc", text="动作说明")
-        self.tree.heading("delay", text="延迟（秒）")
-
-        self.tree.column("idx", width=60)
-        self.tree.column("type", width=120)
-        self.tree.column("desc", width=420)
-        self.tree.column("delay", width=100)
-
-        self.tree.pack(fill="both", expand=True)
-        self.tree.bind("<Double-1>", lambda e: self.edit_selected())
+        # 动作列表表格（虚拟化：只渲染可见行）
+        self.action_view = VirtualActionList(
+            edit_frame, self.model, self.row_values,
+            columns=("idx", "type", "desc", "delay"),
+            headings=("编号", "动作类型", "动作说明", "延迟（秒）"),
+            widths=(60, 120, 420, 100)
+        )
+        self.tree = self.action_view.tree
+        self.action_view.pack(fill="both", expand=True)
+        self.action_view.bind("<Double-1>", lambda e: self.edit_selected())
 
         # 状态栏
         status_frame = ttk.Frame(frm)
@@ -141,6 +653,10 @@ class MacroRecorderApp:
     def set_status(self, msg):
         self.status_var.set(msg)
         self.root.update_idletasks()
+
+    # 播放线程不直接操作界面，交给 Tk 主循环执行
+    def post_status(self, msg):
+        self.root.after(0, self.set_status, msg)
     # =======================
     #   新建 / 保存 / 加载脚本
     # =======================
@@ -152,7 +668,6 @@ class MacroRecorderApp:
         self.name_var.set(name)
         self.current_actions = []
         self.scripts[name] = self.current_actions
-        self.refresh_tree()
         self.set_status("已创建新脚本")
 
     def save_script(self):
@@ -191,27 +706,14 @@ class MacroRecorderApp:
         self.name_var.set(name)
         self.current_actions = actions
 
-        self.refresh_tree()
         self.set_status(f"已加载脚本：{name}")
 
 
     # =======================
     #      列表刷新
     # =======================
-    def refresh_tree(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-
-        for idx, act in enumerate(self.current_actions):
-            desc = self.action_description(act)
-            delay = f"{act.get('delay', 0):.3f}"
-
-            self.tree.insert("", "end", iid=str(idx), values=(
-                idx,
-                act["type"],
-                desc,
-                delay
-            ))
+    def row_values(self, idx, act):
+        return (idx, act["type"], self.action_description(act), f"{act.get('delay', 0):.3f}")
 
 
     # =======================
@@ -222,6 +724,10 @@ class MacroRecorderApp:
 
         if t == "move":
             return f"鼠标移动到 ({act.get('x')}, {act.get('y')})"
+        if t == "path":
+            points = act.get("points") or [[0, None, None]]
+            end = points[-1]
+            return f"鼠标轨迹 {len(points)} 点，用时 {end[0]:.3f} 秒，终点 ({end[1]}, {end[2]})"
         if t == "click":
             return f"鼠标 {act.get('button')} 键点击于 ({act.get('x')}, {act.get('y')}) ×{act.get('count', 1)}"
         if t == "scroll":
@@ -247,7 +753,13 @@ class MacroRecorderApp:
         self.current_actions = []
         self.scripts[self.current_script_name] = self.current_actions
 
-        self.last_time = time.time()
+        self.events = EventRing()
+        self.trajectory = bool(self.trajectory_var.get())
+        try:
+            self.tolerance = max(0.0, float(self.tolerance_var.get()))
+        except:
+            self.tolerance = 2.0
+        self.last_time = time.perf_counter()
         self.set_status("正在录制… 请执行鼠标与键盘操作")
 
         # 启动监听器
@@ -263,6 +775,7 @@ class MacroRecorderApp:
 
         self.mouse_listener.start()
         self.keyboard_listener.start()
+        self._drain_job = self.root.after(self.drain_interval_ms, self.drain_events)
 
 
     # =======================
@@ -282,90 +795,125 @@ class MacroRecorderApp:
             self.keyboard_listener.stop()
             self.keyboard_listener = None
 
-        self.set_status("录制已停止")
-        self.refresh_tree()
+        # 取出停止前已写入缓冲区的事件
+        if self._drain_job:
+            self.root.after_cancel(self._drain_job)
+            self._drain_job = None
+        self.drain_events()
+        self.flush_path()
+
+        if self.events.dropped:
+            self.set_status(f"录制已停止（事件过多，丢弃 {self.events.dropped} 个）")
+        else:
+            self.set_status("录制已停止")
     # =======================
-    #   录制动作写入列表
+    #   缓冲区事件写入列表
     # =======================
-    def record_event(self, act):
-        if not self.recording:
-            return
+    def drain_events(self):
+        # 界面线程定时成批取出监听线程写入的事件，列表视图每批只重绘一次
+        for seq, t, kind, a, b, extra in self.events.drain():
+            if kind == EV_MOVE:
+                self.record_move(a, b, t)
+            elif kind == EV_CLICK:
+                btn = (
+                    "left" if extra == Button.left
+                    else "right" if extra == Button.right
+                    else "middle"
+                )
+                self.record_event({"type": "click", "x": a, "y": b, "button": btn, "count": 1}, t)
+            elif kind == EV_SCROLL:
+                self.record_event({"type": "scroll", "dx": a, "dy": b}, t)
+            elif kind == EV_KEY_DOWN:
+                self.record_event({"type": "key_down", "key": self.key_to_str(extra)}, t)
+            elif kind == EV_KEY_UP:
+                self.record_event({"type": "key_up", "key": self.key_to_str(extra)}, t)
+
+        if self.recording:
+            self._drain_job = self.root.after(self.drain_interval_ms, self.drain_events)
+
+    def record_event(self, act, t):
+        # 先把之前的一段轨迹写入列表
+        if len(self.path_t):
+            self.flush_path()
 
-        now = time.time()
-        delay = now - self.last_time if self.last_time else 0
-        self.last_time = now
+        # 两个监听线程的时间戳可能略有交错，延迟不取负值
+        delay = max(0.0, t - self.last_time) if self.last_time else 0
+        self.last_time = max(t, self.last_time or t)
 
         # 把延迟记在前一个动作的 delay 上
         if self.current_actions:
             self.current_actions[-1]["delay"] = self.current_actions[-1].get("delay", 0) + delay
+            self.model.changed(len(self.current_actions) - 1)
         else:
             # 第一个动作前可能存在等待，也记录（可选）
             if delay > 0:
-                self.current_actions.append({"type": "wait", "delay": delay})
+                self.model.append({"type": "wait", "delay": delay})
 
         act["delay"] = 0
-        self.current_actions.append(act)
-        self.refresh_tree()
+        self.model.append(act)
 
-
-    # =======================
-    #    鼠标事件回调
-    # =======================
-    def on_move(self, x, y):
-        if not self.recording:
+    def record_move(self, x, y, t):
+        if self.trajectory:
+            self.path_t.append(t)
+            self.path_x.append(x)
+            self.path_y.append(y)
             return
 
         # 为减少大量 move 事件：如果前一个是 move，则直接覆盖
         last = self.current_actions[-1] if self.current_actions else None
         if last and last["type"] == "move":
-            last["x"], last["y"] = int(x), int(y)
+            last["x"], last["y"] = x, y
+            self.model.changed(len(self.current_actions) - 1)
             return
 
-        self.record_event({"type": "move", "x": int(x), "y": int(y)})
+        self.record_event({"type": "move", "x": x, "y": y}, t)
 
-    def on_click(self, x, y, button, pressed):
-        if not self.recording or not pressed:
+
+    def flush_path(self):
+        # 一段连续移动结束：简化后写成一个 path 动作，delay 从最后一个采样点算起
+        ts, xs, ys = self.path_t, self.path_x, self.path_y
+        if not len(ts):
             return
+        self.path_t, self.path_x, self.path_y = array("d"), array("i"), array("i")
 
-        btn = (
-            "left" if button == Button.left
-            else "right" if button == Button.right
-            else "middle"
-        )
+        keep = simplify_path(ts, xs, ys, self.tolerance)
+        if len(keep) == 1:
+            self.record_event({"type": "move", "x": xs[0], "y": ys[0]}, ts[0])
+            return
 
-        self.record_event({
-            "type": "click",
-            "x": int(x),
-            "y": int(y),
-            "button": btn,
-            "count": 1
-        })
+        t0 = ts[0]
+        points = [[round(ts[i] - t0, 4), xs[i], ys[i]] for i in keep]
+        self.record_event({"type": "path", "points": points}, t0)
+        self.last_time = ts[-1]
 
-    def on_scroll(self, x, y, dx, dy):
-        if not self.recording:
-            return
 
-        self.record_event({
-            "type": "scroll",
-            "dx": int(dx),
-            "dy": int(dy)
-        })
+    # =======================
+    #    鼠标事件回调
+    # =======================
+    # 以下回调运行在 pynput 监听线程中，只把事件写入缓冲区，不触碰界面与动作列表
+    def on_move(self, x, y):
+        if self.recording:
+            self.events.push(EV_MOVE, int(x), int(y))
+
+    def on_click(self, x, y, button, pressed):
+        if self.recording and pressed:
+            self.events.push(EV_CLICK, int(x), int(y), button)
+
+    def on_scroll(self, x, y, dx, dy):
+        if self.recording:
+            self.events.push(EV_SCROLL, int(dx), int(dy))
 
 
     # =======================
     #    键盘事件回调
     # =======================
     def on_key_press(self, key):
-        if not self.recording:
-            return
-        k = self.key_to_str(key)
-        self.record_event({"type": "key_down", "key": k})
+        if self.recording:
+            self.events.push(EV_KEY_DOWN, extra=key)
 
     def on_key_release(self, key):
-        if not self.recording:
-            return
-        k = self.key_to_str(key)
-        self.record_event({"type": "key_up", "key": k})
+        if self.recording:
+            self.events.push(EV_KEY_UP, extra=key)
 
     def key_to_str(self, key):
         # 特殊键（如 Key.enter）
@@ -391,88 +939,43 @@ class MacroRecorderApp:
         except:
             prepare = 1.5
 
-        t = threading.Thread(target=self._play_thread, args=(loop, prepare), daemon=True)
+        try:
+            speed = float(self.speed_var.get())
+        except:
+            speed = 1.0
+        if speed <= 0:
+            messagebox.showinfo("提示", "播放速度倍数必须大于 0。")
+            return
+
+        # 在界面线程编译一次，播放期间编辑列表也不影响本次播放
+        plan = compile_actions(self.current_actions, self.mouse_controller, self.keyboard_controller)
+
+        t = threading.Thread(target=self._play_thread, args=(plan, loop, prepare, speed), daemon=True)
         t.start()
 
-    def _play_thread(self, loop, prepare):
-        self.set_status(f"将在 {prepare:.1f} 秒后开始播放，请切换到目标窗口…")
+    def _play_thread(self, plan, loop, prepare, speed=1.0):
+        self.post_status(f"将在 {prepare:.1f} 秒后开始播放，请切换到目标窗口…")
         time.sleep(max(0, prepare))
 
-        self.set_status("正在播放脚本…")
+        self.post_status("正在播放脚本…")
+        scheduler = PlaybackScheduler(speed)
 
         for r in range(loop):
-            for act in self.current_actions:
-                atype = act["type"]
-
+            for step in plan:
                 try:
-                    if atype == "move":
-                        self.mouse_controller.position = (act["x"], act["y"])
-
-                    elif atype == "click":
-                        self.mouse_controller.position = (act["x"], act["y"])
-                        btn = Button.left if act["button"] == "left" else (
-                            Button.right if act["button"] == "right" else Button.middle
-                        )
-                        for _ in range(act.get("count", 1)):
-                            self.mouse_controller.click(btn)
-
-                    elif atype == "scroll":
-                        self.mouse_controller.scroll(
-                            act.get("dx", 0),
-                            act.get("dy", 0)
-                        )
-
-                    elif atype == "key_down":
-                        self._press_key(act["key"])
-
-                    elif atype == "key_up":
-                        self._release_key(act["key"])
-
-                    elif atype == "wait":
-                        pass
-
+                    for func, args in step.ops:
+                        func(*args)
                 except Exception as e:
                     print("播放动作发生错误：", e)
 
-                # 延迟执行
-                delay = float(act.get("delay", 0))
-                end_time = time.time() + delay
-                while time.time() < end_time:
-                    time.sleep(min(0.03, end_time - time.time()))
+                # 延迟执行（按绝对截止时间）
+                scheduler.wait(step.delay)
 
-        self.set_status("脚本播放完成。")
+        summary = scheduler.summary()
+        print("播放统计：", summary)
+        self.post_status(f"脚本播放完成。{summary}")
 
 
-    # =======================
-    #     键盘操作执行
-    # =======================
-    def _press_key(self, k):
-        if k.startswith("Key."):
-            name = k.split(".", 1)[1]
-            try:
-                keyobj = getattr(Key, name)
-                self.keyboard_controller.press(keyobj)
-            except:
-                pass
-        else:
-            try:
-                self.keyboard_controller.press(k)
-            except:
-                pass
-
-    def _release_key(self, k):
-        if k.startswith("Key."):
-            name = k.split(".", 1)[1]
-            try:
-                keyobj = getattr(Key, name)
-                self.keyboard_controller.release(keyobj)
-            except:
-                pass
-        else:
-            try:
-                self.keyboard_controller.release(k)
-            except:
-                pass
     # =======================
     #      插入等待动作
     # =======================
@@ -484,8 +987,7 @@ class MacroRecorderApp:
             return
 
         act = {"type": "wait", "delay": float(val)}
-        self.current_actions.insert(idx, act)
-        self.refresh_tree()
+        self.model.insert(idx, act)
         self.set_status("已插入等待动作")
 
 
@@ -493,14 +995,12 @@ class MacroRecorderApp:
     #      删除动作
     # =======================
     def delete_selected(self):
-        sel = self.tree.selection()
-        if not sel:
+        idx = self.action_view.selected_index()
+        if idx is None:
             messagebox.showinfo("提示", "请先选择一个动作再删除。")
             return
 
-        idx = int(sel[0])
-        del self.current_actions[idx]
-        self.refresh_tree()
+        self.model.remove(idx)
         self.set_status("动作已删除")
 
 
@@ -508,29 +1008,27 @@ class MacroRecorderApp:
     #      编辑动作
     # =======================
     def edit_selected(self):
-        sel = self.tree.selection()
-        if not sel:
+        idx = self.action_view.selected_index()
+        if idx is None:
             messagebox.showinfo("提示", "请先选择一个动作再编辑。")
             return
 
-        idx = int(sel[0])
         act = self.current_actions[idx]
 
         dialog = ActionEditDialog(self.root, act)
         self.root.wait_window(dialog.top)
 
         if dialog.updated:
-            self.current_actions[idx] = dialog.act
-            self.refresh_tree()
+            self.model.replace(idx, dialog.act)
             self.set_status("动作已更新")
 
 
     # 返回选择的行号，如未选则返回末尾
     def _get_selected_index_or_end(self):
-        sel = self.tree.selection()
-        if not sel:
+        idx = self.action_view.selected_index()
+        if idx is None:
             return len(self.current_actions)
-        return int(sel[0])
+        return idx
 
 
 
@@ -572,7 +1070,8 @@ class ActionEditDialog:
     def _fields_to_str(self, act):
         pairs = []
         for k, v in act.items():
-            if k not in ("type", "delay"):
+            # 轨迹点列表不在这里编辑，保持原样
+            if k not in ("type", "delay") and not isinstance(v, list):
                 pairs.append(f"{k}={v}")
         return ", ".join(pairs)
 
@@ -608,10 +1107,97 @@ class ActionEditDialog:
 
 
 
+# =======================
+#   性能基准测试（python 1.py --benchmark）
+# =======================
+class _NullController:
+    # 基准测试用：接受所有控制器调用但不产生输入
+    position = (0, 0)
+
+    def click(self, button, count=1): pass
+    def scroll(self, dx, dy): pass
+    def press(self, key): pass
+    def release(self, key): pass
+
+
+def run_benchmark(n=200000):
+    """不依赖显示器：对比逐动作解释执行与编译后执行的每秒动作数（控制器为空操作）"""
+    pattern = [
+        {"type": "move", "x": 10, "y": 20, "delay": 0},
+        {"type": "click", "x": 10, "y": 20, "button": "left", "count": 1, "delay": 0},
+        {"type": "scroll", "dx": 0, "dy": -1, "delay": 0},
+        {"type": "key_down", "key": "Key.shift", "delay": 0},
+        {"type": "key_down", "key": "a", "delay": 0},
+        {"type": "key_up", "key": "a", "delay": 0},
+        {"type": "key_up", "key": "Key.shift", "delay": 0},
+        {"type": "wait", "delay": 0},
+    ]
+    actions = [dict(pattern[i % len(pattern)]) for i in range(n)]
+    mc = _NullController()
+    kc = _NullController()
+
+    # 原先的播放方式：每个动作都判断类型、映射鼠标键、解析 "Key.xxx"
+    def interpret(act):
+        atype = act["type"]
+        if atype == "move":
+            mc.position = (act["x"], act["y"])
+        elif atype == "click":
+            mc.position = (act["x"], act["y"])
+            btn = Button.left if act["button"] == "left" else (
+                Button.right if act["button"] == "right" else Button.middle
+            )
+            for _ in range(act.get("count", 1)):
+                mc.click(btn)
+        elif atype == "scroll":
+            mc.scroll(act.get("dx", 0), act.get("dy", 0))
+        elif atype in ("key_down", "key_up"):
+            k = act["key"]
+            if k.startswith("Key."):
+                k = getattr(Key, k.split(".", 1)[1])
+            (kc.press if atype == "key_down" else kc.release)(k)
+        float(act.get("delay", 0))
+
+    def run_interpreted():
+        for act in actions:
+            interpret(act)
+
+    def run_compiled():
+        for step in plan:
+            for func, args in step.ops:
+                func(*args)
+            step.delay
+
+    # 各取 3 次中的最好成绩，计时前先完成垃圾回收
+    def best(func):
+        times = []
+        for _ in range(3):
+            gc.collect()
+            t = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - t)
+        return min(times)
+
+    t = time.perf_counter()
+    plan = compile_actions(actions, mc, kc)
+    compile_time = time.perf_counter() - t
+
+    interpreted = best(run_interpreted)
+    compiled = best(run_compiled)
+
+    print(f"动作数：{n}")
+    print(f"逐动作解释：{n / interpreted:,.0f} 动作/秒")
+    print(f"编译后执行：{n / compiled:,.0f} 动作/秒（编译一次 {compile_time * 1000:.1f} 毫秒，"
+          f"提速 {interpreted / compiled:.2f} 倍）")
+
+
 # =======================
 #       程序入口
 # =======================
 def main():
+    if "--benchmark" in sys.argv:
+        run_benchmark()
+        return
+
     root = tk.Tk()
     app = MacroRecorderApp(root)
     root.geometry("1000x650")
@@ -3,30 +3,90 @@
 功能：
 1. 拖拽选择屏幕上的截图区域
 2. 自动滚动并连续截取该区域（支持全局热键）
-3. 简单拼接（无重叠检测）
+3. 重叠检测拼接（按真实滚动距离裁掉重复内容）
 4. 自动拼接成完整长图
 5. 支持中英文切换
 6. 支持自定义全局快捷键
 7. 自动检查更新
+8. 命令行无界面截图（python 长截图.py capture --region X Y W H -o out.png）
 """
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from PIL import Image, ImageTk
-import pyautogui
+from PIL import Image, ImageChops
 import threading
 import time
 import os
 import sys
 import json
+import mmap
+import argparse
+import concurrent.futures
+import csv
+import importlib
+import importlib.util
+import queue
+import random
+import shutil
+import struct
+import tempfile
+import zlib
 from datetime import datetime
-import pyperclip
-import keyboard
 import io
+
+
+class LazyModule:
+    """
+    延迟导入的模块代理 - 第一次访问属性时才真正导入
+    pyautogui、keyboard、pyperclip、requests 等导入较慢，且启动时用不到，
+    放到第一次使用时再加载，让窗口尽快显示
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    self._module = importlib.import_module(self._name)
+                    print(f"[启动] 延迟导入 {self._name}: {(time.perf_counter() - start) * 1000:.1f} ms")
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def is_available(self):
+        """模块是否已安装（不触发导入）"""
+        if self._module is not None:
+            return True
+        try:
+            return importlib.util.find_spec(self._name) is not None
+        except (ImportError, ValueError):
+            return False
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+
+pyautogui = LazyModule('pyautogui')
+pyperclip = LazyModule('pyperclip')
+keyboard = LazyModule('keyboard')
+requests = LazyModule('requests')  # 可选依赖，使用前用 is_available() 检查
+ImageTk = LazyModule('PIL.ImageTk')
+mss = LazyModule('mss')  # 可选依赖，创建 mss 截图后端时才导入
+
+# 延迟导入的模块名（启动基准测试据此检查是否被提前导入）
+LAZY_MODULES = ('pyautogui', 'pyperclip', 'keyboard', 'requests', 'PIL.ImageTk', 'mss')
+
 try:
-    import requests
+    import numpy as np
 except ImportError:
-    requests = None
+    np = None
 
 
 def get_app_dir():
@@ -57,6 +117,9 @@ ENABLE_AUTO_UPDATE = True
 # 每次启动都检查更新（True: 每次都检查, False: 每天只检查一次）
 CHECK_UPDATE_EVERY_START = True
 
+# 启动后推迟多久（毫秒）再注册热键、检查更新，先让窗口显示出来
+STARTUP_DEFER_MS = 300
+
 # ========================================
 
 
@@ -77,7 +140,7 @@ class UpdateManager:
         检查是否有新版本
         返回: (是否更新, 最新版本, 下载链接, 更新说明)
         """
-        if requests is None:
+        if not requests.is_available():
             print("[更新检查] requests 库未安装，跳过更新检查")
             return False, None, None, ""
 
@@ -222,6 +285,7 @@ class LanguageManager:
                 "msg_warning_no_screenshot": "没有可保存的截图",
                 "msg_warning_no_copy": "没有可复制的截图",
                 "count_value": "已截图: {count} 张",
+                "count_resuming": "正在恢复会话 {count}/{total}",
                 "status_stitching": "拼接中 ({width}x{height})",
                 "status_title": "状态",
                 "region_label": "选择区域",
@@ -248,6 +312,21 @@ class LanguageManager:
                 "hotkeys_config_title": "快捷键配置",
                 "btn_language": "切换语言",
                 "btn_shortcuts": "快捷键设置",
+                "btn_profile": "性能报告",
+                "profile_label": "性能",
+                "profile_report_title": "性能报告",
+                "profile_report_path": "报告文件: {path}",
+                "msg_no_profile": "还没有录制数据，请先完成一次录制",
+                "btn_sessions": "录制会话",
+                "session_title": "录制会话",
+                "msg_session_action": "会话: {name}\n帧数: {count}\n\n是：从当前页面位置继续录制（追加到该会话）\n否：用当前拼接模式重新拼接\n取消：不做处理",
+                "msg_session_empty": "该目录不是录制会话，或其中没有帧",
+                "msg_session_resume_mode": "二维拼接的会话不能继续录制，只能重新拼接",
+                "msg_capture_error": "处理截图时出错，已停止录制并拼接已截取的帧:\n{error}",
+                "export_preset_label": "导出:",
+                "export_preset_fast": "最快（文件较大）",
+                "export_preset_balanced": "均衡",
+                "export_preset_small": "最小（较慢）",
                 "usage_title": "使用说明",
                 "usage_instructions": "1. 点击「选择区域」或使用快捷键 (Ctrl+Shift+S) 选择截图区域\n2. 点击「开始自动滚动」或使用快捷键 (Ctrl+Shift+R) 开始自动滚动截图\n3. 程序会自动滚动并连续截取该区域，检测到页面底部时自动停止\n4. 点击「停止」或使用快捷键 (Ctrl+Shift+E) 手动停止\n5. 程序会自动拼接所有截图为完整长图\n6. 点击「保存图片」或使用快捷键 (Ctrl+Shift+W) 保存结果\n7. 点击「复制到剪贴板」或使用快捷键 (Ctrl+Shift+C) 复制到剪贴板",
                 "btn_select_region": "选择区域",
@@ -259,8 +338,10 @@ class LanguageManager:
                 "stitch_mode_title": "拼接模式",
                 "stitch_mode_vertical": "垂直拼接（长图）",
                 "stitch_mode_grid": "网格拼接（多列）",
+                "stitch_mode_mosaic": "二维拼接（横向+纵向）",
                 "stitch_mode_desc_vertical": "所有图片垂直拼接成一张长图，适合连续内容（如长网页、聊天记录）",
-                "stitch_mode_desc_grid": "图片按网格布局拼接，从上到下、从左到右排列，适合多张独立截图"
+                "stitch_mode_desc_grid": "图片按网格布局拼接，从上到下、从左到右排列，适合多张独立截图",
+                "stitch_mode_desc_mosaic": "横向滚到边后向下滚一屏再反向横扫（蛇形），按重叠位置拼成一整张图，适合宽表格、地图、设计稿"
             },
             "en": {
                 "app_title": "Auto Scroll Screenshot Tool",
@@ -321,6 +402,7 @@ class LanguageManager:
                 "msg_warning_no_screenshot": "No screenshot to save",
                 "msg_warning_no_copy": "No screenshot to copy",
                 "count_value": "Screenshots: {count}",
+                "count_resuming": "Restoring session {count}/{total}",
                 "status_stitching": "Stitching ({width}x{height})",
                 "status_title": "Status",
                 "region_label": "Selected Region",
@@ -347,6 +429,21 @@ class LanguageManager:
                 "hotkeys_config_title": "Hotkey Configuration",
                 "btn_language": "Switch Language",
                 "btn_shortcuts": "Hotkey Settings",
+                "btn_profile": "Performance",
+                "profile_label": "Performance",
+                "profile_report_title": "Performance Report",
+                "profile_report_path": "Report file: {path}",
+                "msg_no_profile": "No capture data yet, please finish a recording first",
+                "btn_sessions": "Sessions",
+                "session_title": "Capture Sessions",
+                "msg_session_action": "Session: {name}\nFrames: {count}\n\nYes: continue capturing from the current page position (appends to this session)\nNo: re-stitch with the current stitch mode\nCancel: do nothing",
+                "msg_session_empty": "This folder is not a capture session or contains no frames",
+                "msg_session_resume_mode": "2D mosaic sessions cannot be continued, only re-stitched",
+                "msg_capture_error": "Processing a screenshot failed; recording stopped and the captured frames will be stitched:\n{error}",
+                "export_preset_label": "Export:",
+                "export_preset_fast": "Fastest (larger file)",
+                "export_preset_balanced": "Balanced",
+                "export_preset_small": "Smallest (slower)",
                 "usage_title": "Instructions",
                 "usage_instructions": "1. Click 'Select Region' or use shortcut (Ctrl+Shift+S) to select screenshot area\n2. Click 'Start Auto Scroll' or use shortcut (Ctrl+Shift+R) to start auto-scrolling screenshot\n3. The program will automatically scroll and continuously capture the area, stopping when it detects the page bottom\n4. Click 'Stop' or use shortcut (Ctrl+Shift+E) to manually stop\n5. The program will automatically stitch all screenshots into a complete long image\n6. Click 'Save Image' or use shortcut (Ctrl+Shift+W) to save the result\n7. Click 'Copy to Clipboard' or use shortcut (Ctrl+Shift+C) to copy to clipboard",
                 "btn_select_region": "Select Region",
@@ -358,8 +455,10 @@ class LanguageManager:
                 "stitch_mode_title": "Stitch Mode",
                 "stitch_mode_vertical": "Vertical Stitch (Long Image)",
                 "stitch_mode_grid": "Grid Stitch (Multi-Column)",
+                "stitch_mode_mosaic": "2D Mosaic (Horizontal + Vertical)",
                 "stitch_mode_desc_vertical": "All images stitched vertically into one long image, suitable for continuous content (e.g., long web pages, chat records)",
-                "stitch_mode_desc_grid": "Images arranged in grid layout, from top to bottom, left to right, suitable for multiple independent screenshots"
+                "stitch_mode_desc_grid": "Images arranged in grid layout, from top to bottom, left to right, suitable for multiple independent screenshots",
+                "stitch_mode_desc_mosaic": "Scrolls sideways to the edge, down one screen, then back (serpentine) and places every frame by its overlap, suitable for wide spreadsheets, maps and design canvases"
             }
         }
 
@@ -383,9 +482,10 @@ class LanguageManager:
                     if lang in existing_translations:
                         merged_translations[lang].update(existing_translations[lang])
 
-                # 保存合并后的配置（确保配置文件包含所有最新的键）
-                self.save_translations(merged_translations)
-                print(f"语言配置已合并并更新: {self.config_path}")
+                # 只有新增了键时才写回配置（避免每次启动都重写文件）
+                if merged_translations != existing_translations:
+                    self.save_translations(merged_translations)
+                    print(f"语言配置已合并并更新: {self.config_path}")
                 return merged_translations
             else:
                 # 自动生成默认配置
@@ -455,9 +555,10 @@ class HotkeyManager:
                 # 然后用现有配置覆盖（保留用户自定义）
                 merged_hotkeys.update(existing_hotkeys)
 
-                # 保存合并后的配置（确保配置文件包含所有最新的键）
-                self.save_hotkeys(merged_hotkeys)
-                print(f"快捷键配置已合并并更新: {self.config_path}")
+                # 只有新增了键时才写回配置（避免每次启动都重写文件）
+                if merged_hotkeys != existing_hotkeys:
+                    self.save_hotkeys(merged_hotkeys)
+                    print(f"快捷键配置已合并并更新: {self.config_path}")
                 return merged_hotkeys
             else:
                 # 自动生成默认配置
@@ -518,120 +619,2492 @@ class HotkeyManager:
         self.active_hotkeys.clear()
 
 
-class AutoScrollScreenshotTool:
-    """自动滚动长截图工具"""
+class SettingsManager:
+    """设置管理器 - 保存界面中修改的选项（导出预设等）"""
+
+    def __init__(self, config_path='settings_config.json'):
+        # 获取应用目录（兼容开发和打包环境）
+        script_dir = get_app_dir()
+        self.config_path = os.path.join(script_dir, config_path)
+
+        # 确保目录存在
+        os.makedirs(os.path.dirname(self.config_path), exist_ok=True)
+
+        self.settings = self.load_settings()
+
+    def load_settings(self):
+        """加载设置，不存在时使用默认设置（修改后才写入文件）"""
+        settings = self.get_default_settings()
+        try:
+            if os.path.exists(self.config_path):
+                with open(self.config_path, 'r', encoding='utf-8') as f:
+                    settings.update(json.load(f))
+        except Exception as e:
+            print(f"加载设置失败: {e}，使用默认设置")
+        return settings
+
+    def save_settings(self):
+        """保存设置"""
+        try:
+            with open(self.config_path, 'w', encoding='utf-8') as f:
+                json.dump(self.settings, f, indent=2, ensure_ascii=False)
+            return True
+        except Exception as e:
+            print(f"保存设置失败: {e}")
+            return False
+
+    def get(self, key):
+        return self.settings.get(key)
+
+    def set(self, key, value):
+        """修改一项设置并保存"""
+        self.settings[key] = value
+        return self.save_settings()
+
+    def get_default_settings(self):
+        """获取默认设置"""
+        return {
+            "export_preset": "fast"
+        }
+
+
+class CaptureBackend:
+    """截图后端基类 - grab 截取屏幕区域并返回 RGB 图片"""
+
+    name = 'base'
+
+    def grab(self, region):
+        """
+        :param region: (x, y, 宽, 高)
+        :return: RGB 模式的 PIL 图片
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """释放后端持有的资源"""
+        pass
+
+
+class PyAutoGUICaptureBackend(CaptureBackend):
+    """pyautogui 后端 - 兼容性最好，每次截取全屏后再裁剪"""
+
+    name = 'pyautogui'
+
+    def grab(self, region):
+        return pyautogui.screenshot(region=region)
+
+
+class ImageGrabCaptureBackend(CaptureBackend):
+    """Pillow ImageGrab 后端 - 只截取选区，省去全屏截图和裁剪"""
+
+    name = 'imagegrab'
+
+    def __init__(self):
+        from PIL import ImageGrab
+        self._image_grab = ImageGrab
+
+    def grab(self, region):
+        x, y, width, height = region
+        img = self._image_grab.grab(bbox=(x, y, x + width, y + height), all_screens=True)
+        return img if img.mode == 'RGB' else img.convert('RGB')
+
+
+class MSSCaptureBackend(CaptureBackend):
+    """mss 后端 - 每个线程复用一个持久会话，只截取选区（Windows 下为 BitBlt，Linux 下为 XShm）"""
+
+    name = 'mss'
+
+    def __init__(self):
+        if not mss.is_available():
+            raise ImportError("mss 库未安装")
+        self._mss = mss.mss  # 在这里完成导入，导入失败时 'auto' 会换用下一个后端
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    def _session(self):
+        # mss 会话绑定创建它的线程，因此每个线程各自创建并复用
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._mss()
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def grab(self, region):
+        x, y, width, height = region
+        shot = self._session().grab({'left': x, 'top': y, 'width': width, 'height': height})
+        return Image.frombytes('RGB', shot.size, shot.bgra, 'raw', 'BGRX')
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            try:
+                session.close()
+            except Exception:
+                pass
+
+
+# 按优先级排列的截图后端，'auto' 时依次尝试
+CAPTURE_BACKENDS = {
+    'mss': MSSCaptureBackend,
+    'imagegrab': ImageGrabCaptureBackend,
+    'pyautogui': PyAutoGUICaptureBackend,
+}
+
+
+def create_capture_backend(name='auto'):
+    """
+    创建截图后端
+    :param name: 后端名称，'auto' 表示按优先级选择第一个可用的后端
+    """
+    names = list(CAPTURE_BACKENDS) if name == 'auto' else [name]
+    for backend_name in names:
+        try:
+            backend = CAPTURE_BACKENDS[backend_name]()
+            print(f"[截图后端] 使用 {backend.name}")
+            return backend
+        except Exception as e:
+            print(f"[截图后端] {backend_name} 不可用: {e}")
+    return PyAutoGUICaptureBackend()
+
+
+class FrameComparator:
+    """帧对比引擎 - 直接在图片像素缓冲区上计算帧差异和相似度"""
+
+    def __init__(self, fast_mode=False, sample_step=4):
+        """
+        :param fast_mode: 快速模式，先按 sample_step 隔行隔列采样再对比
+        :param sample_step: 快速模式下的采样间隔（像素）
+        """
+        self.fast_mode = fast_mode
+        self.sample_step = max(1, int(sample_step))
+
+    def _prepare(self, img):
+        """统一为 RGB 模式，快速模式下在 C 层做最近邻降采样（只读取采样到的像素）"""
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        if self.fast_mode and self.sample_step > 1:
+            width = max(1, img.width // self.sample_step)
+            height = max(1, img.height // self.sample_step)
+            try:
+                nearest = Image.Resampling.NEAREST
+            except AttributeError:
+                nearest = Image.NEAREST
+            img = img.resize((width, height), nearest)
+        return img
+
+    def compare(self, img1, img2, with_difference=True):
+        """
+        对比两张图片
+        :param with_difference: 是否同时计算差异度（只需要相似度时传 False 可省去一半开销）
+        :return: (相似度, 差异度)，相似度为完全相同的像素占比（0-1），
+                 差异度为所有通道的平均绝对差（0-1）；尺寸不同时返回 (0.0, 1.0)
+        """
+        if img1.size != img2.size:
+            return 0.0, 1.0
+
+        img1 = self._prepare(img1)
+        img2 = self._prepare(img2)
+
+        if np is not None:
+            return self._compare_numpy(img1, img2, with_difference)
+        return self._compare_pillow(img1, img2, with_difference)
+
+    def similarity(self, img1, img2):
+        """计算相似度（完全相同的像素占比）"""
+        return self.compare(img1, img2, with_difference=False)[0]
 
     @staticmethod
-    def stitch_simple(images):
+    def _compare_numpy(img1, img2, with_difference):
+        """NumPy 实现：整帧向量化对比，不产生任何 Python 级像素对象"""
+        a = np.asarray(img1)
+        b = np.asarray(img2)
+        total = a.shape[0] * a.shape[1]
+        if total == 0:
+            return 1.0, 0.0
+
+        if with_difference:
+            diff = np.maximum(a, b)
+            diff -= np.minimum(a, b)
+            channels = diff.reshape(-1, 3)
+        else:
+            diff = None
+            channels = np.not_equal(a, b).reshape(-1, 3)
+
+        # 按通道做按位或，比在长度为 3 的轴上调用 any() 快一个数量级
+        changed = channels[:, 0] | channels[:, 1] | channels[:, 2]
+        similarity = 1.0 - int(np.count_nonzero(changed)) / total
+
+        difference = 0.0
+        if diff is not None:
+            channel_sum = int(np.add.reduce(diff.reshape(-1), dtype=np.uint64))
+            difference = channel_sum / (total * 3) / 255.0
+        return similarity, difference
+
+    @staticmethod
+    def _compare_pillow(img1, img2, with_difference):
+        """未安装 NumPy 时的回退实现：用 ImageChops 在 C 层求差，再用直方图统计"""
+        diff = ImageChops.difference(img1, img2)
+        total = img1.width * img1.height
+        if total == 0:
+            return 1.0, 0.0
+
+        # 每个像素取三个通道差值的最大值，为 0 即表示该像素完全相同
+        r, g, b = diff.split()
+        max_diff = ImageChops.lighter(ImageChops.lighter(r, g), b)
+        similarity = max_diff.histogram()[0] / total
+        if not with_difference:
+            return similarity, 0.0
+
+        channel_sum = 0
+        for band in (r, g, b):
+            histogram = band.histogram()
+            channel_sum += sum(value * count for value, count in enumerate(histogram))
+        difference = channel_sum / (total * 3) / 255.0
+        return similarity, difference
+
+
+class OverlapMatcher:
+    """重叠检测器 - 用行哈希找出相邻两帧之间的真实滚动距离"""
+
+    def __init__(self, min_overlap=16, match_threshold=0.95, anchor_rows=16, sticky_min_rows=4):
         """
-        简单拼接算法：直接垂直拼接所有图片
-        不需要任何重叠检测，因为每张图片的滚动距离是固定的
+        :param min_overlap: 认定为重叠所需的最少重叠行数
+        :param match_threshold: 重叠区内有效行的最低匹配率
+        :param anchor_rows: 用于生成候选偏移的锚点行数（取自当前帧顶部）
+        :param sticky_min_rows: 认定为固定表头/底栏所需的最少相同有效行数
         """
-        if not images:
+        self.min_overlap = min_overlap
+        self.match_threshold = match_threshold
+        self.anchor_rows = anchor_rows
+        self.sticky_min_rows = sticky_min_rows
+
+    @staticmethod
+    def row_hashes(img):
+        """
+        计算每一行像素的哈希值
+        :return: 哈希列表，纯色行（空白、分隔线）无法用来定位，记为 None
+        """
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        return OverlapMatcher.hash_rows(img.tobytes(), img.width)
+
+    @staticmethod
+    def hash_rows(data, width):
+        """对 RGB 原始字节逐行计算哈希（供已经取得像素字节的调用方复用）"""
+        stride = width * 3
+        hashes = []
+        for offset in range(0, len(data), stride):
+            row = data[offset:offset + stride]
+            if row == row[:3] * width:
+                hashes.append(None)
+            else:
+                hashes.append(hash(row))
+        return hashes
+
+    def sticky_bands(self, prev_data, cur_data, width, cur_hashes):
+        """
+        检测相邻两帧顶部和底部位置不变的行（固定表头、工具栏、底栏）
+        逐行比较原始像素，表头下方的纯色留白也能算进固定区域
+        :param prev_data: 前一帧的 RGB 原始字节
+        :param cur_data: 当前帧的 RGB 原始字节
+        :param cur_hashes: 当前帧的行哈希（用于统计有效行数）
+        :return: (表头行数, 底栏行数)；两帧完全相同（没有滚动）时无法判断，返回 None
+        """
+        if len(prev_data) != len(cur_data) or prev_data == cur_data:
             return None
 
-        # 计算总尺寸
-        total_width = images[0].width
-        total_height = sum(img.height for img in images)
+        height = len(cur_hashes)
+        header = self._sticky_run(prev_data, cur_data, width, cur_hashes, range(height))
+        footer = self._sticky_run(prev_data, cur_data, width, cur_hashes, range(height - 1, -1, -1))
+        # 固定区域占满选区时剩下的内容不足以匹配，按没有固定区域处理
+        if header + footer > height - self.min_overlap:
+            return 0, 0
+        return header, footer
+
+    def _sticky_run(self, prev_data, cur_data, width, cur_hashes, rows):
+        """按 rows 顺序统计两帧相同的连续行数，其中有效行（非纯色行）太少时视为没有固定区域"""
+        stride = width * 3
+        prev_view = memoryview(prev_data)
+        cur_view = memoryview(cur_data)
+        length = 0
+        informative = 0
+        for index in rows:
+            offset = index * stride
+            if prev_view[offset:offset + stride] != cur_view[offset:offset + stride]:
+                break
+            length += 1
+            if cur_hashes[index] is not None:
+                informative += 1
+        return length if informative >= self.sticky_min_rows else 0
+
+    def find_scroll(self, prev_hashes, cur_hashes):
+        """
+        计算当前帧相对前一帧向下滚动的行数 s，满足 prev[s + i] == cur[i]
+        :return: 滚动行数（0 表示未滚动），找不到可靠重叠时返回 None
+        """
+        height = len(cur_hashes)
+        if height == 0 or len(prev_hashes) != height:
+            return None
 
-        # 创建空白画布
-        result = Image.new('RGB', (total_width, total_height))
+        # 前一帧每个哈希值出现的位置
+        positions = {}
+        for index, value in enumerate(prev_hashes):
+            if value is not None:
+                positions.setdefault(value, []).append(index)
+
+        # 用当前帧顶部的锚点行生成候选偏移
+        candidates = set()
+        anchors = 0
+        for index, value in enumerate(cur_hashes):
+            if value is None:
+                continue
+            for position in positions.get(value, ()):
+                scroll = position - index
+                if 0 <= scroll <= height - self.min_overlap:
+                    candidates.add(scroll)
+            anchors += 1
+            if anchors >= self.anchor_rows:
+                break
+
+        # 候选偏移较多（重复内容多）时才值得把哈希列表转成数组做向量化统计
+        if np is not None and len(candidates) > 8:
+            counter = self._numpy_counter(prev_hashes, cur_hashes)
+        else:
+            counter = lambda scroll: self._count_matches(prev_hashes, cur_hashes, scroll)
+
+        best_scroll = None
+        best_matches = 0
+        for scroll in sorted(candidates):
+            matches, informative = counter(scroll)
+            if informative == 0 or matches / informative < self.match_threshold:
+                continue
+            # 匹配行数相同时优先取重叠更多（滚动更少）的偏移
+            if matches > best_matches:
+                best_scroll = scroll
+                best_matches = matches
+        return best_scroll
 
-        # 拼接所有图片
-        y_offset = 0
-        for img in images:
-            result.paste(img, (0, y_offset))
-            y_offset += img.height
+    @staticmethod
+    def _numpy_counter(prev_hashes, cur_hashes):
+        """把哈希列表转成数组，返回按偏移统计匹配行数的向量化函数"""
+        prev = np.array([0 if value is None else value for value in prev_hashes], dtype=np.int64)
+        cur = np.array([0 if value is None else value for value in cur_hashes], dtype=np.int64)
+        informative = np.array([value is not None for value in cur_hashes], dtype=bool)
+        informative_before = np.concatenate(([0], np.cumsum(informative)))
 
-        return result
+        def counter(scroll):
+            overlap = len(cur) - scroll
+            equal = np.equal(prev[scroll:], cur[:overlap])
+            equal &= informative[:overlap]
+            return int(np.count_nonzero(equal)), int(informative_before[overlap])
+
+        return counter
 
     @staticmethod
-    def stitch_grid(images, max_columns=2, gap=10, bg_color=(255, 255, 255)):
+    def _count_matches(prev_hashes, cur_hashes, scroll):
+        """统计偏移为 scroll 时重叠区内的匹配行数和有效行数"""
+        overlap = len(cur_hashes) - scroll
+        matches = 0
+        informative = 0
+        for index in range(overlap):
+            value = cur_hashes[index]
+            if value is None:
+                continue
+            informative += 1
+            if prev_hashes[index + scroll] == value:
+                matches += 1
+        return matches, informative
+
+
+class FrameFingerprint:
+    """
+    帧指纹 - 截图后计算一次原始字节、行哈希和整帧摘要
+    去重、到底检测、重叠检测都复用这份结果，不再逐像素对比
+    """
+
+    def __init__(self, img):
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        self.image = img
+        self.size = img.size
+        self.data = img.tobytes()
+        self.row_hashes = OverlapMatcher.hash_rows(self.data, img.width)
+        self.digest = hash(self.data)
+
+    @property
+    def width(self):
+        return self.size[0]
+
+    @property
+    def height(self):
+        return self.size[1]
+
+    def similarity(self, other, header=0, footer=0):
         """
-        网格拼接算法：将图片按网格布局拼接
-        :param images: 图片列表
-        :param max_columns: 最大列数（默认2列）
-        :param gap: 图片之间的间距（像素）
+        同一位置行哈希相同的比例（跳过两帧都是纯色的行）
+        滚动哪怕一行，有内容的行都会错位，所以该值接近 1 只说明页面没有滚动
+        :param header: 跳过顶部的行数（固定表头）
+        :param footer: 跳过底部的行数（固定底栏）
+        :return: 0-1，尺寸不同时为 0
+        """
+        if other.size != self.size:
+            return 0.0
+        if other.digest == self.digest:
+            return 1.0
+
+        end = len(self.row_hashes) - footer
+        matches = 0
+        informative = 0
+        for value, other_value in zip(self.row_hashes[header:end], other.row_hashes[header:end]):
+            if value is None and other_value is None:
+                continue
+            informative += 1
+            if value == other_value:
+                matches += 1
+        return matches / informative if informative else 1.0
+
+
+def frames_unchanged(prev_frame, frame, threshold=0.90, sticky_bands=(0, 0), comparator=None):
+    """
+    判断当前帧与上一帧是否相同（页面没有滚动，连续多次即认为到底）
+    两者都是 FrameFingerprint 时只比较行哈希，否则用 comparator 逐像素对比
+    :param sticky_bands: (表头行数, 底栏行数)，固定区域不参与比较
+    :return: (是否相同, 相似度)
+    """
+    header, footer = sticky_bands
+    if isinstance(prev_frame, FrameFingerprint) and isinstance(frame, FrameFingerprint):
+        similarity = prev_frame.similarity(frame, header, footer)
+    else:
+        if (header or footer) and prev_frame.size == frame.size:
+            body = (0, header, frame.width, frame.height - footer)
+            prev_frame = prev_frame.crop(body)
+            frame = frame.crop(body)
+        # 尺寸不同时相似度为 0
+        similarity = (comparator or FrameComparator()).similarity(prev_frame, frame)
+    return similarity >= threshold, similarity
+
+
+def _png_scanlines(strip, stride):
+    """每行前加过滤类型 0（不过滤），截图中大片纯色区域直接交给 zlib 压缩效果更好"""
+    view = memoryview(strip)
+    return b''.join(
+        b'\x00' + view[offset:offset + stride]
+        for offset in range(0, len(strip) - stride + 1, stride)
+    )
+
+
+def _deflate_png_strip(strip, stride, compress_level, last):
+    """
+    把一个条带独立压缩为原始 deflate 数据块（供并行编码使用）
+    非最后一块以 Z_SYNC_FLUSH 结束并按字节对齐，多块直接拼接即为一个完整的 deflate 流
+    :return: (压缩数据, 未压缩数据的 adler32, 未压缩数据长度)
+    """
+    payload = _png_scanlines(strip, stride)
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+    data = compressor.compress(payload)
+    data += compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    return data, zlib.adler32(payload), len(payload)
+
+
+def _adler32_combine(adler1, adler2, length2):
+    """合并两段数据的 adler32 校验值（zlib 的 adler32_combine，Python 标准库未提供）"""
+    base = 65521
+    remainder = length2 % base
+    sum1 = adler1 & 0xffff
+    sum2 = (remainder * sum1) % base
+    sum1 += (adler2 & 0xffff) + base - 1
+    sum2 += ((adler1 >> 16) & 0xffff) + ((adler2 >> 16) & 0xffff) + base - remainder
+    if sum1 >= base:
+        sum1 -= base
+    if sum1 >= base:
+        sum1 -= base
+    if sum2 >= (base << 1):
+        sum2 -= (base << 1)
+    if sum2 >= base:
+        sum2 -= base
+    return sum1 | (sum2 << 16)
+
+
+def write_png_strips(fp, width, height, strips, compress_level=6, executor=None):
+    """
+    流式写出 PNG：逐条带压缩写入，不需要完整位图
+    :param fp: 已以二进制写模式打开的文件对象
+    :param strips: 依次产生 RGB 原始字节（整行）的可迭代对象
+    :param executor: 线程池；提供时各条带并行压缩，再按顺序拼接成一个 zlib 流
+    """
+    def write_chunk(chunk_type, data):
+        fp.write(struct.pack('>I', len(data)))
+        fp.write(chunk_type)
+        fp.write(data)
+        fp.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type)) & 0xffffffff))
+
+    fp.write(b'\x89PNG\r\n\x1a\n')
+    # 8 位深度，颜色类型 2（RGB）
+    write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    stride = width * 3
+    if executor is None:
+        compressor = zlib.compressobj(compress_level)
+        for strip in strips:
+            data = compressor.compress(_png_scanlines(strip, stride))
+            if data:
+                write_chunk(b'IDAT', data)
+        write_chunk(b'IDAT', compressor.flush())
+        write_chunk(b'IEND', b'')
+        return
+
+    # 并行：zlib 压缩时会释放 GIL，线程池即可占满多核
+    # 最多预先提交 workers * 2 个条带，限制同时驻留内存的条带数
+    max_pending = getattr(executor, '_max_workers', 4) * 2
+    pending = []
+    adler = 1
+    # zlib 头：deflate，32K 窗口，默认压缩级别标记
+    write_chunk(b'IDAT', b'\x78\x9c')
+
+    def write_finished(future):
+        nonlocal adler
+        data, strip_adler, length = future.result()
+        adler = _adler32_combine(adler, strip_adler, length)
+        if data:
+            write_chunk(b'IDAT', data)
+
+    strips = iter(strips)
+    strip = next(strips, None)
+    while strip is not None:
+        following = next(strips, None)
+        pending.append(executor.submit(
+            _deflate_png_strip, strip, stride, compress_level, following is None
+        ))
+        if len(pending) >= max_pending:
+            write_finished(pending.pop(0))
+        strip = following
+    for future in pending:
+        write_finished(future)
+
+    write_chunk(b'IDAT', struct.pack('>I', adler & 0xffffffff))
+    write_chunk(b'IEND', b'')
+
+
+class MemoryCanvas:
+    """内存画布 - 在一个连续的 RGB 缓冲区中追加行"""
+
+    def __init__(self, width):
+        self.width = width
+        self.height = 0
+        self._buffer = bytearray()
+        self._image = None
+
+    @property
+    def nbytes(self):
+        """当前占用的像素字节数"""
+        return len(self._buffer)
+
+    def append_rows(self, data):
+        """追加若干行 RGB 原始字节"""
+        if self._image is not None:
+            raise RuntimeError("画布已生成结果图片，不能再追加")
+        self._buffer += data
+        self.height = len(self._buffer) // (self.width * 3)
+
+    def take_buffer(self):
+        """取出并清空缓冲区（转存到磁盘画布时使用）"""
+        data = self._buffer
+        self._buffer = bytearray()
+        self.height = 0
+        return data
+
+    def to_image(self):
+        """生成结果图片（Pillow 会复制一次数据，随后释放缓冲区）"""
+        if self._image is None and self.height > 0:
+            self._image = Image.frombuffer(
+                'RGB', (self.width, self.height), self._buffer, 'raw', 'RGB', 0, 1
+            )
+            self._buffer = bytearray()
+        return self._image
+
+    def iter_strips(self, strip_height=512):
+        """按条带依次产生 RGB 原始字节"""
+        image = self.to_image()
+        for top in range(0, self.height, strip_height):
+            bottom = min(top + strip_height, self.height)
+            yield image.crop((0, top, self.width, bottom)).tobytes()
+
+    def save(self, path, format='PNG', **options):
+        """保存结果图片"""
+        self.to_image().save(path, format=format, **options)
+
+    def close(self):
+        self._buffer = bytearray()
+        self._image = None
+
+
+class TiledCanvas:
+    """磁盘分块画布 - 按固定高度的条带把行写入临时文件，读取时通过内存映射，不占用进程内存"""
+
+    # JPEG 格式的最大边长
+    JPEG_MAX_SIZE = 65535
+
+    def __init__(self, width, strip_height=512, temp_dir=None):
+        """
+        :param strip_height: 每个条带的行数，写满一个条带才落盘
+        :param temp_dir: 临时文件目录，默认使用系统临时目录
+        """
+        self.width = width
+        self.height = 0
+        self.strip_height = strip_height
+        self.strip_count = 0
+        # 以 RGBX（每像素 4 字节）存储，Pillow 可以直接映射而不复制
+        self._row_bytes = width * 4
+        self._file = tempfile.TemporaryFile(prefix='long_screenshot_', dir=temp_dir)
+        self._pending = bytearray()
+        self._mmap = None
+
+    @property
+    def nbytes(self):
+        """当前占用的进程内存字节数（仅未写满的条带）"""
+        return len(self._pending)
+
+    def append_rows(self, data):
+        """追加若干行 RGB 原始字节"""
+        if self._mmap is not None:
+            raise RuntimeError("画布已生成结果图片，不能再追加")
+        rows = len(data) // (self.width * 3)
+        if rows == 0:
+            return
+
+        rgbx = Image.frombuffer('RGB', (self.width, rows), data, 'raw', 'RGB', 0, 1).convert('RGBX')
+        self._pending += rgbx.tobytes()
+        self.height += rows
+
+        strip_bytes = self.strip_height * self._row_bytes
+        while len(self._pending) >= strip_bytes:
+            self._file.write(memoryview(self._pending)[:strip_bytes])
+            del self._pending[:strip_bytes]
+            self.strip_count += 1
+
+    def finish(self):
+        """写出最后一个未满的条带并建立只读内存映射"""
+        if self._mmap is None and self.height > 0:
+            if self._pending:
+                self._file.write(self._pending)
+                self._pending = bytearray()
+                self.strip_count += 1
+            self._file.flush()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def to_image(self):
+        """返回映射到磁盘文件的 RGBX 图片（只读，不复制像素）"""
+        if self.finish() is None:
+            return None
+        return Image.frombuffer(
+            'RGBX', (self.width, self.height), self._mmap, 'raw', 'RGBX', 0, 1
+        )
+
+    def iter_strips(self, strip_height=None):
+        """按条带依次从磁盘读取并产生 RGB 原始字节"""
+        if self.finish() is None:
+            return
+        strip_height = strip_height or self.strip_height
+        for top in range(0, self.height, strip_height):
+            rows = min(strip_height, self.height - top)
+            start = top * self._row_bytes
+            chunk = self._mmap[start:start + rows * self._row_bytes]
+            strip = Image.frombuffer('RGBX', (self.width, rows), chunk, 'raw', 'RGBX', 0, 1)
+            yield strip.convert('RGB').tobytes()
+
+    def save(self, path, format='PNG', **options):
+        """
+        保存结果：PNG 逐条带流式压缩写出；JPEG 由 Pillow 直接从内存映射读取编码
+        """
+        if format.upper() in ('JPEG', 'JPG'):
+            if max(self.width, self.height) > self.JPEG_MAX_SIZE:
+                raise ValueError(f"图片高度 {self.height}px 超过 JPEG 上限 {self.JPEG_MAX_SIZE}px，请保存为 PNG")
+            self.to_image().save(path, format='JPEG', **options)
+            return
+
+        compress_level = options.get('compress_level', 6)
+        if hasattr(path, 'write'):
+            write_png_strips(path, self.width, self.height, self.iter_strips(), compress_level)
+        else:
+            with open(path, 'wb') as f:
+                write_png_strips(f, self.width, self.height, self.iter_strips(), compress_level)
+
+    def close(self):
+        """删除临时文件；仍有图片引用映射时留给垃圾回收处理"""
+        try:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._file.close()
+        except BufferError:
+            pass
+
+
+# 导出预设：速度 ↔ 体积（PNG 压缩级别、JPEG 质量和色度子采样）
+EXPORT_PRESETS = {
+    'fast': {'compress_level': 1, 'quality': 100, 'subsampling': 0},
+    'balanced': {'compress_level': 6, 'quality': 95, 'subsampling': 0},
+    'small': {'compress_level': 9, 'quality': 85, 'subsampling': 2},
+}
+
+
+class _TeeWriter:
+    """把写入的数据同时写给多个文件对象（边编码边输出，同时留一份做缓存）"""
+
+    def __init__(self, *targets):
+        self.targets = targets
+
+    def write(self, data):
+        for target in self.targets:
+            target.write(data)
+        return len(data)
+
+    def flush(self):
+        for target in self.targets:
+            if hasattr(target, 'flush'):
+                target.flush()
+
+
+class ImageExporter:
+    """
+    导出管线 - PNG 按条带在线程池中并行压缩并流式拼接成一个文件；
+    编码结果按格式缓存，保存文件和复制到剪贴板共用同一份编码数据
+    """
+
+    # BITMAPINFOHEADER：24 位、无压缩
+    DIB_HEADER = struct.Struct('<IiiHHIIiiII')
+
+    def __init__(self, preset='fast', workers=None, strip_height=256):
+        """
+        :param preset: EXPORT_PRESETS 中的预设名称
+        :param workers: 并行压缩的线程数，默认取 CPU 核数（最多 8）
+        :param strip_height: 每个并行压缩条带的行数
+        """
+        self.preset = preset
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.strip_height = strip_height
+        self.profiler = None  # CaptureProfiler，设置后记录编码耗时
+        self._source = None
+        self._cache = {}
+
+    @property
+    def options(self):
+        return EXPORT_PRESETS.get(self.preset, EXPORT_PRESETS['fast'])
+
+    @property
+    def source(self):
+        return self._source
+
+    def set_source(self, source):
+        """设置要导出的图片或画布；来源变化时清空编码缓存"""
+        if source is not self._source:
+            self._source = source
+            self._cache = {}
+
+    def set_preset(self, preset):
+        """切换预设（各预设的编码结果分别缓存）"""
+        self.preset = preset
+
+    def encode(self, format='PNG', fp=None):
+        """
+        编码为指定格式并缓存，返回编码后的字节
+        :param fp: 同时把数据边编码边写入该文件对象（如剪贴板工具的管道），已有缓存时直接写入缓存
+        """
+        source = self._source
+        if source is None:
+            raise ValueError("没有可导出的图片")
+
+        key = (format, self.preset)
+        data = self._cache.get(key)
+        if data is not None:
+            if fp is not None:
+                fp.write(data)
+            return data
+
+        start_time = time.perf_counter()
+        buffer = io.BytesIO()
+        self._write(buffer if fp is None else _TeeWriter(buffer, fp), format)
+        data = buffer.getvalue()
+        # 可能在后台线程编码，期间来源已经变化时不缓存
+        if self._source is source:
+            self._cache[key] = data
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        print(f"[导出] {format} ({self.preset}) 编码 {len(data) / 1024 / 1024:.1f}MB，耗时 {elapsed_ms:.0f}ms")
+        if self.profiler is not None:
+            self.profiler.record_event('encode', elapsed_ms, format=format, preset=self.preset, bytes=len(data))
+        return data
+
+    def cached(self, format='PNG'):
+        """已缓存的编码结果，没有时返回 None（不触发编码）"""
+        return self._cache.get((format, self.preset))
+
+    def dib(self):
+        """
+        剪贴板 CF_DIB 数据：BITMAPINFOHEADER + 自下而上、每行按 4 字节对齐的 BGR 像素，按来源缓存
+        按条带直接从像素转换写入预先分配的缓冲区，不经过 PNG 编码，也不生成整图的中间副本
+        :return: 缓冲区的 memoryview（交给剪贴板时不再复制）
+        """
+        source = self._source
+        if source is None:
+            raise ValueError("没有可导出的图片")
+
+        key = ('DIB', None)
+        if key not in self._cache:
+            start_time = time.perf_counter()
+            image = source.to_image() if hasattr(source, 'to_image') else source
+            if image.mode not in ('RGB', 'RGBX', 'RGBA'):
+                image = image.convert('RGB')
+            width, height = image.size
+            stride = (width * 3 + 3) & ~3
+            buffer = bytearray(self.DIB_HEADER.size + stride * height)
+            self.DIB_HEADER.pack_into(buffer, 0, self.DIB_HEADER.size, width, height, 1, 24, 0,
+                                      stride * height, 0, 0, 0, 0)
+            view = memoryview(buffer)
+            for top in range(0, height, self.strip_height):
+                bottom = min(top + self.strip_height, height)
+                # 条带内上下翻转，条带本身按从下到上的顺序放置
+                offset = self.DIB_HEADER.size + (height - bottom) * stride
+                view[offset:offset + (bottom - top) * stride] = image.crop((0, top, width, bottom)).tobytes(
+                    'raw', ('BGR', stride, -1))
+            if self._source is source:
+                self._cache[key] = buffer
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+            print(f"[导出] DIB 转换 {len(buffer) / 1024 / 1024:.1f}MB，耗时 {elapsed_ms:.0f}ms")
+            if self.profiler is not None:
+                self.profiler.record_event('encode', elapsed_ms, format='DIB', bytes=len(buffer))
+            return memoryview(buffer)
+        return memoryview(self._cache[key])
+
+    def save(self, path, format='PNG'):
+        """保存到文件：条带压缩完成即写入磁盘，同时留一份编码结果给剪贴板；已有缓存时直接写入缓存"""
+        try:
+            with open(path, 'wb') as f:
+                self.encode(format, fp=f)
+        except BaseException:
+            # 编码失败时不留下不完整的文件
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+
+    def _write(self, fp, format):
+        options = self.options
+        if format == 'JPEG':
+            # JPEG 是单一的熵编码流，无法按条带拼接，直接交给 Pillow 的 C 编码器
+            self._source.save(fp, format='JPEG', quality=options['quality'],
+                              subsampling=options['subsampling'], optimize=False)
+            return
+
+        width, height, strips = self._strips()
+        if self.workers > 1:
+            with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+                write_png_strips(fp, width, height, strips, options['compress_level'], executor)
+        else:
+            write_png_strips(fp, width, height, strips, options['compress_level'])
+
+    def _strips(self):
+        """返回 (宽, 高, 条带迭代器)，画布直接按条带读取，图片按条带裁剪"""
+        source = self._source
+        if hasattr(source, 'iter_strips'):
+            return source.width, source.height, source.iter_strips(self.strip_height)
+
+        image = source if source.mode == 'RGB' else source.convert('RGB')
+
+        def crop_strips():
+            for top in range(0, image.height, self.strip_height):
+                bottom = min(top + self.strip_height, image.height)
+                yield image.crop((0, top, image.width, bottom)).tobytes()
+
+        return image.width, image.height, crop_strips()
+
+
+class ClipboardExporter:
+    """
+    剪贴板导出 - 与保存文件共用 ImageExporter 的来源和编码缓存，结果不变时重复复制不再重新编码
+    Windows：放入由像素直接转换的 CF_DIB（已经编码过 PNG 时一并放入），不为复制编码 PNG
+    macOS：osascript 读取缓存的 PNG 文件（同一结果只写一次临时文件）
+    Linux：后台线程把 PNG 边编码边通过管道交给 wl-copy/xclip，由它们响应粘贴请求，界面不等待
+    """
+
+    def __init__(self, exporter):
+        self.exporter = exporter
+        self._temp_source = None
+        self._temp_path = None
+
+    def copy(self, on_done):
+        """
+        复制当前结果
+        :param on_done: 完成后回调 (错误或 None, 使用的格式说明)；macOS/Linux 在后台线程调用
+        """
+        import platform
+
+        system = platform.system()
+        if system == 'Windows':
+            try:
+                on_done(None, self._copy_windows())
+                return
+            except ImportError:
+                print("[警告] win32clipboard 未安装，改为复制文件路径")
+            except Exception as e:
+                on_done(e, None)
+                return
+            target = self._copy_file_path
+        elif system == 'Darwin':
+            target = self._copy_macos
+        else:
+            target = self._copy_linux
+
+        def worker():
+            try:
+                method = target()
+            except Exception as e:
+                print(f"[错误] 复制图片失败: {e}")
+                on_done(e, None)
+            else:
+                on_done(None, method)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _copy_windows(self):
+        """CF_DIB 与 PNG 都直接从缓存的缓冲区交给剪贴板（必须在主线程调用）"""
+        import win32clipboard
+        import win32con
+
+        dib = self.exporter.dib()
+        png_bytes = self.exporter.cached('PNG')
+        win32clipboard.OpenClipboard()
+        try:
+            win32clipboard.EmptyClipboard()
+            win32clipboard.SetClipboardData(win32con.CF_DIB, dib)
+            if png_bytes is not None:
+                # 无损 PNG 格式（支持的应用优先使用），只在保存过时顺带放入
+                win32clipboard.SetClipboardData(win32clipboard.RegisterClipboardFormat("PNG"), png_bytes)
+        finally:
+            win32clipboard.CloseClipboard()
+        method = "CF_DIB + PNG" if png_bytes is not None else "CF_DIB"
+        print(f"[剪贴板] 已复制（{method}）")
+        return method
+
+    def _copy_macos(self):
+        import subprocess
+
+        path = self.temp_png()
+        subprocess.run(['osascript', '-e', f'set the clipboard to (read (POSIX file "{path}") as «class PNGf»)'],
+                       check=True)
+        return "PNG"
+
+    def _copy_linux(self):
+        """把 PNG 流式写给剪贴板工具；都不可用时复制临时文件路径"""
+        import subprocess
+
+        if os.environ.get('WAYLAND_DISPLAY') and shutil.which('wl-copy'):
+            command = ['wl-copy', '--type', 'image/png']
+        elif shutil.which('xclip'):
+            command = ['xclip', '-selection', 'clipboard', '-t', 'image/png', '-i']
+        else:
+            return self._copy_file_path()
+
+        process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        try:
+            self.exporter.encode('PNG', fp=process.stdin)
+        finally:
+            process.stdin.close()
+        # 工具读完输入后转入后台继续提供剪贴板内容，前台进程随即退出
+        if process.wait(timeout=30) != 0:
+            raise RuntimeError(f"{command[0]} 退出码 {process.returncode}")
+        print(f"[剪贴板] 已通过 {command[0]} 复制")
+        return f"PNG ({command[0]})"
+
+    def _copy_file_path(self):
+        pyperclip.copy(f"file://{self.temp_png()}")
+        return "file://"
+
+    def temp_png(self):
+        """缓存 PNG 对应的临时文件，结果变化时重新写入"""
+        source = self.exporter.source
+        if self._temp_path is None or self._temp_source is not source:
+            self.close()
+            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
+                self.exporter.encode('PNG', fp=tmp)
+                self._temp_path = tmp.name
+            self._temp_source = source
+        return self._temp_path
+
+    def close(self):
+        """删除临时文件"""
+        if self._temp_path is not None:
+            try:
+                os.remove(self._temp_path)
+            except OSError:
+                pass
+            self._temp_path = None
+            self._temp_source = None
+
+
+class FrameStore:
+    """
+    帧存储 - 按内存预算保存录制帧
+    最近的帧保持原始格式；较旧的帧由后台线程快速压缩；压缩后仍超出预算时转存到临时目录
+    读取时自动解压，对调用方表现为普通的图片列表
+    """
+
+    RAW = 'raw'
+    COMPRESSED = 'compressed'
+    SPILLED = 'spilled'
+
+    def __init__(self, memory_budget=512 * 1024 * 1024, raw_frames=4, compress_level=1, temp_dir=None):
+        """
+        :param memory_budget: 帧数据的内存预算（字节）
+        :param raw_frames: 保持原始格式的最近帧数量
+        :param compress_level: zlib 压缩级别（1 最快）
+        :param temp_dir: 转存目录的父目录，默认使用系统临时目录
+        """
+        self.memory_budget = memory_budget
+        self.raw_frames = raw_frames
+        self.compress_level = compress_level
+        self.temp_dir = temp_dir
+
+        # 每一帧记录为 [状态, 数据, 尺寸, 模式, 占用字节]
+        self._entries = []
+        self._memory = 0
+        self._spill_dir = None
+        self._lock = threading.Lock()
+        self._tasks = queue.Queue()
+        self._worker = None
+
+    @property
+    def memory_usage(self):
+        """当前帧数据占用的内存字节数"""
+        return self._memory
+
+    def __len__(self):
+        return len(self._entries)
+
+    def sizes(self):
+        """所有帧的尺寸（不需要解压帧数据）"""
+        with self._lock:
+            return [entry[2] for entry in self._entries]
+
+    def __iter__(self):
+        for index in range(len(self._entries)):
+            yield self[index]
+
+    def __getitem__(self, index):
+        with self._lock:
+            state, payload, size, mode, _ = self._entries[index]
+
+        if state == self.RAW:
+            return payload
+        if state == self.SPILLED:
+            with open(payload, 'rb') as f:
+                payload = f.read()
+        return Image.frombytes(mode, size, zlib.decompress(payload))
+
+    def append(self, img):
+        """追加一帧（可在录制线程调用，压缩和转存都在后台线程完成）"""
+        nbytes = len(img.getbands()) * img.width * img.height
+        with self._lock:
+            self._entries.append([self.RAW, img, img.size, img.mode, nbytes])
+            self._memory += nbytes
+            index = len(self._entries) - 1 - self.raw_frames
+
+        if index >= 0:
+            self._ensure_worker()
+            self._tasks.put(index)
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._worker_loop, daemon=True)
+            self._worker.start()
+
+    def _worker_loop(self):
+        """后台压缩线程"""
+        while True:
+            index = self._tasks.get()
+            if index is None:
+                break
+            try:
+                self._compress(index)
+                self._enforce_budget()
+            except Exception as e:
+                print(f"[帧存储] 压缩失败: {e}")
+
+    def _compress(self, index):
+        with self._lock:
+            if index >= len(self._entries) or self._entries[index][0] != self.RAW:
+                return
+            img = self._entries[index][1]
+
+        # 压缩时不持有锁，录制线程可以继续追加
+        payload = zlib.compress(img.tobytes(), self.compress_level)
+
+        with self._lock:
+            entry = self._entries[index] if index < len(self._entries) else None
+            if entry is None or entry[0] != self.RAW:
+                return
+            self._memory += len(payload) - entry[4]
+            entry[0], entry[1], entry[4] = self.COMPRESSED, payload, len(payload)
+
+    def _enforce_budget(self):
+        """内存超出预算时，从最旧的帧开始转存到磁盘"""
+        for index in range(len(self._entries)):
+            if self._memory <= self.memory_budget:
+                return
+            with self._lock:
+                entry = self._entries[index]
+                if entry[0] != self.COMPRESSED:
+                    continue
+                payload = entry[1]
+
+            path = os.path.join(self._get_spill_dir(), f"frame_{index:06d}.zlib")
+            with open(path, 'wb') as f:
+                f.write(payload)
+
+            with self._lock:
+                if entry[0] == self.COMPRESSED:
+                    self._memory -= entry[4]
+                    entry[0], entry[1], entry[4] = self.SPILLED, path, 0
+
+    def _get_spill_dir(self):
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='long_screenshot_frames_', dir=self.temp_dir)
+            print(f"[帧存储] 超出内存预算，转存到: {self._spill_dir}")
+        return self._spill_dir
+
+    def close(self):
+        """停止后台线程并删除转存文件"""
+        if self._worker is not None:
+            self._tasks.put(None)
+            self._worker.join(timeout=5)
+            self._worker = None
+        with self._lock:
+            self._entries = []
+            self._memory = 0
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+
+class FrameJournal:
+    """
+    帧日志 - 录制时由后台线程把每一帧（快速压缩的 PNG）和偏移写入会话目录
+    程序崩溃或过早停止后，可以继续录制（追加到同一会话）或用不同设置重新拼接，不必重新截图
+    会话目录中的 journal.jsonl 每行一条记录：session（录制参数，继续录制时追加一条）或 frame（帧文件、尺寸、滚动方向、偏移）
+    帧文件写完才追加对应记录，崩溃时最多丢失尚未写完的帧
+    """
+
+    MANIFEST = 'journal.jsonl'
+
+    def __init__(self, path, compress_level=1, queue_size=16):
+        """
+        打开（不存在时创建）会话目录，之后追加的帧接在已有的帧后面
+        :param compress_level: 帧 PNG 的压缩级别（1 最快）
+        :param queue_size: 等待写入的帧数上限，写盘跟不上时 append 会等待
+        """
+        self.path = path
+        self.compress_level = compress_level
+        os.makedirs(path, exist_ok=True)
+        self.session, records = self.read(path)
+        self.frame_count = len(records)
+        self._next_index = max((record['index'] for record in records), default=-1) + 1
+        self._manifest = open(os.path.join(path, self.MANIFEST), 'a', encoding='utf-8')
+        self._tasks = queue.Queue(maxsize=queue_size)
+        self._worker = None
+
+    @classmethod
+    def create(cls, root_dir, **session):
+        """在 root_dir 下新建以时间命名的会话，并记录录制参数"""
+        journal = cls(os.path.join(root_dir, datetime.now().strftime('%Y%m%d_%H%M%S_%f')))
+        journal.write_session(**session)
+        print(f"[帧日志] 新会话: {journal.path}")
+        return journal
+
+    def write_session(self, **session):
+        """追加一条录制参数记录（新建或继续录制时）"""
+        self._submit((None, None, dict(session, created=datetime.now().isoformat(timespec='seconds'))))
+        if not self.session:
+            self.session = session
+
+    def append(self, img, **meta):
+        """
+        追加一帧（可在工作线程调用，写盘在后台线程完成）
+        :param meta: 随帧记录的信息，如 move（滚动方向）、offset（垂直模式为新增行数，二维模式为帧的位置）
+        :return: 帧序号
+        """
+        index = self._next_index
+        self._next_index += 1
+        self.frame_count += 1
+        self._submit((index, img, {key: value for key, value in meta.items() if value is not None}))
+        return index
+
+    def _submit(self, task):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._write_loop, daemon=True)
+            self._worker.start()
+        self._tasks.put(task)
+
+    def _write_loop(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            index, img, meta = task
+            try:
+                if img is None:
+                    record = dict(meta, type='session')
+                else:
+                    filename = f'frame_{index:05d}.png'
+                    temp_path = os.path.join(self.path, filename + '.tmp')
+                    img.save(temp_path, format='PNG', compress_level=self.compress_level)
+                    os.replace(temp_path, os.path.join(self.path, filename))
+                    record = dict(meta, type='frame', index=index, file=filename, size=list(img.size))
+                self._manifest.write(json.dumps(record, ensure_ascii=False) + '\n')
+                self._manifest.flush()
+            except Exception as e:
+                print(f"[帧日志] 写入失败: {e}")
+
+    def close(self):
+        """等待所有帧写完并关闭日志"""
+        if self._worker is not None:
+            self._tasks.put(None)
+            self._worker.join()
+            self._worker = None
+        if not self._manifest.closed:
+            self._manifest.close()
+            print(f"[帧日志] 已保存 {self.frame_count} 帧: {self.path}")
+
+    @classmethod
+    def read(cls, path):
+        """
+        读取会话
+        :return: (第一条 session 记录, frame 记录列表)；忽略写到一半的行和缺失的帧文件
+        """
+        session = {}
+        records = []
+        manifest = os.path.join(path, cls.MANIFEST)
+        if not os.path.exists(manifest):
+            return session, records
+        with open(manifest, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('type') == 'session':
+                    session = session or record
+                elif record.get('type') == 'frame' and os.path.exists(os.path.join(path, record['file'])):
+                    records.append(record)
+        return session, records
+
+    @staticmethod
+    def load_frame(path, record):
+        """读取一帧图片"""
+        with Image.open(os.path.join(path, record['file'])) as img:
+            return img.convert('RGB')
+
+    @classmethod
+    def sessions(cls, root_dir):
+        """root_dir 下的所有会话目录（按创建时间从旧到新）"""
+        if not os.path.isdir(root_dir):
+            return []
+        names = sorted(name for name in os.listdir(root_dir)
+                       if os.path.exists(os.path.join(root_dir, name, cls.MANIFEST)))
+        return [os.path.join(root_dir, name) for name in names]
+
+    @classmethod
+    def prune(cls, root_dir, keep):
+        """只保留最近的 keep 个会话，删除更早的会话目录"""
+        for path in cls.sessions(root_dir)[:-keep] if keep > 0 else cls.sessions(root_dir):
+            shutil.rmtree(path, ignore_errors=True)
+            print(f"[帧日志] 已删除旧会话: {path}")
+
+
+class IncrementalStitcher:
+    """
+    增量拼接器 - 录制过程中逐帧拼接，只把新出现的行追加到输出缓冲区，帧用完即释放
+    选区内的固定表头/底栏只在重叠检测之外：表头只取第一帧的，底栏只取最后一帧的
+    """
+
+    def __init__(self, matcher=None, memory_limit=256 * 1024 * 1024, temp_dir=None):
+        """
+        :param memory_limit: 内存画布的字节上限，超过后转存到磁盘分块画布（None 表示不限制）
+        :param temp_dir: 磁盘画布的临时文件目录
+        """
+        self.matcher = matcher or OverlapMatcher()
+        self.memory_limit = memory_limit
+        self.temp_dir = temp_dir
+        self.width = None
+        self.frame_height = None
+        self.frame_count = 0
+        self.canvas = None
+        self.header = None  # 固定表头行数，None 表示还没有检测（需要两帧不同的帧）
+        self.footer = 0  # 固定底栏行数
+        self._prev_hashes = None
+        self._first_data = None  # 第一帧要等检测出底栏后才能写入（底栏只保留最后一帧的）
+        self._last_data = None  # 上一帧（检测固定区域用），结束时从中取底栏
+        self._result = None
+        self._lock = threading.Lock()
+
+    @property
+    def height(self):
+        """已拼接的总高度"""
+        return self.canvas.height if self.canvas is not None else 0
+
+    @property
+    def sticky_bands(self):
+        """(表头行数, 底栏行数)，尚未检测时为 (0, 0)"""
+        return self.header or 0, self.footer
+
+    def add_frame(self, img):
+        """
+        追加一帧（可在录制线程调用）
+        :param img: 图片或 FrameFingerprint（直接复用其中的原始字节和行哈希）
+        :return: 本帧新增的行数；结束拼接后或尺寸不符时返回 0
+        """
+        if not isinstance(img, FrameFingerprint):
+            img = FrameFingerprint(img)
+
+        with self._lock:
+            if self._result is not None:
+                return 0
+            if self.width is not None and img.size != (self.width, self.frame_height):
+                print(f"[增量拼接] 帧尺寸 {img.size} 与首帧 {(self.width, self.frame_height)} 不同，已跳过")
+                return 0
+
+            data = img.data
+            hashes = img.row_hashes
+            prev_hashes = self._prev_hashes
+            prev_data = self._last_data
+
+            # 下一帧只需要和本帧比较
+            self._prev_hashes = hashes
+            self._last_data = data
+            self.frame_count += 1
+
+            if prev_hashes is None:
+                self.width, self.frame_height = img.size
+                self.canvas = MemoryCanvas(img.width)
+                self._first_data = data
+                return 0
+
+            if self.header is None:
+                bands = self.matcher.sticky_bands(prev_data, data, img.width, hashes)
+                if bands is None:
+                    return 0  # 与上一帧完全相同，没有滚动
+                self.header, self.footer = bands
+                if self.header or self.footer:
+                    print(f"[增量拼接] 检测到固定表头 {self.header}px、底栏 {self.footer}px，不参与重叠检测")
+
+            # 只用表头和底栏之间的内容行做重叠检测
+            body_end = img.height - self.footer
+            scroll = self.matcher.find_scroll(prev_hashes[self.header:body_end], hashes[self.header:body_end])
+
+            added = 0
+            if self._first_data is not None:
+                # 第一帧保留表头，去掉底栏
+                added += self._append(self._first_data, 0, body_end)
+                self._first_data = None
+
+            start = self.header if scroll is None else max(self.header, body_end - scroll)
+            return added + self._append(data, start, body_end)
+
+    def _append(self, data, start, end):
+        """把帧数据中 [start, end) 行追加到画布，返回追加的行数"""
+        rows = end - start
+        if rows <= 0:
+            return 0
+        stride = self.width * 3
+        self._ensure_capacity(rows * stride)
+        self.canvas.append_rows(memoryview(data)[start * stride:end * stride])
+        return rows
+
+    def _ensure_capacity(self, extra_bytes):
+        """内存画布即将超过上限时转存到磁盘分块画布"""
+        if self.memory_limit is None or not isinstance(self.canvas, MemoryCanvas):
+            return
+        if self.canvas.nbytes + extra_bytes <= self.memory_limit:
+            return
+
+        print(f"[增量拼接] 画布超过 {self.memory_limit // (1024 * 1024)}MB，转存到磁盘分块画布")
+        tiled = TiledCanvas(self.width, temp_dir=self.temp_dir)
+        tiled.append_rows(self.canvas.take_buffer())
+        self.canvas = tiled
+
+    def result(self):
+        """结束拼接并返回结果图片；之后再追加的帧会被忽略"""
+        with self._lock:
+            if self._result is None and self.canvas is not None:
+                if self._first_data is not None:
+                    # 只有一帧（或所有帧都相同），整帧输出
+                    self._append(self._first_data, 0, self.frame_height)
+                    self._first_data = None
+                else:
+                    # 底栏取自最后一帧
+                    self._append(self._last_data, self.frame_height - self.footer, self.frame_height)
+                self._last_data = None
+                self._prev_hashes = None
+                if self.height > 0:
+                    self._result = self.canvas.to_image()
+            return self._result
+
+
+class GridCompositor:
+    """
+    网格拼接器 - 直接算出列数和每个格子的位置，支持尺寸不同的帧
+    每个像素只写一次：背景色只填在间距和空白处；
+    输出超过内存上限时按网格行逐行写入磁盘分块画布
+    """
+
+    def __init__(self, max_columns=2, gap=10, bg_color=(255, 255, 255),
+                 memory_limit=256 * 1024 * 1024, temp_dir=None):
+        """
+        :param max_columns: 最大列数
+        :param gap: 图片之间及四周的间距（像素）
         :param bg_color: 背景颜色
+        :param memory_limit: 结果超过该字节数时写入磁盘分块画布（None 表示不限制）
+        :param temp_dir: 磁盘画布的临时文件目录
+        """
+        self.max_columns = max(2, max_columns)
+        self.gap = gap
+        self.bg_color = bg_color
+        self.memory_limit = memory_limit
+        self.temp_dir = temp_dir
+        self.canvas = None
+
+    def choose_columns(self, sizes):
+        """
+        选择使结果最接近正方形的列数
+        c 列时宽高比约为 c²·w / (n·h)，只需比较 sqrt(n·h / w) 附近的几个整数，不需要遍历
+        """
+        count = len(sizes)
+        # 少量图片固定最少2列
+        if count <= 2:
+            return 2
+
+        mean_width = sum(size[0] for size in sizes) / count
+        mean_height = sum(size[1] for size in sizes) / count
+
+        def ratio_diff(columns):
+            rows = (count + columns - 1) // columns
+            return abs(mean_width * columns / (mean_height * rows) - 1.0)
+
+        # 行数要取整，所以再按 sqrt 附近的两个行数 r 反推列数：
+        # r 行时宽高比为 1 的列数是 r·h / w，把它两侧的整数限制在恰好排成 r 行的列数范围内
+        ideal = (count * mean_height / mean_width) ** 0.5
+        ideal_rows = count / ideal
+        candidates = {int(ideal), int(ideal) + 1}
+        for rows in (int(ideal_rows), int(ideal_rows) + 1):
+            if rows > 0:
+                fewest = (count + rows - 1) // rows
+                most = (count + rows - 2) // (rows - 1) - 1 if rows > 1 else self.max_columns
+                square = rows * mean_height / mean_width
+                for columns in (int(square), int(square) + 1):
+                    candidates.add(min(max(columns, fewest), max(most, fewest)))
+        candidates = {min(max(columns, 2), self.max_columns) for columns in candidates}
+        return min(sorted(candidates), key=ratio_diff)
+
+    def layout(self, sizes):
+        """
+        计算网格布局：每列宽度取该列最宽的帧，每行高度取该行最高的帧
+        :return: (列数, 列左边界列表, 行上边界列表, 列宽列表, 行高列表, 总宽, 总高)
+        """
+        columns = self.choose_columns(sizes)
+        rows = (len(sizes) + columns - 1) // columns
+        column_widths = [0] * columns
+        row_heights = [0] * rows
+        for index, (width, height) in enumerate(sizes):
+            row, column = divmod(index, columns)
+            column_widths[column] = max(column_widths[column], width)
+            row_heights[row] = max(row_heights[row], height)
+
+        gap = self.gap
+        lefts = []
+        x = gap
+        for width in column_widths:
+            lefts.append(x)
+            x += width + gap
+        tops = []
+        y = gap
+        for height in row_heights:
+            tops.append(y)
+            y += height + gap
+        return columns, lefts, tops, column_widths, row_heights, x, y
+
+    def compose(self, images):
+        """
+        拼接图片（images 可以是 FrameStore，按行读取帧，不会同时解压全部帧）
         :return: 拼接后的图片
         """
-        if not images:
+        sizes = images.sizes() if isinstance(images, FrameStore) else [img.size for img in images]
+        if not sizes:
             return None
 
-        # 根据图片数量和尺寸计算最佳列数，使拼接结果接近正方形
-        num_images = len(images)
+        columns, lefts, tops, column_widths, row_heights, total_width, total_height = self.layout(sizes)
+        print(f"[网格拼接] 图片数量: {len(sizes)}, 使用 {columns}列 x {len(row_heights)}行 布局")
+        print(f"[网格拼接] 最终尺寸: {total_width}x{total_height}, 长宽比: {total_width / total_height:.2f}")
+
+        def row_cells(row):
+            cells = []
+            for index in range(row * columns, min((row + 1) * columns, len(sizes))):
+                img = images[index]
+                cells.append(img if img.mode == 'RGB' else img.convert('RGB'))
+            return cells
+
+        # 不初始化像素：帧和背景都只写一次
+        if self.memory_limit is None or total_width * total_height * 3 <= self.memory_limit:
+            self.canvas = None
+            result = Image.new('RGB', (total_width, total_height), None)
+            for top in [0] + [top + height for top, height in zip(tops, row_heights)]:
+                result.paste(self.bg_color, (0, top, total_width, top + self.gap))
+            for row, row_height in enumerate(row_heights):
+                self._paint_row(result, tops[row], row_height, row_cells(row), lefts, column_widths)
+            return result
+
+        # 超大网格：逐行画到条带图片上，依次写入磁盘分块画布
+        print(f"[网格拼接] 结果超过 {self.memory_limit // (1024 * 1024)}MB，写入磁盘分块画布")
+        self.canvas = TiledCanvas(total_width, temp_dir=self.temp_dir)
+        gap_rows = bytes(self.bg_color) * (total_width * self.gap)
+        for row, row_height in enumerate(row_heights):
+            self.canvas.append_rows(gap_rows)
+            band = Image.new('RGB', (total_width, row_height), None)
+            self._paint_row(band, 0, row_height, row_cells(row), lefts, column_widths)
+            self.canvas.append_rows(band.tobytes())
+        self.canvas.append_rows(gap_rows)
+        return self.canvas.to_image()
+
+    def _paint_row(self, target, top, row_height, cells, lefts, column_widths):
+        """
+        在 target 的 top 处画一行格子：帧贴在格子左上角，
+        列间距、帧比格子小的部分和空格子填背景色
+        """
+        bottom = top + row_height
+
+        def fill(left, upper, right, lower):
+            if right > left and lower > upper:
+                target.paste(self.bg_color, (left, upper, right, lower))
+
+        fill(0, top, self.gap, bottom)
+        for column, (left, width) in enumerate(zip(lefts, column_widths)):
+            right = left + width
+            fill(right, top, right + self.gap, bottom)
+            if column < len(cells):
+                img = cells[column]
+                target.paste(img, (left, top))
+                fill(left + img.width, top, right, bottom)
+                fill(left, top + img.height, left + img.width, bottom)
+            else:
+                fill(left, top, right, bottom)
 
-        # 获取图片尺寸（假设所有图片尺寸相同）
-        img_width = images[0].width
-        img_height = images[0].height
 
-        # 智能计算最佳列数：遍历可能的列数，选择使结果最接近正方形的
-        def calculate_aspect_ratio(cols):
-            """计算使用cols列时的长宽比（接近1.0为最佳）"""
-            rows = (num_images + cols - 1) // cols
-            total_width = img_width * cols
-            total_height = img_height * rows
+def scroll_horizontally(step):
+    """
+    横向滚动（正值向右）
+    Windows 上 pyautogui.hscroll 实际是纵向滚动，改用 Shift+滚轮
+    """
+    if sys.platform.startswith('win'):
+        pyautogui.keyDown('shift')
+        try:
+            pyautogui.scroll(-step)
+        finally:
+            pyautogui.keyUp('shift')
+    else:
+        pyautogui.hscroll(step)
 
-            # 避免除零
-            if total_height == 0:
-                return float('inf')
 
-            ratio = total_width / total_height
-            # 返回偏离1.0的距离（越小越好）
-            return abs(ratio - 1.0)
+class SerpentineScroller:
+    """
+    二维蛇形滚动 - 先横向滚到边，再向下滚一屏，然后反向横扫，直到向下滚动后画面不变
+    作为截图流水线的 grab/scroll 使用：截图后立刻和上一帧比较，决定下一次往哪个方向滚动
+    """
 
-        # 少量图片固定最少2列
-        if num_images <= 2:
-            columns = 2
+    def __init__(self, grab, scroll_x, scroll_y, step_x, step_y, threshold=0.90, on_finish=None):
+        """
+        :param grab: 截图函数，返回图片，失败时返回 None
+        :param scroll_x: 横向滚动函数 (距离)，正值向右
+        :param scroll_y: 向下滚动函数 (距离)
+        :param step_x: 每次横向滚动的距离
+        :param step_y: 每次向下滚动的距离
+        :param threshold: 判定为画面没有变化（到边/到底）的相似度阈值
+        :param on_finish: 到达右下角或左下角后回调（在截图线程调用）
+        """
+        self._grab = grab
+        self.scroll_x = scroll_x
+        self.scroll_y = scroll_y
+        self.step_x = step_x
+        self.step_y = step_y
+        self.threshold = threshold
+        self.on_finish = on_finish
+
+        self.direction = 'right'  # 当前横扫方向
+        self.next_move = 'right'
+        self.last_move = None  # 产生当前帧的滚动方向：'right'、'left'、'down'，第一帧为 None
+        self.finished = False
+        self._prev = None
+
+    def grab(self):
+        """
+        截图并转换为 FrameFingerprint，附带 move（产生该帧的滚动方向）和 duplicate（与上一帧相同）
+        """
+        img = self._grab()
+        if img is None:
+            return None
+
+        frame = FrameFingerprint(img)
+        frame.move = self.last_move
+        frame.duplicate = self._prev is not None and frames_unchanged(self._prev, frame, self.threshold)[0]
+
+        if self.finished:
+            frame.duplicate = True
+        elif frame.duplicate:
+            if self.last_move == 'down':
+                # 向下滚动后画面不变：整页截完
+                print("[二维截图] 已到底部，截图完成")
+                self.finished = True
+                if self.on_finish is not None:
+                    self.on_finish()
+            else:
+                # 横向到边，向下滚一屏
+                print(f"[二维截图] 已到{'右' if self.last_move == 'right' else '左'}边，向下滚动")
+                self.next_move = 'down'
         else:
-            # 遍历可能的列数（2到max_columns），选择使长宽比最接近1的
-            best_columns = 2
-            best_ratio_diff = float('inf')
+            self._prev = frame
+            if self.last_move == 'down':
+                # 新的一行：反向横扫
+                self.direction = 'left' if self.direction == 'right' else 'right'
+            self.next_move = self.direction
+        return frame
+
+    def scroll(self):
+        if self.finished:
+            return
+        self.last_move = self.next_move
+        if self.next_move == 'right':
+            self.scroll_x(self.step_x)
+        elif self.next_move == 'left':
+            self.scroll_x(-self.step_x)
+        else:
+            self.scroll_y(self.step_y)
+
+    @staticmethod
+    def is_duplicate(prev_frame, frame):
+        """供 CapturePipeline 的 is_bottom 使用：丢弃到边/到底时的重复帧"""
+        return getattr(frame, 'duplicate', False)
 
-            for cols in range(2, max_columns + 1):
-                ratio_diff = calculate_aspect_ratio(cols)
-                if ratio_diff < best_ratio_diff:
-                    best_ratio_diff = ratio_diff
-                    best_columns = cols
 
-            columns = best_columns
+class MosaicStitcher:
+    """
+    二维拼接器 - 按相邻两帧的滚动方向，在该方向上做重叠检测（纵向比较行哈希，横向比较列哈希），
+    得到每帧在整张图上的位置；帧按内存预算保存在 FrameStore，结束时按条带合成到分块画布
+    冻结的表头行/列（滚动时位置不变的行或列）不参与匹配，只保留最靠边的那一份
+    """
 
-        print(f"[网格拼接] 图片数量: {num_images}, 尺寸: {img_width}x{img_height}")
+    def __init__(self, matcher=None, memory_limit=256 * 1024 * 1024, frame_memory_budget=512 * 1024 * 1024,
+                 temp_dir=None, strip_height=512, bg_color=(255, 255, 255)):
+        """
+        :param memory_limit: 结果超过该字节数时写入磁盘分块画布（None 表示不限制）
+        :param frame_memory_budget: 保存帧的内存预算，超出后压缩并转存到磁盘
+        :param strip_height: 合成时每个条带的高度
+        """
+        self.matcher = matcher or OverlapMatcher()
+        self.memory_limit = memory_limit
+        self.temp_dir = temp_dir
+        self.strip_height = strip_height
+        self.bg_color = bg_color
+        self.tiles = FrameStore(memory_budget=frame_memory_budget, temp_dir=temp_dir)
+        self.positions = []  # 每帧左上角在整张图上的坐标 (x, y)
+        self.frame_size = None
+        self.frame_count = 0
+        self.canvas = None
+        # 冻结区域：纵向滚动时不动的顶部/底部行数，横向滚动时不动的左侧/右侧列数；None 表示尚未检测
+        self.rows_bands = None
+        self.column_bands = None
+        self._prev = None
+        self._result = None
+        self._lock = threading.Lock()
+
+    @property
+    def sticky_bands(self):
+        """(顶部冻结行数, 底部冻结行数)，尚未检测时为 (0, 0)"""
+        return self.rows_bands or (0, 0)
+
+    def _lines(self, frame, transposed):
+        """
+        帧的原始字节、每条线的像素数和线哈希（结果缓存在帧上）
+        :param transposed: True 时按列取（列变成行），横向问题按纵向处理
+        """
+        if not transposed:
+            return frame.data, frame.width, frame.row_hashes
+        if getattr(frame, 'columns', None) is None:
+            data = frame.image.transpose(Image.TRANSPOSE).tobytes()
+            frame.columns = (data, frame.height, self.matcher.hash_rows(data, frame.height))
+        return frame.columns
+
+    def _body_hashes(self, frame, horizontal, cross):
+        """排除两端不随滚动移动的部分后，沿滚动方向每条线的哈希"""
+        start, end = cross
+        if not start and not end:
+            return self._lines(frame, horizontal)[2]
+        img = frame.image
+        if horizontal:
+            img = img.crop((0, start, img.width, img.height - end)).transpose(Image.TRANSPOSE)
+        else:
+            img = img.crop((start, 0, img.width - end, img.height))
+        return self.matcher.hash_rows(img.tobytes(), img.width)
 
-        # 计算行数
-        rows = (num_images + columns - 1) // columns
+    def _pair_offset(self, prev, frame, horizontal):
+        """
+        相邻两帧沿滚动方向的位移（向左为负）
+        两帧中完全相同的侧边（横向滚动时的固定导航栏、纵向滚动时的固定侧栏）不随滚动移动，先排除再计算哈希；
+        沿滚动方向的冻结行/列首次检测后记录下来，只用两者之间的内容匹配，找不到可靠重叠时按整屏计算
+        """
+        prev_cross, cross_width, _ = self._lines(prev, not horizontal)
+        cur_cross, _, cross_hashes = self._lines(frame, not horizontal)
+        cross = self.matcher.sticky_bands(prev_cross, cur_cross, cross_width, cross_hashes) or (0, 0)
+
+        prev_hashes = self._body_hashes(prev, horizontal, cross)
+        hashes = self._body_hashes(frame, horizontal, cross)
+        bands = self.column_bands if horizontal else self.rows_bands
+        if bands is None:
+            prev_along, along_width, _ = self._lines(prev, horizontal)
+            cur_along = self._lines(frame, horizontal)[0]
+            bands = self.matcher.sticky_bands(prev_along, cur_along, along_width, hashes)
+            if bands is not None:
+                if any(bands):
+                    names = ('左', '右') if horizontal else ('上', '下')
+                    print(f"[二维拼接] 检测到冻结{'列' if horizontal else '行'}："
+                          f"{names[0]} {bands[0]}px、{names[1]} {bands[1]}px")
+                if horizontal:
+                    self.column_bands = bands
+                else:
+                    self.rows_bands = bands
+            else:
+                bands = (0, 0)
 
-        print(f"[网格拼接] 图片数量: {num_images}, 尺寸: {img_width}x{img_height}")
-        print(f"[网格拼接] 使用 {columns}列 x {rows}行 布局")
+        start, end = bands[0], len(hashes) - bands[1]
+        forward = getattr(frame, 'move', None) != 'left'
+        if forward:
+            shift = self.matcher.find_scroll(prev_hashes[start:end], hashes[start:end])
+        else:
+            shift = self.matcher.find_scroll(hashes[start:end], prev_hashes[start:end])
+        if shift is None:
+            print(f"[二维拼接] 未找到可靠重叠，按整屏 {end - start}px 计算")
+            shift = end - start
+        return shift if forward else -shift
 
-        # 计算总尺寸
-        total_width = img_width * columns + gap * (columns + 1)
-        total_height = img_height * rows + gap * (rows + 1)
+    def add_frame(self, frame):
+        """
+        追加一帧（在工作线程调用）
+        :param frame: FrameFingerprint（move 属性为产生该帧的滚动方向）或图片（视为向下滚动）
+        :return: 帧在结果中的位置（未排除两端冻结区域前），结束拼接后或尺寸不符时返回 None
+        """
+        if not isinstance(frame, FrameFingerprint):
+            frame = FrameFingerprint(frame)
+        move = getattr(frame, 'move', None) or 'down'
 
-        print(f"[网格拼接] 最终尺寸: {total_width}x{total_height}, 长宽比: {total_width/total_height:.2f}")
+        with self._lock:
+            if self._result is not None:
+                return
+            if self._prev is None:
+                self.frame_size = frame.size
+                position = (0, 0)
+            elif frame.size != self.frame_size:
+                print(f"[二维拼接] 帧尺寸 {frame.size} 与首帧 {self.frame_size} 不同，已跳过")
+                return
+            else:
+                x, y = self.positions[-1]
+                if move in ('right', 'left'):
+                    position = (x + self._pair_offset(self._prev, frame, True), y)
+                else:
+                    position = (x, y + self._pair_offset(self._prev, frame, False))
+
+            self.tiles.append(frame.image)
+            self.positions.append(position)
+            self.frame_count += 1
+            if self._prev is not None:
+                self._prev.columns = None
+            self._prev = frame
+            return position
+
+    def _tile_rects(self):
+        """
+        每帧要贴到结果上的区域：[(帧内裁剪框, 结果中的左上角)]
+        冻结的行/列只保留位于整张图最外侧的帧中的那一份
+        """
+        width, height = self.frame_size
+        top_band, bottom_band = self.rows_bands or (0, 0)
+        left_band, right_band = self.column_bands or (0, 0)
+        xs = [x for x, _ in self.positions]
+        ys = [y for _, y in self.positions]
+        min_x, max_x, min_y, max_y = min(xs), max(xs), min(ys), max(ys)
+
+        rects = []
+        for x, y in self.positions:
+            crop = (0 if x == min_x else left_band,
+                    0 if y == min_y else top_band,
+                    width if x == max_x else width - right_band,
+                    height if y == max_y else height - bottom_band)
+            rects.append((crop, (x - min_x + crop[0], y - min_y + crop[1])))
+        return rects, max_x - min_x + width, max_y - min_y + height
+
+    def result(self):
+        """结束拼接，按条带合成结果（只解码与当前条带相交的帧）"""
+        with self._lock:
+            if self._result is not None or not self.positions:
+                return self._result
+
+            rects, total_width, total_height = self._tile_rects()
+            print(f"[二维拼接] {len(rects)} 帧，结果尺寸 {total_width}x{total_height}")
+            if self.memory_limit is not None and total_width * total_height * 3 > self.memory_limit:
+                print(f"[二维拼接] 结果超过 {self.memory_limit // (1024 * 1024)}MB，写入磁盘分块画布")
+                self.canvas = TiledCanvas(total_width, temp_dir=self.temp_dir)
+            else:
+                self.canvas = MemoryCanvas(total_width)
+
+            decoded = {}
+            for top in range(0, total_height, self.strip_height):
+                bottom = min(top + self.strip_height, total_height)
+                band = Image.new('RGB', (total_width, bottom - top), self.bg_color)
+                for index, (crop, (left, upper)) in enumerate(rects):
+                    lower = upper + crop[3] - crop[1]
+                    if upper >= bottom or lower <= top:
+                        continue
+                    if index not in decoded:
+                        decoded[index] = self.tiles[index]
+                    first = max(upper, top)
+                    last = min(lower, bottom)
+                    source = (crop[0], crop[1] + first - upper, crop[2], crop[1] + last - upper)
+                    band.paste(decoded[index].crop(source), (left, first - top))
+                    if lower <= bottom:
+                        del decoded[index]  # 之后的条带不再用到
+                self.canvas.append_rows(band.tobytes())
+
+            self.tiles.close()
+            self._prev = None
+            self._result = self.canvas.to_image()
+            return self._result
+
+
+def replay_journal(path, consume, on_progress=None, stop_event=None):
+    """
+    把会话中保存的帧按顺序交给 consume（FrameFingerprint，move 属性为录制时的滚动方向）
+    :param on_progress: 每送出一帧后回调 (已送出帧数, 总帧数)
+    :param stop_event: 设置后不再送出后面的帧
+    :return: 送出的帧数
+    """
+    records = FrameJournal.read(path)[1]
+    for index, record in enumerate(records, 1):
+        if stop_event is not None and stop_event.is_set():
+            return index - 1
+        frame = FrameFingerprint(FrameJournal.load_frame(path, record))
+        frame.move = record.get('move')
+        consume(frame)
+        if on_progress is not None:
+            on_progress(index, len(records))
+    return len(records)
+
+
+def restitch_journal(path, stitch_mode=None, matcher=None, canvas_memory_limit=256 * 1024 * 1024,
+                     frame_memory_budget=512 * 1024 * 1024, max_columns=6, gap=20, on_progress=None):
+    """
+    用会话中保存的帧重新拼接（不需要屏幕）
+    :param stitch_mode: 'vertical'、'grid' 或 'mosaic'，为 None 时沿用录制时的模式
+    :param on_progress: 每送入一帧后回调 (已送入帧数, 总帧数)
+    :return: (结果图片, 画布, 帧数)，没有帧时结果为 None
+    """
+    session = FrameJournal.read(path)[0]
+    stitch_mode = stitch_mode or session.get('stitch_mode', 'vertical')
+    print(f"[帧日志] 重新拼接 {path}，拼接模式: {stitch_mode}")
+    if stitch_mode == 'grid':
+        store = FrameStore(memory_budget=frame_memory_budget)
+        try:
+            count = replay_journal(path, lambda frame: store.append(frame.image), on_progress)
+            compositor = GridCompositor(max_columns=max_columns, gap=gap, memory_limit=canvas_memory_limit)
+            image = compositor.compose(store) if count else None
+        finally:
+            store.close()
+        return image, compositor.canvas, count
+
+    if stitch_mode == 'mosaic':
+        stitcher = MosaicStitcher(matcher, memory_limit=canvas_memory_limit, frame_memory_budget=frame_memory_budget)
+    else:
+        stitcher = IncrementalStitcher(matcher, memory_limit=canvas_memory_limit)
+    count = replay_journal(path, stitcher.add_frame, on_progress)
+    return stitcher.result(), stitcher.canvas, count
+
+
+class ScrollSettleDetector:
+    """
+    滚动稳定检测 - 滚动后反复截取选区中间的一条窄带（低分辨率采样），
+    连续两次采样相同即认为页面已渲染稳定，超时则直接继续
+    """
+
+    def __init__(self, grab, region, fixed_delay=0.5, timeout=1.0, poll_interval=0.03,
+                 min_delay=0.05, band_ratio=8):
+        """
+        :param grab: 截图函数 (x, y, 宽, 高) -> 图片
+        :param region: 截图区域 (x, y, 宽, 高)
+        :param fixed_delay: 对照用的固定等待时间，用于统计节省的时间
+        :param timeout: 最长等待时间（秒）
+        :param poll_interval: 采样间隔（秒）
+        :param min_delay: 滚动后首次采样前的最短等待，避免滚动事件尚未生效就判定稳定
+        :param band_ratio: 采样带高度为区域高度的几分之一
+        """
+        self.grab = grab
+        self.fixed_delay = fixed_delay
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.min_delay = min_delay
+
+        x, y, width, height = region
+        band_height = max(16, height // band_ratio)
+        band_height = min(band_height, height)
+        self.band = (x, y + (height - band_height) // 2, width, band_height)
+
+        # 统计
+        self.settle_count = 0
+        self.timeout_count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _sample(self):
+        img = self.grab(self.band)
+        # 降采样一半，只用于判断是否还在变化
+        return img.reduce(2).tobytes()
+
+    def wait(self, stop_event):
+        """等待内容稳定；stop_event 置位时立即返回"""
+        start = time.perf_counter()
+        try:
+            if stop_event.wait(self.min_delay):
+                return
+            prev = self._sample()
+            while not stop_event.wait(self.poll_interval):
+                current = self._sample()
+                if current == prev:
+                    break
+                if time.perf_counter() - start >= self.timeout:
+                    self.timeout_count += 1
+                    break
+                prev = current
+        except Exception as e:
+            # 采样失败时退回固定等待
+            print(f"[稳定检测] 采样失败，改用固定等待: {e}")
+            stop_event.wait(max(0.0, self.fixed_delay - (time.perf_counter() - start)))
+        finally:
+            elapsed = time.perf_counter() - start
+            self.settle_count += 1
+            self.total_wait += elapsed
+            self.max_wait = max(self.max_wait, elapsed)
+
+    def stats(self):
+        """等待时间统计，saved 为相对固定等待节省的总时间（秒）"""
+        fixed_total = self.fixed_delay * self.settle_count
+        return {
+            'settles': self.settle_count,
+            'timeouts': self.timeout_count,
+            'total_wait': self.total_wait,
+            'average_wait': self.total_wait / self.settle_count if self.settle_count else 0.0,
+            'max_wait': self.max_wait,
+            'fixed_total': fixed_total,
+            'saved': fixed_total - self.total_wait,
+        }
+
+
+class PreviewPyramid:
+    """
+    预览金字塔 - 在后台线程把结果缩放到预览宽度（第 0 级），并逐级减半生成多级缩略图；
+    每一级切成固定高度的图块，界面只为当前可见的图块创建 PhotoImage
+    """
+
+    # 由上一级生成图块时，上下额外参与滤波的行数
+    FILTER_MARGIN = 4
+
+    def __init__(self, source, target_width=800, tile_height=512, levels=3, on_tile=None):
+        """
+        :param source: 结果图片（可以是映射到磁盘画布的图片）
+        :param target_width: 第 0 级的预览宽度（不放大）
+        :param tile_height: 每个图块的高度（预览像素）
+        :param levels: 金字塔级数
+        :param on_tile: 图块生成后回调 (级别, 图块序号)，在后台线程调用
+        """
+        self.source = source
+        self.tile_height = tile_height
+        self.on_tile = on_tile
+        self.base_scale = min(target_width / source.width, 1.0)
+        self.levels = levels
+        self._tiles = {}
+        self._cancelled = threading.Event()
+        self._thread = None
+
+    def size(self, level):
+        """指定级别的预览尺寸"""
+        scale = self.base_scale / (2 ** level)
+        return (max(1, int(self.source.width * scale)),
+                max(1, int(self.source.height * scale)))
+
+    def tile_count(self, level):
+        return (self.size(level)[1] + self.tile_height - 1) // self.tile_height
+
+    def get_tile(self, level, index):
+        """已生成的图块，尚未生成时返回 None"""
+        return self._tiles.get((level, index))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._build, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _build(self):
+        """
+        后台线程：先从结果图生成第 0 级（默认显示），
+        之后每一级都由上一级的图块缩小一半得到，不再重复读取全尺寸的结果图
+        """
+        try:
+            resampling_filter = Image.Resampling.LANCZOS
+        except AttributeError:
+            resampling_filter = Image.LANCZOS
+
+        try:
+            for level in range(self.levels):
+                width, height = self.size(level)
+                if level == 0:
+                    source_width, source_height = self.source.width, self.source.height
+                else:
+                    source_width, source_height = self.size(level - 1)
+                scale_y = source_height / height
+                for index in range(self.tile_count(level)):
+                    if self._cancelled.is_set():
+                        return
+                    top = index * self.tile_height
+                    bottom = min(top + self.tile_height, height)
+                    y0 = top * scale_y
+                    y1 = min(source_height, bottom * scale_y)
+                    if level == 0:
+                        # 只缩放源图中对应的行区间，box 外的像素仍参与滤波，图块之间没有接缝
+                        tile = self.source.resize((width, bottom - top), resampling_filter,
+                                                  box=(0, y0, source_width, y1))
+                    else:
+                        # 取上一级对应的行（上下各多取几行参与滤波，避免接缝）再缩小
+                        strip_top = max(0, int(y0) - self.FILTER_MARGIN)
+                        strip_bottom = min(source_height, int(y1) + 1 + self.FILTER_MARGIN)
+                        strip = self._level_rows(level - 1, strip_top, strip_bottom)
+                        tile = strip.resize((width, bottom - top), resampling_filter,
+                                            box=(0, y0 - strip_top, source_width, y1 - strip_top))
+                    if tile.mode != 'RGB':
+                        tile = tile.convert('RGB')
+                    self._tiles[(level, index)] = tile
+                    if self.on_tile is not None:
+                        self.on_tile(level, index)
+        except Exception as e:
+            print(f"[预览] 生成预览失败: {e}")
+
+    def _level_rows(self, level, top, bottom):
+        """把指定级别 [top, bottom) 行范围内的图块拼成一张图"""
+        first = top // self.tile_height
+        last = (bottom - 1) // self.tile_height
+        if first == last:
+            offset = first * self.tile_height
+            return self._tiles[(level, first)].crop((0, top - offset, self.size(level)[0], bottom - offset))
+        strip = Image.new('RGB', (self.size(level)[0], bottom - top))
+        for index in range(first, last + 1):
+            strip.paste(self._tiles[(level, index)], (0, index * self.tile_height - top))
+        return strip
+
+
+class CaptureProfiler:
+    """
+    采集性能记录 - 记录每帧截图、滚动、等待稳定、指纹、对比、拼接/保存的耗时，
+    以及队列深度、内存占用和最终拼接、编码耗时；每次录制写出一份 JSON 或 CSV 报告
+    """
+
+    # 逐帧阶段，按流水线顺序
+    FRAME_STAGES = ('grab', 'scroll', 'settle', 'fingerprint', 'compare', 'consume')
+
+    STAGE_NAMES = {
+        'zh': {'grab': '截图', 'scroll': '滚动', 'settle': '等待稳定', 'fingerprint': '指纹',
+               'compare': '对比', 'consume': '拼接/保存', 'stitch': '最终拼接', 'encode': '编码'},
+        'en': {'grab': 'Grab', 'scroll': 'Scroll', 'settle': 'Settle', 'fingerprint': 'Fingerprint',
+               'compare': 'Compare', 'consume': 'Stitch/Store', 'stitch': 'Final stitch', 'encode': 'Encode'},
+    }
+
+    def __init__(self, memory_probe=None):
+        """
+        :param memory_probe: 返回当前帧数据和画布占用内存字节数的函数（在工作线程调用）
+        """
+        self.memory_probe = memory_probe
+        self.started_at = datetime.now()
+        self.frames = []  # 每帧一条记录
+        self.events = []  # 不按帧统计的耗时（最终拼接、编码）
+        self.report_path = None
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def new_frame(self):
+        """开始记录一帧（在截图线程调用），返回该帧的记录"""
+        with self._lock:
+            record = {'frame': len(self.frames) + 1, 'time': round(time.perf_counter() - self._start, 4)}
+            self.frames.append(record)
+        return record
+
+    def time_stage(self, record, stage, func, *args):
+        """执行 func 并把耗时（毫秒）记到该帧的 stage 阶段"""
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            record[f'{stage}_ms'] = round((time.perf_counter() - start) * 1000, 3)
+
+    def sample(self, record, queue_depth=None):
+        """记录该帧入队时的队列深度或处理后的内存占用"""
+        if queue_depth is not None:
+            record['queue_depth'] = queue_depth
+        elif self.memory_probe is not None:
+            try:
+                record['memory_mb'] = round(self.memory_probe() / 1024 / 1024, 2)
+            except Exception:
+                pass
+
+    def record_event(self, stage, elapsed_ms, **detail):
+        """记录一次不按帧统计的耗时；报告已写出时同步更新报告"""
+        with self._lock:
+            self.events.append(dict(stage=stage, ms=round(elapsed_ms, 3),
+                                    time=round(time.perf_counter() - self._start, 4), **detail))
+        if self.report_path is not None:
+            self.write_report(self.report_path)
+
+    def summary(self):
+        """各阶段耗时统计（次数、平均、P95、最大、合计，单位毫秒）以及队列和内存峰值"""
+        samples = {}
+        for record in self.frames:
+            for stage in self.FRAME_STAGES:
+                if f'{stage}_ms' in record:
+                    samples.setdefault(stage, []).append(record[f'{stage}_ms'])
+        for event in self.events:
+            samples.setdefault(event['stage'], []).append(event['ms'])
+
+        stages = {}
+        for stage, values in samples.items():
+            values = sorted(values)
+            stages[stage] = {
+                'count': len(values),
+                'mean_ms': round(sum(values) / len(values), 3),
+                'p95_ms': values[min(len(values) - 1, int(len(values) * 0.95))],
+                'max_ms': values[-1],
+                'total_ms': round(sum(values), 3),
+            }
+
+        depths = [record['queue_depth'] for record in self.frames if 'queue_depth' in record]
+        memory = [record['memory_mb'] for record in self.frames if 'memory_mb' in record]
+        return {
+            'frames': len(self.frames),
+            'dropped': sum(1 for record in self.frames if record.get('dropped')),
+            'duration_s': round(time.perf_counter() - self._start, 3),
+            'stages': stages,
+            'queue_depth_max': max(depths) if depths else 0,
+            'queue_depth_mean': round(sum(depths) / len(depths), 2) if depths else 0,
+            'memory_peak_mb': max(memory) if memory else 0,
+        }
+
+    def summary_lines(self, lang='zh'):
+        """报告摘要（每阶段一行，按合计耗时排序，耗时最多的阶段在前）"""
+        names = self.STAGE_NAMES.get(lang, self.STAGE_NAMES['en'])
+        summary = self.summary()
+        if lang == 'zh':
+            lines = [f"帧数 {summary['frames']}（丢弃重复 {summary['dropped']}），总时长 {summary['duration_s']:.1f}s"]
+        else:
+            lines = [f"{summary['frames']} frames ({summary['dropped']} duplicates dropped), {summary['duration_s']:.1f}s total"]
+        stages = sorted(summary['stages'].items(), key=lambda item: item[1]['total_ms'], reverse=True)
+        for stage, stats in stages:
+            lines.append(f"{names.get(stage, stage)}: {stats['total_ms']:.0f}ms = {stats['count']} × "
+                         f"{stats['mean_ms']:.1f}ms (P95 {stats['p95_ms']:.1f}, max {stats['max_ms']:.1f})")
+        lines.append(f"queue ≤{summary['queue_depth_max']} (avg {summary['queue_depth_mean']}), "
+                     f"memory ≤{summary['memory_peak_mb']:.1f}MB")
+        return lines
+
+    def short_summary(self, lang='zh'):
+        """状态栏使用的一行摘要：各阶段平均耗时"""
+        names = self.STAGE_NAMES.get(lang, self.STAGE_NAMES['en'])
+        stages = self.summary()['stages']
+        return ' · '.join(f"{names.get(stage, stage)} {stages[stage]['mean_ms']:.0f}ms"
+                          for stage in self.FRAME_STAGES + ('stitch', 'encode') if stage in stages)
+
+    def write_report(self, path):
+        """写出报告：.csv 每帧一行（拼接、编码等事件附在最后），其他扩展名写 JSON"""
+        with self._lock:
+            frames = [dict(record) for record in self.frames]
+            events = list(self.events)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            if path.lower().endswith('.csv'):
+                columns = ['frame', 'time'] + [f'{stage}_ms' for stage in self.FRAME_STAGES] + \
+                          ['queue_depth', 'memory_mb', 'dropped', 'failed', 'event', 'event_ms']
+                with open(path, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.DictWriter(f, columns, restval='', extrasaction='ignore')
+                    writer.writeheader()
+                    writer.writerows(frames)
+                    for event in events:
+                        writer.writerow({'time': event['time'], 'event': event['stage'], 'event_ms': event['ms']})
+            else:
+                report = {
+                    'version': CURRENT_VERSION,
+                    'started_at': self.started_at.isoformat(timespec='seconds'),
+                    'summary': self.summary(),
+                    'frames': frames,
+                    'events': events,
+                }
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, indent=2, ensure_ascii=False)
+            self.report_path = path
+        except Exception as e:
+            print(f"[性能] 写出报告失败: {e}")
+        return self.report_path
+
+
+class CapturePipeline:
+    """
+    流水线截图 - 截图滚动线程只负责截图和滚动；到底检测、拼接、存储在工作线程中完成
+    两个线程之间通过有界队列传递帧，处理跟不上时截图线程会等待，内存占用有上限
+    """
+
+    def __init__(self, grab, scroll, consume, is_bottom=None, scroll_delay=0.5, settle=None,
+                 max_no_change=3, queue_size=4, on_frame=None, on_bottom=None, fingerprint=None,
+                 profiler=None, on_error=None):
+        """
+        :param grab: 截图函数，返回图片，失败时返回 None
+        :param scroll: 滚动函数，为 None 时不自动滚动，只定时截图
+        :param consume: 处理一帧（拼接或保存）
+        :param is_bottom: 判断当前帧与上一帧是否相同（没有滚动）的函数 (前一帧, 当前帧) -> bool，
+                          相同的帧直接丢弃；为 None 时不检测
+        :param settle: 滚动后等待内容稳定的函数 (stop_event)，为 None 时固定等待 scroll_delay
+        :param max_no_change: 连续多少次判定到底后停止，为 None 时只去重不自动停止
+        :param queue_size: 截图线程与工作线程之间的队列长度
+        :param on_frame: 每处理完一帧后回调，参数为已处理帧数（在工作线程调用）
+        :param on_bottom: 检测到页面底部后回调（在工作线程调用）
+        :param fingerprint: 在工作线程把截图转换为帧指纹的函数，结果传给 is_bottom 和 consume
+        :param profiler: CaptureProfiler，记录每帧各阶段耗时，为 None 时不记录
+        :param on_error: 处理帧出错后回调，参数为异常（在工作线程调用）；出错后录制停止，已处理的帧保留
+        """
+        self.grab = grab
+        self.scroll = scroll
+        self.consume = consume
+        self.is_bottom = is_bottom
+        self.scroll_delay = scroll_delay
+        self.settle = settle
+        self.max_no_change = max_no_change
+        self.on_frame = on_frame
+        self.on_bottom = on_bottom
+        self.fingerprint = fingerprint
+        self.profiler = profiler
+        self.on_error = on_error
+
+        self.frame_count = 0
+        self.duplicate_count = 0
+        self.reached_bottom = False
+        self.error = None  # 工作线程处理帧时出现的异常（出现后停止录制）
+        self._frames = queue.Queue(maxsize=queue_size)
+        self._stop_event = threading.Event()
+        self._capture_thread = None
+        self._process_thread = None
+
+    def start(self):
+        """启动截图线程和工作线程"""
+        self._capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._process_thread = threading.Thread(target=self._process_loop, daemon=True)
+        self._process_thread.start()
+        self._capture_thread.start()
+
+    def stop(self):
+        """请求停止；已截取的帧仍会被工作线程处理完"""
+        self._stop_event.set()
+
+    def is_alive(self):
+        """是否还有线程在运行（工作线程处理完队列中的帧后才会结束）"""
+        return any(thread is not None and thread.is_alive()
+                   for thread in (self._capture_thread, self._process_thread))
+
+    def join(self, timeout=None):
+        for thread in (self._capture_thread, self._process_thread):
+            if thread is not None:
+                thread.join(timeout)
+
+    def _timed(self, record, stage, func, *args):
+        """有 profiler 时记录 func 的耗时"""
+        if record is None:
+            return func(*args)
+        return self.profiler.time_stage(record, stage, func, *args)
+
+    def _capture_loop(self):
+        """截图线程：截图 → 入队 → 滚动 → 等待内容稳定"""
+        try:
+            while not self._stop_event.is_set():
+                record = self.profiler.new_frame() if self.profiler is not None else None
+                frame = self._timed(record, 'grab', self.grab)
+                if frame is None:
+                    if record is not None:
+                        record['failed'] = True
+                    # 截图失败，等待一下再重试
+                    self._stop_event.wait(0.2)
+                    continue
+
+                # 队列满时等待工作线程，同时响应停止请求
+                while not self._stop_event.is_set():
+                    try:
+                        self._frames.put((frame, record), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if record is not None:
+                    self.profiler.sample(record, queue_depth=self._frames.qsize())
+
+                if self._stop_event.is_set():
+                    break
+
+                if self.scroll is not None:
+                    try:
+                        self._timed(record, 'scroll', self.scroll)
+                    except Exception as e:
+                        print(f"[滚动失败] {e}")
+                    if self.settle is not None:
+                        self._timed(record, 'settle', self.settle, self._stop_event)
+                    else:
+                        self._timed(record, 'settle', self._stop_event.wait, self.scroll_delay)
+                else:
+                    # 不自动滚动，只是定时截图
+                    self._stop_event.wait(0.2)
+        finally:
+            # 结束标记：队列满时等待工作线程取走，工作线程已退出则不再等待
+            while True:
+                try:
+                    self._frames.put(None, timeout=0.1)
+                    break
+                except queue.Full:
+                    if self._process_thread is None or not self._process_thread.is_alive():
+                        break
+
+    def _process_loop(self):
+        """工作线程：到底检测 → 拼接/保存 → 通知界面"""
+        prev_frame = None
+        no_change_count = 0  # 连续未变化次数
+
+        while True:
+            item = self._frames.get()
+            if item is None:
+                break
+            frame, record = item
+            if self.reached_bottom or self.error is not None:
+                continue  # 继续取出队列中剩余的帧，让截图线程能够结束
+            try:
+                prev_frame, no_change_count = self._process_frame(frame, record, prev_frame, no_change_count)
+            except Exception as e:
+                # 一帧处理失败（如磁盘已满）时停止录制，已处理的帧保留
+                print(f"[错误] 处理第 {self.frame_count + 1} 帧失败，停止录制: {e}")
+                self.error = e
+                self._stop_event.set()
+                if self.on_error is not None:
+                    self.on_error(e)
+
+        print(f"[完成] 共截取 {self.frame_count} 张图片，丢弃重复帧 {self.duplicate_count} 张")
+
+    def _process_frame(self, frame, record, prev_frame, no_change_count):
+        """处理一帧，返回新的 (上一帧, 连续未变化次数)"""
+        if self.fingerprint is not None:
+            frame = self._timed(record, 'fingerprint', self.fingerprint, frame)
+
+        # 检测是否滚动到底（对比前后截图），与上一帧相同的帧不保存
+        if prev_frame is not None and self.is_bottom is not None:
+            if self._timed(record, 'compare', self.is_bottom, prev_frame, frame):
+                no_change_count += 1
+                self.duplicate_count += 1
+                if record is not None:
+                    record['dropped'] = True
+                print(f"[检测] 与上一帧相同，已丢弃 (连续第{no_change_count}次)")
+
+                if self.max_no_change is not None and no_change_count >= self.max_no_change:
+                    print(f"[完成] 检测到页面底部，停止录制")
+                    self.reached_bottom = True
+                    self._stop_event.set()
+                    if self.on_bottom is not None:
+                        self.on_bottom()
+                return prev_frame, no_change_count
+            no_change_count = 0  # 有变化，重置计数
+
+        self._timed(record, 'consume', self.consume, frame)
+        if record is not None:
+            self.profiler.sample(record)
+        prev_frame = frame
+        self.frame_count += 1
+
+        if self.on_frame is not None:
+            self.on_frame(self.frame_count)
+        return prev_frame, no_change_count
+
+
+class AutoScrollScreenshotTool:
+    """自动滚动长截图工具"""
+
+    @staticmethod
+    def stitch_simple(images):
+        """
+        简单拼接算法：直接垂直拼接所有图片
+        不需要任何重叠检测，因为每张图片的滚动距离是固定的
+        """
+        if not images:
+            return None
+
+        # 计算总尺寸
+        total_width = images[0].width
+        total_height = sum(img.height for img in images)
 
         # 创建空白画布
-        result = Image.new('RGB', (total_width, total_height), bg_color)
-
-        # 填充背景
-        result.paste(bg_color, [0, 0, total_width, total_height])
+        result = Image.new('RGB', (total_width, total_height))
 
         # 拼接所有图片
-        for i, img in enumerate(images):
-            row = i // columns
-            col = i % columns
+        y_offset = 0
+        for img in images:
+            result.paste(img, (0, y_offset))
+            y_offset += img.height
+
+        return result
 
-            x_offset = gap + col * (img_width + gap)
-            y_offset = gap + row * (img_height + gap)
+    @staticmethod
+    def stitch_overlap(images, matcher=None):
+        """
+        重叠检测拼接：逐帧检测与前一帧的真实滚动距离，只追加新出现的行
+        找不到可靠重叠时按整帧追加（与 stitch_simple 行为一致）
+        """
+        if not images:
+            return None
 
-            result.paste(img, (x_offset, y_offset))
+        stitcher = IncrementalStitcher(matcher)
+        for img in images:
+            stitcher.add_frame(img)
 
+        result = stitcher.result()
+        print(f"[重叠拼接] 原始高度 {sum(img.height for img in images)}px，去重后 {stitcher.height}px")
         return result
 
+    @staticmethod
+    def stitch_grid(images, max_columns=2, gap=10, bg_color=(255, 255, 255)):
+        """
+        网格拼接算法：将图片按网格布局拼接（支持尺寸不同的图片）
+        :param images: 图片列表
+        :param max_columns: 最大列数（默认2列）
+        :param gap: 图片之间的间距（像素）
+        :param bg_color: 背景颜色
+        :return: 拼接后的图片
+        """
+        return GridCompositor(max_columns, gap, bg_color, memory_limit=None).compose(images)
+
     def __init__(self, root):
         self.root = root
         self.lang_manager = LanguageManager()
         self.hotkey_manager = HotkeyManager()
+        self.settings_manager = SettingsManager()
 
         # 初始化更新管理器
         self.update_manager = UpdateManager(
@@ -640,30 +3113,111 @@ class AutoScrollScreenshotTool:
             RELEASES_PAGE_URL
         )
 
+        # 预览金字塔（按需渲染可见图块）
+        self.preview_pyramid = None
+        self.preview_level = 0
+        self.preview_items = {}
+
         # 初始化UI
         self.setup_window()
 
         # 状态变量
-        self.screenshots = []
+        self.screenshots = FrameStore()  # 网格模式保存的原始帧
+        self.screenshot_count = 0
+        self.stitcher = None  # 垂直模式的增量拼接器或二维模式的拼接器
+        self.result_canvas = None  # 垂直模式结果所在的画布（内存或磁盘）
         self.is_recording = False
         self.selection_start = None
         self.selection_rect = None
         self.selection_rect_coords = None
         self.region_height = 0  # 截图区域高度
+        self.capture_pipeline = None
+        self.resuming = False  # 继续录制时正在后台恢复会话中的帧（此时还没有截图流水线）
+        self.restitching = False  # 正在后台重新拼接会话
+        self.resume_cancel = threading.Event()
 
         # 自动滚动参数
         self.scroll_delay = 0.5  # 滚动后等待时间（秒），让内容加载
         self.auto_scroll_enabled = True  # 是否自动滚动
 
-        # 拼接模式：'vertical'（垂直长图）或 'grid'（网格布局）
+        # 自适应等待：滚动后采样直到内容稳定，而不是固定等待 scroll_delay
+        self.adaptive_settle = True
+        self.settle_timeout = 1.0  # 自适应等待的最长时间（秒）
+        self.settle_detector = None
+
+        # 截图后端（'auto' 时优先使用只截取选区的快速后端，pyautogui 兜底）
+        # 第一次使用时才创建（会导入 mss 等），不占用启动时间
+        self._capture_backend = None
+        self._capture_backend_lock = threading.Lock()
+
+        # 到底检测的帧对比引擎（fast_mode=True 时隔行隔列采样对比）
+        self.frame_comparator = FrameComparator(fast_mode=False, sample_step=4)
+
+        # 垂直拼接的重叠检测器（按真实滚动距离裁掉重复行）
+        self.overlap_matcher = OverlapMatcher()
+
+        # 导出管线：保存和复制共用编码结果（预设见 EXPORT_PRESETS，可在界面中切换）
+        self.export_preset = self.settings_manager.get('export_preset')
+        if self.export_preset not in EXPORT_PRESETS:
+            self.export_preset = 'fast'
+        self.exporter = ImageExporter(self.export_preset)
+        self.clipboard = ClipboardExporter(self.exporter)
+
+        # 垂直拼接画布的内存上限，超长截图超过后转存到磁盘分块画布
+        self.canvas_memory_limit = 256 * 1024 * 1024
+
+        # 网格模式原始帧的内存预算，超出后较旧的帧压缩并转存到磁盘
+        self.frame_memory_budget = 512 * 1024 * 1024
+
+        # 性能记录：每次录制记录各阶段耗时，结束后写出报告
+        self.profiling_enabled = True
+        self.profile_report_format = 'json'  # 'json' 或 'csv'
+        self.profile_report_dir = os.path.join(get_app_dir(), 'capture_reports')
+        self.profiler = None
+
+        # 帧日志：录制时把帧写入会话目录，可继续录制或重新拼接；只保留最近的几个会话
+        self.journal_enabled = True
+        self.journal_dir = os.path.join(get_app_dir(), 'capture_sessions')
+        self.journal_keep = 5
+        self.journal = None
+        self.resumed_frames = 0  # 继续录制时从日志恢复的帧数
+
+        # 拼接模式：'vertical'（垂直长图）、'grid'（网格布局）或 'mosaic'（二维拼接）
         self.stitch_mode = 'vertical'
+        self.capture_stitch_mode = self.stitch_mode  # 本次录制使用的拼接模式
 
         # 创建界面
         self.create_widgets()
 
+        # 热键注册和更新检查推迟到窗口显示、界面空闲之后
+        self.deferred_startup_done = False
+        self.root.after(STARTUP_DEFER_MS, lambda: self.root.after_idle(self.run_deferred_startup))
+
+    @property
+    def capture_backend(self):
+        """截图后端，第一次访问时创建（截图线程与主线程都可能先访问）"""
+        if self._capture_backend is None:
+            with self._capture_backend_lock:
+                if self._capture_backend is None:
+                    self._capture_backend = create_capture_backend('auto')
+        return self._capture_backend
+
+    @capture_backend.setter
+    def capture_backend(self, backend):
+        self._capture_backend = backend
+
+    def run_deferred_startup(self):
+        """窗口显示后空闲时执行：注册全局热键（首次导入 keyboard）、创建截图后端、检查更新"""
+        if self.deferred_startup_done:
+            return
+        self.deferred_startup_done = True
+
         # 注册全局热键
         self.register_global_hotkeys()
 
+        # 提前创建截图后端，第一次截图时不用再等待导入
+        self.capture_backend
+
         # 检查更新（异步）
         if ENABLE_AUTO_UPDATE:
             self.check_for_updates_async()
@@ -819,6 +3373,24 @@ class AutoScrollScreenshotTool:
         )
         settings_btn.pack(side=tk.LEFT, padx=5)
 
+        # 性能报告按钮
+        profile_btn = ttk.Button(
+            right_buttons,
+            text=f"⏱️ {self.lang_manager.get('btn_profile')}",
+            command=self.show_profile_report,
+            width=12
+        )
+        profile_btn.pack(side=tk.LEFT, padx=5)
+
+        # 录制会话按钮（继续录制或重新拼接）
+        self.session_btn = ttk.Button(
+            right_buttons,
+            text=f"🗂️ {self.lang_manager.get('btn_sessions')}",
+            command=self.open_session,
+            width=12
+        )
+        self.session_btn.pack(side=tk.LEFT, padx=5)
+
         # ============ 操作说明区域 ============
         info_frame = ttk.LabelFrame(
             main_container,
@@ -902,6 +3474,27 @@ class AutoScrollScreenshotTool:
             width=14
         ).pack(side=tk.LEFT, padx=5)
 
+        # 导出预设（体积 ↔ 速度）
+        ttk.Label(
+            file_actions,
+            text=self.lang_manager.get('export_preset_label'),
+            style='Info.TLabel'
+        ).pack(side=tk.LEFT, padx=(15, 5))
+
+        preset_names = {preset: self.lang_manager.get(f'export_preset_{preset}') for preset in EXPORT_PRESETS}
+        self.export_preset_var = tk.StringVar(value=preset_names[self.export_preset])
+        preset_combo = ttk.Combobox(
+            file_actions,
+            textvariable=self.export_preset_var,
+            values=list(preset_names.values()),
+            state='readonly',
+            width=16
+        )
+        preset_combo.pack(side=tk.LEFT, padx=5)
+        preset_combo.bind('<<ComboboxSelected>>', lambda e: self.set_export_preset(
+            next(preset for preset, name in preset_names.items() if name == self.export_preset_var.get())
+        ))
+
         # ============ 拼接模式选择区域 ============
         stitch_mode_frame = ttk.LabelFrame(
             main_container,
@@ -954,6 +3547,25 @@ class AutoScrollScreenshotTool:
         )
         grid_radio.pack(side=tk.LEFT, padx=10)
 
+        # 二维拼接（蛇形滚动）
+        mosaic_radio = tk.Radiobutton(
+            mode_container,
+            text=f"🗺️ {self.lang_manager.get('stitch_mode_mosaic')}",
+            variable=self.stitch_mode_var,
+            value='mosaic',
+            bg='#f5f5f5',
+            fg='#333333',
+            font=('Microsoft YaHei UI', 10),
+            selectcolor='#e6f7ff',
+            activebackground='#1890ff',
+            activeforeground='white',
+            indicatoron=0,  # 禁用圆点，使用全选样式
+            width=25,
+            pady=8,
+            cursor='hand2'
+        )
+        mosaic_radio.pack(side=tk.LEFT, padx=10)
+
         # 说明标签
         mode_desc = tk.Label(
             mode_container,
@@ -971,6 +3583,8 @@ class AutoScrollScreenshotTool:
             mode = self.stitch_mode_var.get()
             if mode == 'vertical':
                 mode_desc.config(text=self.lang_manager.get('stitch_mode_desc_vertical'))
+            elif mode == 'mosaic':
+                mode_desc.config(text=self.lang_manager.get('stitch_mode_desc_mosaic'))
             else:
                 mode_desc.config(text=self.lang_manager.get('stitch_mode_desc_grid'))
 
@@ -1044,6 +3658,24 @@ class AutoScrollScreenshotTool:
             font=('Microsoft YaHei UI', 12, 'bold'))
         self.count_info.pack(side=tk.LEFT, padx=10)
 
+        # 状态行4：上一次录制的性能摘要
+        row4 = ttk.Frame(status_grid, style='TFrame')
+        row4.pack(fill=tk.X, pady=2)
+
+        ttk.Label(
+            row4,
+            text=f"⏱️ {self.lang_manager.get('profile_label')}",
+            style='Info.TLabel'
+        ).pack(side=tk.LEFT, padx=5)
+
+        self.profile_info = ttk.Label(
+            row4,
+            text=self.profiler.short_summary(self.lang_manager.current_lang) if self.profiler else "",
+            style='Title.TLabel',
+            foreground='#666666'
+        )
+        self.profile_info.pack(side=tk.LEFT, padx=10)
+
         # ============ 预览区域 ============
         preview_frame = ttk.LabelFrame(
             main_container,
@@ -1076,10 +3708,13 @@ class AutoScrollScreenshotTool:
             command=self.preview_canvas.xview
         )
 
+        self.preview_scrollbar_y = scrollbar_y
         self.preview_canvas.configure(
-            yscrollcommand=scrollbar_y.set,
+            yscrollcommand=self.on_preview_scroll,
             xscrollcommand=scrollbar_x.set
         )
+        self.preview_canvas.bind('<Configure>', lambda e: self.render_visible_tiles())
+        self.preview_canvas.bind('<Control-MouseWheel>', self.on_preview_zoom)
 
         self.preview_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
@@ -1123,6 +3758,7 @@ class AutoScrollScreenshotTool:
         for widget in self.root.winfo_children():
             widget.destroy()
         self.create_widgets()
+        self.render_preview()
 
         messagebox.showinfo(
             "Language / 语言",
@@ -1364,139 +4000,285 @@ class AutoScrollScreenshotTool:
         self.region_info.config(text="", foreground='#666666')
         self.status_indicator.config(fg='gray')
 
-    def start_recording(self):
-        """开始录制"""
+    def start_recording(self, resume=None):
+        """
+        开始录制
+        :param resume: 要继续录制的会话目录：先把其中的帧重新送入拼接器，新帧追加到该会话
+        """
         if not self.selection_rect_coords:
             messagebox.showwarning("Warning", self.lang_manager.get('msg_warning_select'))
             return
 
-        if self.is_recording:
+        if self.is_recording or self.restitching:
             return
 
         self.is_recording = True
-        self.screenshots = []
+        self.screenshots.close()
+        self.screenshots = FrameStore(memory_budget=self.frame_memory_budget)
+        self.screenshot_count = 0
+
+        # 垂直模式边录边拼，帧不再整体保留；二维模式边录边定位，帧按内存预算保存；网格模式需要全部原始帧
+        if resume is not None:
+            self.capture_stitch_mode = FrameJournal.read(resume)[0].get('stitch_mode', 'vertical')
+        else:
+            self.capture_stitch_mode = self.stitch_mode_var.get()
+        if self.capture_stitch_mode == 'vertical':
+            self.stitcher = IncrementalStitcher(
+                self.overlap_matcher,
+                memory_limit=self.canvas_memory_limit
+            )
+        elif self.capture_stitch_mode == 'mosaic':
+            self.stitcher = MosaicStitcher(
+                self.overlap_matcher,
+                memory_limit=self.canvas_memory_limit,
+                frame_memory_budget=self.frame_memory_budget
+            )
+        else:
+            self.stitcher = None
+
+        # 帧日志：继续录制时先恢复会话中的帧（此时不写日志），再把新帧追加到同一会话
+        self.journal = None
+        self.resumed_frames = 0
+        session = dict(region=list(self.selection_rect_coords), stitch_mode=self.capture_stitch_mode)
+        if resume is not None:
+            # 恢复要解码并拼接会话中的全部帧，放到后台线程，完成后再开始截图；
+            # 期间停止（按钮或热键）会取消恢复
+            self.capture_pipeline = None
+            self.resuming = True
+            self.resume_cancel = threading.Event()
+            self.start_btn.config(state='disabled')
+            self.stop_btn.config(state='normal')
+            self.status_indicator.config(fg='#faad14')  # 橙色
+            threading.Thread(target=self.replay_session, args=(resume, session, self.resume_cancel),
+                             daemon=True).start()
+            return
+
+        if self.journal_enabled:
+            try:
+                FrameJournal.prune(self.journal_dir, self.journal_keep - 1)
+                self.journal = FrameJournal.create(self.journal_dir, **session)
+            except OSError as e:
+                print(f"[帧日志] 无法写入会话，本次录制不保存帧日志: {e}")
+        self.start_capture()
+
+    def replay_session(self, path, session, cancel):
+        """把会话中的帧重新送入拼接器（在后台线程调用），完成后回到主线程开始截图"""
+        try:
+            count = replay_journal(
+                path, self.store_frame,
+                on_progress=lambda done, total: self.root.after(0, self.on_replay_progress, done, total),
+                stop_event=cancel
+            )
+            error = None
+        except Exception as e:
+            count, error = 0, e
+        self.root.after(0, self.on_session_replayed, path, session, count, error, cancel)
+
+    def on_replay_progress(self, done, total):
+        """恢复会话的进度显示在截图数量一栏"""
+        self.count_info.config(text=self.lang_manager.get('count_resuming', count=done, total=total))
+
+    def on_session_replayed(self, path, session, count, error, cancel):
+        """会话帧恢复完成：打开原会话的帧日志继续追加，然后开始截图"""
+        self.resuming = False
+        if error is not None or cancel.is_set():
+            if error is not None:
+                print(f"[帧日志] 恢复会话失败: {error}")
+            else:
+                print(f"[帧日志] 已取消继续录制（恢复了 {count} 帧）")
+            # 恢复了一部分的拼接器不再使用
+            self.discard_stitcher()
+            self.screenshot_count = 0
+            self.update_count()
+            self.is_recording = False
+            self.start_btn.config(state='normal')
+            self.stop_btn.config(state='disabled')
+            self.status_indicator.config(fg='gray')
+            if error is not None:
+                messagebox.showerror(self.lang_manager.get('session_title'), str(error))
+            return
 
+        self.resumed_frames = count
+        self.screenshot_count = count
+        self.update_count()
+        print(f"[帧日志] 已恢复 {count} 帧，继续录制")
+        try:
+            self.journal = FrameJournal(path)
+            self.journal.write_session(resumed=True, **session)
+        except OSError as e:
+            self.journal = None
+            print(f"[帧日志] 无法写入会话，本次录制不保存帧日志: {e}")
+        self.start_capture()
+
+    def start_capture(self):
+        """启动截图流水线（拼接器和帧日志已准备好）"""
         # 更新UI状态
         self.start_btn.config(state='disabled')
         self.stop_btn.config(state='normal')
         self.status_indicator.config(fg='#52c41a')  # 绿色
 
-        # 立即截取第一张
-        self.take_screenshot()
-
-        # 启动自动截图线程
-        self.recording_thread = threading.Thread(target=self.auto_screenshot_loop, daemon=True)
-        self.recording_thread.start()
+        # 区域高度即每次滚动的距离
+        self.region_height = self.selection_rect_coords[3] - self.selection_rect_coords[1]
+        print(f"[记录] 截图区域高度: {self.region_height}px")
+
+        # 启动截图流水线：截图线程只截图和滚动，其余工作交给工作线程
+        auto_scroll = self.auto_scroll_enabled and self.region_height > 0
+        x1, y1, x2, y2 = self.selection_rect_coords
+        if self.adaptive_settle:
+            self.settle_detector = ScrollSettleDetector(
+                lambda region: self.capture_backend.grab(region),
+                (x1, y1, x2 - x1, y2 - y1),
+                fixed_delay=self.scroll_delay,
+                timeout=self.settle_timeout
+            )
+        else:
+            self.settle_detector = None
+        self.profiler = CaptureProfiler(self.memory_in_use) if self.profiling_enabled else None
+        self.exporter.profiler = self.profiler
+        grab = self.take_screenshot
+        scroll = self.scroll_page if auto_scroll else None
+        is_bottom = self.is_scroll_to_bottom
+        max_no_change = 3 if self.auto_scroll_enabled else None
+        fingerprint = FrameFingerprint
+        if self.capture_stitch_mode == 'mosaic' and auto_scroll:
+            # 二维模式：截图后立即判断是否到边，决定下一次滚动方向；到达最后一行的边缘后停止
+            serpentine = SerpentineScroller(
+                self.take_screenshot,
+                scroll_horizontally,
+                lambda step: pyautogui.scroll(-step),
+                step_x=x2 - x1,
+                step_y=self.region_height,
+                on_finish=lambda: self.root.after(0, self.stop_recording)
+            )
+            grab = serpentine.grab
+            scroll = serpentine.scroll
+            is_bottom = SerpentineScroller.is_duplicate
+            max_no_change = None
+            fingerprint = None
+        self.capture_pipeline = CapturePipeline(
+            grab=grab,
+            scroll=scroll,
+            consume=self.store_frame,
+            is_bottom=is_bottom,
+            max_no_change=max_no_change,
+            scroll_delay=self.scroll_delay,
+            settle=self.settle_detector.wait if self.settle_detector else None,
+            on_frame=self.on_frame_processed,
+            on_bottom=lambda: self.root.after(0, self.stop_recording),
+            fingerprint=fingerprint,
+            profiler=self.profiler,
+            on_error=lambda e: self.root.after(0, self.on_capture_error, e)
+        )
+        self.capture_pipeline.start()
 
     def stop_recording(self):
         """停止录制"""
         if not self.is_recording:
             return
 
+        if self.resuming:
+            # 还在恢复会话中的帧：取消恢复，不开始截图（恢复线程结束后在 on_session_replayed 中清理）
+            self.resume_cancel.set()
+            self.stop_btn.config(state='disabled')
+            return
+
         self.is_recording = False
+        if self.capture_pipeline is None:
+            self.start_btn.config(state='normal')
+            self.stop_btn.config(state='disabled')
+            return
+        self.capture_pipeline.stop()
 
         # 更新UI状态
         self.start_btn.config(state='normal')
         self.stop_btn.config(state='disabled')
         self.status_indicator.config(fg='#4a90e2')  # 蓝色
 
-        # 拼接所有截图
-        if self.screenshots:
-            self.stitch_images()
-
-    def auto_screenshot_loop(self):
-        """自动截图循环（带自动滚动和到底检测）"""
-        screenshot_count = 0
-        prev_screenshot = None
-        no_change_count = 0  # 连续未变化次数
-        max_no_change = 3  # 最大连续未变化次数后停止（增加到3次，减少误判）
-
-        while self.is_recording:
-            # 1. 截取当前区域
-            current_screenshot = self.take_screenshot()
-
-            if current_screenshot:
-                # 记录第一次截图的高度作为区域高度
-                if screenshot_count == 0:
-                    self.region_height = current_screenshot.height
-                    print(f"[记录] 截图区域高度: {self.region_height}px")
-
-                # 检测是否滚动到底（对比前后截图）
-                if prev_screenshot is not None and self.auto_scroll_enabled:
-                    is_bottom = self.is_scroll_to_bottom(prev_screenshot, current_screenshot)
-                    if is_bottom:
-                        no_change_count += 1
-                        print(f"[检测] 检测到滚动到底 (第{no_change_count}次)")
-
-                        if no_change_count >= max_no_change:
-                            print(f"[完成] 检测到页面底部，停止录制")
-                            self.root.after(0, self.stop_recording)
-                            break
-                    else:
-                        no_change_count = 0  # 有变化，重置计数
+        # 等工作线程处理完队列中剩余的帧再拼接（轮询，不阻塞界面）
+        self.stitch_when_drained()
 
-                # 保存截图
-                self.screenshots.append(current_screenshot)
-                prev_screenshot = current_screenshot
-                screenshot_count += 1
+    def stitch_when_drained(self):
+        """流水线结束后拼接所有截图"""
+        if self.capture_pipeline.is_alive():
+            self.root.after(20, self.stitch_when_drained)
+            return
 
-                # 更新计数
-                self.root.after(0, self.update_count)
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
 
-                # 2. 如果启用了自动滚动，模拟滚动一个区域高度
-                if self.auto_scroll_enabled and self.region_height > 0:
-                    try:
-                        # 使用鼠标滚轮滚动（向上滚动，正值向下）
-                        pyautogui.scroll(-self.region_height)
-                        print(f"[滚动] 滚动 {self.region_height}px")
+        if self.settle_detector is not None:
+            stats = self.settle_detector.stats()
+            print(f"[稳定检测] 等待 {stats['settles']} 次，共 {stats['total_wait']:.2f}s"
+                  f"（平均 {stats['average_wait'] * 1000:.0f}ms，超时 {stats['timeouts']} 次），"
+                  f"相比固定等待节省 {stats['saved']:.2f}s")
 
-                        # 等待内容加载
-                        time.sleep(self.scroll_delay)
+        if self.screenshot_count:
+            self.stitch_images()
 
-                    except Exception as e:
-                        print(f"[滚动失败] {e}")
-                else:
-                    # 不自动滚动，只是定时截图
-                    time.sleep(0.2)
+    def scroll_page(self):
+        """模拟滚动一个区域高度（在截图线程调用）"""
+        # 使用鼠标滚轮滚动（向上滚动，正值向下）
+        pyautogui.scroll(-self.region_height)
+        print(f"[滚动] 滚动 {self.region_height}px")
+
+    def store_frame(self, frame):
+        """保存一帧（在工作线程调用）：垂直/二维模式直接送入拼接器，网格模式保存原始帧；同时写入帧日志"""
+        image = frame.image if isinstance(frame, FrameFingerprint) else frame
+        offset = None
+        if self.stitcher is not None:
+            offset = self.stitcher.add_frame(frame)
+        else:
+            self.screenshots.append(image)
+        if self.journal is not None:
+            self.journal.append(image, move=getattr(frame, 'move', None), offset=offset)
+
+    def memory_in_use(self):
+        """录制帧和拼接画布当前占用的内存字节数（磁盘画布不计入）"""
+        usage = self.screenshots.memory_usage
+        stitcher = self.stitcher
+        if stitcher is not None and isinstance(stitcher.canvas, MemoryCanvas):
+            usage += stitcher.canvas.nbytes
+        if isinstance(stitcher, MosaicStitcher):
+            usage += stitcher.tiles.memory_usage
+        return usage
+
+    def discard_stitcher(self):
+        """丢弃拼接器，释放它的画布和保存的帧"""
+        stitcher, self.stitcher = self.stitcher, None
+        if stitcher is None:
+            return
+        if stitcher.canvas is not None:
+            stitcher.canvas.close()
+        if isinstance(stitcher, MosaicStitcher):
+            stitcher.tiles.close()
 
-            else:
-                # 截图失败，等待一下再重试
-                time.sleep(0.2)
+    def on_capture_error(self, error):
+        """工作线程处理帧出错：停止录制，已处理的帧照常拼接"""
+        self.stop_recording()
+        messagebox.showerror("Error", self.lang_manager.get('msg_capture_error', error=str(error)))
 
-        print(f"[完成] 共截取 {screenshot_count} 张图片")
+    def on_frame_processed(self, count):
+        """工作线程每处理完一帧后更新计数"""
+        self.screenshot_count = self.resumed_frames + count
+        self.root.after(0, self.update_count)
 
     def is_scroll_to_bottom(self, img1, img2, threshold=0.90):
         """
         判断是否滚动到底（对比两张图片是否相似）
-        :param img1: 前一张图片
-        :param img2: 当前图片
+        :param img1: 前一张图片或 FrameFingerprint
+        :param img2: 当前图片或 FrameFingerprint（两者都是指纹时只比较行哈希）
         :param threshold: 相似度阈值（0-1），超过此值认为已经到底（默认90%）
         :return: True 表示已经滚动到底，False 表示还可以继续滚动
         """
         try:
-            # 确保图片尺寸相同
-            if img1.size != img2.size:
-                return False
-
-            # 转换为RGB模式
-            if img1.mode != 'RGB':
-                img1 = img1.convert('RGB')
-            if img2.mode != 'RGB':
-                img2 = img2.convert('RGB')
-
-            # 获取像素数据（使用 get_flattened_data 替代已弃用的 getdata）
-            data1 = list(img1.get_flattened_data())
-            data2 = list(img2.get_flattened_data())
-
-            # 计算相同像素的数量
-            same_pixels = sum(1 for p1, p2 in zip(data1, data2) if p1 == p2)
-
-            # 计算相似度
-            similarity = same_pixels / len(data1)
+            # 固定表头/底栏在每帧都相同，只对比中间的内容区域
+            sticky_bands = self.stitcher.sticky_bands if self.stitcher is not None else (0, 0)
+            unchanged, similarity = frames_unchanged(img1, img2, threshold, sticky_bands, self.frame_comparator)
 
             print(f"[相似度] {similarity:.3f} (阈值: {threshold})")
 
-            return similarity >= threshold
+            return unchanged
 
         except Exception as e:
             print(f"[对比错误] {e}")
@@ -1517,8 +4299,17 @@ class AutoScrollScreenshotTool:
                 return None
 
             # 截取指定区域
-            screenshot = pyautogui.screenshot(region=(x1, y1, width, height))
-            return screenshot
+            region = (x1, y1, width, height)
+            try:
+                return self.capture_backend.grab(region)
+            except Exception as e:
+                if isinstance(self.capture_backend, PyAutoGUICaptureBackend):
+                    raise
+                # 快速后端失败时回退到 pyautogui
+                print(f"[截图后端] {self.capture_backend.name} 截图失败，回退到 pyautogui: {e}")
+                self.capture_backend.close()
+                self.capture_backend = PyAutoGUICaptureBackend()
+                return self.capture_backend.grab(region)
 
         except Exception as e:
             print(f"截图错误: {e}")
@@ -1526,48 +4317,63 @@ class AutoScrollScreenshotTool:
 
     def update_count(self):
         """更新截图数量显示"""
-        count = len(self.screenshots)
+        count = self.screenshot_count
         self.count_label.config(text=self.lang_manager.get('count_value', count=count))
         self.count_info.config(text=str(count))
 
     def stitch_images(self):
         """拼接所有截图（根据选择的拼接模式）"""
-        if not self.screenshots:
+        if not self.screenshot_count:
             return
 
         try:
-            # 获取选择的拼接模式
-            stitch_mode = self.stitch_mode_var.get()
-            print(f"[拼接] 开始拼接 {len(self.screenshots)} 张图片... 拼接模式: {stitch_mode}")
+            # 拼接模式以开始录制时的选择为准
+            stitch_mode = self.capture_stitch_mode
+            print(f"[拼接] 开始拼接 {self.screenshot_count} 张图片... 拼接模式: {stitch_mode}")
             start_time = time.time()
 
             # 根据拼接模式选择不同的拼接算法
+            self.release_result_canvas()
             if stitch_mode == 'grid':
-                # 网格拼接
-                self.result_image = AutoScrollScreenshotTool.stitch_grid(
-                    self.screenshots,
+                # 网格拼接：逐行写出，超大结果写入磁盘分块画布
+                compositor = GridCompositor(
                     max_columns=6,  # 最多6列，使拼接结果更接近方形
                     gap=20,  # 间距20像素
-                    bg_color=(255, 255, 255)  # 白色背景
+                    bg_color=(255, 255, 255),  # 白色背景
+                    memory_limit=self.canvas_memory_limit
                 )
+                self.result_image = compositor.compose(self.screenshots)
+                self.result_canvas = compositor.canvas
                 print(f"[拼接] 网格拼接完成")
+            elif stitch_mode == 'mosaic':
+                # 二维拼接：录制时已确定每帧位置，这里按条带合成
+                self.result_image = self.stitcher.result()
+                self.result_canvas = self.stitcher.canvas
+                print(f"[拼接] 二维拼接完成")
             else:
-                # 垂直拼接（默认）
-                self.result_image = AutoScrollScreenshotTool.stitch_simple(self.screenshots)
+                # 垂直拼接（默认）：录制时已增量拼接完成，这里直接取结果
+                self.result_image = self.stitcher.result()
+                self.result_canvas = self.stitcher.canvas
                 print(f"[拼接] 垂直拼接完成")
 
             end_time = time.time()
             print(f"[拼接] 总耗时 {(end_time - start_time) * 1000:.1f}ms")
+            if self.profiler is not None:
+                self.profiler.record_event('stitch', (end_time - start_time) * 1000, mode=stitch_mode)
+                self.write_profile_report()
             print(f"[拼接] 最终尺寸: {self.result_image.width}x{self.result_image.height}")
 
+            # 新结果交给导出管线，旧的编码缓存随之失效
+            self.exporter.set_source(self.result_canvas or self.result_image)
+
             # 更新预览
             self.update_preview()
 
             # 显示成功消息
-            mode_text = self.lang_manager.get('stitch_mode_vertical') if stitch_mode == 'vertical' else self.lang_manager.get('stitch_mode_grid')
+            mode_text = self.lang_manager.get(f'stitch_mode_{stitch_mode}')
             messagebox.showinfo(
                 "Success",
-                f"{self.lang_manager.get('msg_success_stitched', count=len(self.screenshots), width=self.result_image.width, height=self.result_image.height)}\n\n拼接模式: {mode_text}"
+                f"{self.lang_manager.get('msg_success_stitched', count=self.screenshot_count, width=self.result_image.width, height=self.result_image.height)}\n\n拼接模式: {mode_text}"
             )
 
         except Exception as e:
@@ -1576,44 +4382,209 @@ class AutoScrollScreenshotTool:
             traceback.print_exc()
             messagebox.showerror("Error", self.lang_manager.get('msg_error_stitch', error=str(e)))
 
-    def update_preview(self):
-        """更新预览显示"""
-        if not hasattr(self, 'result_image'):
+    def write_profile_report(self):
+        """写出本次录制的性能报告，并在状态栏显示摘要"""
+        profiler = self.profiler
+        if profiler.report_path is None:
+            extension = 'csv' if self.profile_report_format == 'csv' else 'json'
+            filename = f"capture_{profiler.started_at.strftime('%Y%m%d_%H%M%S')}.{extension}"
+            profiler.write_report(os.path.join(self.profile_report_dir, filename))
+        else:
+            profiler.write_report(profiler.report_path)
+
+        print("[性能] " + "\n[性能] ".join(profiler.summary_lines()))
+        if profiler.report_path:
+            print(f"[性能] 报告已写出: {profiler.report_path}")
+        self.profile_info.config(text=profiler.short_summary(self.lang_manager.current_lang))
+
+    def show_profile_report(self):
+        """显示上一次录制的性能报告摘要"""
+        if self.profiler is None or not self.profiler.frames:
+            messagebox.showinfo(self.lang_manager.get('profile_report_title'), self.lang_manager.get('msg_no_profile'))
             return
 
-        # 缩放图片以适应预览
-        canvas_width = 800
-        scale = min(canvas_width / self.result_image.width, 1.0)
+        lines = self.profiler.summary_lines(self.lang_manager.current_lang)
+        if self.profiler.report_path:
+            lines.append("")
+            lines.append(self.lang_manager.get('profile_report_path', path=self.profiler.report_path))
+        messagebox.showinfo(self.lang_manager.get('profile_report_title'), "\n".join(lines))
 
-        display_width = int(self.result_image.width * scale)
-        display_height = int(self.result_image.height * scale)
+    def open_session(self):
+        """选择一个录制会话，继续录制或用当前拼接模式重新拼接"""
+        if self.is_recording or self.restitching:
+            return
 
-        # 使用 Resampling.LANCZOS（兼容 Pillow 9.0+）
-        try:
-            resampling_filter = Image.Resampling.LANCZOS
-        except AttributeError:
-            # 旧版本 Pillow 使用 Image.LANCZOS
-            resampling_filter = Image.LANCZOS
+        path = filedialog.askdirectory(
+            title=self.lang_manager.get('session_title'),
+            initialdir=self.journal_dir if os.path.isdir(self.journal_dir) else None
+        )
+        if not path:
+            return
+
+        session, records = FrameJournal.read(path)
+        if not records:
+            messagebox.showwarning(self.lang_manager.get('session_title'), self.lang_manager.get('msg_session_empty'))
+            return
+
+        answer = messagebox.askyesnocancel(
+            self.lang_manager.get('session_title'),
+            self.lang_manager.get('msg_session_action', name=os.path.basename(path), count=len(records))
+        )
+        if answer is None:
+            return
+        if not answer:
+            self.restitch_session(path)
+        elif session.get('stitch_mode') == 'mosaic':
+            messagebox.showwarning(self.lang_manager.get('session_title'),
+                                   self.lang_manager.get('msg_session_resume_mode'))
+        else:
+            self.start_recording(resume=path)
+
+    def restitch_session(self, path):
+        """用当前选择的拼接模式重新拼接会话中保存的帧（不需要重新截图）；在后台线程解码和拼接"""
+        stitch_mode = self.stitch_mode_var.get()
+        self.restitching = True
+        self.start_btn.config(state='disabled')
+        self.session_btn.config(state='disabled')
+        self.status_indicator.config(fg='#faad14')  # 橙色
+        self.release_result_canvas()
+
+        def work():
+            start_time = time.time()
+            try:
+                result = restitch_journal(
+                    path,
+                    stitch_mode,
+                    matcher=self.overlap_matcher,
+                    canvas_memory_limit=self.canvas_memory_limit,
+                    frame_memory_budget=self.frame_memory_budget,
+                    on_progress=lambda done, total: self.root.after(0, self.on_replay_progress, done, total)
+                )
+                error = None
+            except Exception as e:
+                import traceback
+                traceback.print_exc()
+                result, error = None, e
+            self.root.after(0, self.on_session_restitched, stitch_mode, result, error, time.time() - start_time)
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def on_session_restitched(self, stitch_mode, result, error, elapsed):
+        """重新拼接完成（主线程）：显示结果"""
+        self.restitching = False
+        self.start_btn.config(state='normal')
+        self.session_btn.config(state='normal')
+        self.status_indicator.config(fg='#4a90e2')  # 蓝色
+
+        if error is not None:
+            print(f"[拼接错误] {error}")
+            self.update_count()
+            messagebox.showerror("Error", self.lang_manager.get('msg_error_stitch', error=str(error)))
+            return
+
+        image, canvas, count = result
+        if image is None:
+            self.update_count()
+            messagebox.showwarning(self.lang_manager.get('session_title'),
+                                   self.lang_manager.get('msg_session_empty'))
+            return
+        print(f"[拼接] 重新拼接完成，耗时 {elapsed * 1000:.1f}ms")
+
+        self.result_image = image
+        self.result_canvas = canvas
+        self.screenshot_count = count
+        self.update_count()
+        self.exporter.set_source(self.result_canvas or self.result_image)
+        self.update_preview()
 
-        display_image = self.result_image.resize(
-            (display_width, display_height),
-            resampling_filter
+        messagebox.showinfo(
+            "Success",
+            f"{self.lang_manager.get('msg_success_stitched', count=count, width=image.width, height=image.height)}"
+            f"\n\n拼接模式: {self.lang_manager.get(f'stitch_mode_{stitch_mode}')}"
         )
 
-        self.preview_photo = ImageTk.PhotoImage(display_image)
+    def update_preview(self):
+        """更新预览显示：在后台线程生成预览金字塔，只渲染可见区域的图块"""
+        if not hasattr(self, 'result_image'):
+            return
+
+        if self.preview_pyramid is not None:
+            self.preview_pyramid.cancel()
 
-        # 在画布上显示
-        self.preview_canvas.delete("all")
-        self.preview_canvas.create_image(
-            0, 0,
-            anchor=tk.NW,
-            image=self.preview_photo
+        self.preview_pyramid = PreviewPyramid(
+            self.result_image,
+            target_width=800,
+            on_tile=lambda level, index: self.root.after(0, self.on_preview_tile_ready, level)
         )
+        self.preview_level = 0
+        self.render_preview()
+        self.preview_pyramid.start()
+
+    def render_preview(self):
+        """按当前级别重置画布并渲染可见图块"""
+        self.preview_canvas.delete("all")
+        self.preview_items = {}
+        if self.preview_pyramid is None:
+            return
 
         # 设置滚动区域
+        display_width, display_height = self.preview_pyramid.size(self.preview_level)
         self.preview_canvas.config(
             scrollregion=(0, 0, display_width, display_height)
         )
+        self.render_visible_tiles()
+
+    def render_visible_tiles(self):
+        """只为可见范围（上下各多留一个图块）内的图块创建 PhotoImage，移出范围的释放掉"""
+        pyramid = self.preview_pyramid
+        if pyramid is None:
+            return
+
+        tile_height = pyramid.tile_height
+        top = self.preview_canvas.canvasy(0)
+        bottom = top + max(self.preview_canvas.winfo_height(), tile_height)
+        first = max(0, int(top // tile_height) - 1)
+        last = min(pyramid.tile_count(self.preview_level) - 1, int(bottom // tile_height) + 1)
+
+        for index in list(self.preview_items):
+            if index < first or index > last:
+                item, _ = self.preview_items.pop(index)
+                self.preview_canvas.delete(item)
+
+        for index in range(first, last + 1):
+            if index in self.preview_items:
+                continue
+            tile = pyramid.get_tile(self.preview_level, index)
+            if tile is None:
+                continue
+            photo = ImageTk.PhotoImage(tile)
+            item = self.preview_canvas.create_image(
+                0, index * tile_height,
+                anchor=tk.NW,
+                image=photo
+            )
+            # 保留 PhotoImage 引用，否则会被回收
+            self.preview_items[index] = (item, photo)
+
+    def on_preview_tile_ready(self, level):
+        """后台线程生成图块后，在主线程刷新可见区域"""
+        if level == self.preview_level:
+            self.render_visible_tiles()
+
+    def on_preview_scroll(self, first, last):
+        """预览画布滚动时同步滚动条并渲染新进入可见范围的图块"""
+        self.preview_scrollbar_y.set(first, last)
+        self.render_visible_tiles()
+
+    def on_preview_zoom(self, event):
+        """Ctrl+滚轮切换预览金字塔级别"""
+        if self.preview_pyramid is None:
+            return
+        step = 1 if event.delta < 0 or getattr(event, 'num', None) == 5 else -1
+        level = min(max(self.preview_level + step, 0), self.preview_pyramid.levels - 1)
+        if level != self.preview_level:
+            self.preview_level = level
+            self.render_preview()
 
     def save_result(self):
         """保存结果"""
@@ -1638,34 +4609,12 @@ class AutoScrollScreenshotTool:
 
         if file_path:
             try:
-                # 根据文件扩展名使用最优保存参数
+                # 根据文件扩展名选择格式，其他格式默认使用 PNG
                 file_ext = os.path.splitext(file_path)[1].lower()
+                save_format = 'JPEG' if file_ext in ['.jpg', '.jpeg'] else 'PNG'
 
-                if file_ext == '.png':
-                    # PNG: 无损压缩，最高质量
-                    self.result_image.save(
-                        file_path,
-                        format='PNG',
-                        compress_level=0,  # 0 = 无压缩（最高质量），9 = 最大压缩
-                        optimize=False    # 不优化，保持原始质量
-                    )
-                elif file_ext in ['.jpg', '.jpeg']:
-                    # JPEG: 最高质量
-                    self.result_image.save(
-                        file_path,
-                        format='JPEG',
-                        quality=100,        # 1-100，100 = 最高质量
-                        subsampling=0,      # 0 = 无子采样（最高质量），2 = 标准子采样
-                        optimize=False
-                    )
-                else:
-                    # 其他格式默认使用 PNG
-                    self.result_image.save(
-                        file_path,
-                        format='PNG',
-                        compress_level=0,
-                        optimize=False
-                    )
+                # 编码结果会被缓存，之后复制到剪贴板无需重复编码
+                self.exporter.save(file_path, save_format)
 
                 messagebox.showinfo(
                     "Success",
@@ -1673,7 +4622,7 @@ class AutoScrollScreenshotTool:
                                         path=file_path,
                                         width=self.result_image.width,
                                         height=self.result_image.height,
-                                        count=len(self.screenshots))
+                                        count=self.screenshot_count)
                 )
             except Exception as e:
                 messagebox.showerror("Error", self.lang_manager.get('msg_error_save', error=str(e)))
@@ -1695,114 +4644,54 @@ class AutoScrollScreenshotTool:
             self.root.after(0, self._copy_to_clipboard_impl)
 
     def _copy_to_clipboard_impl(self):
-        """复制图片到剪贴板的实际实现（必须在主线程调用）"""
-        import platform
-
-        # Windows 平台
-        if platform.system() == 'Windows':
-            try:
-                import win32clipboard
-                import win32con
-
-                # 保存为最高质量 PNG 到内存
-                png_bytes = io.BytesIO()
-                self.result_image.save(
-                    png_bytes,
-                    format='PNG',
-                    compress_level=0,  # 无压缩，最高质量
-                    optimize=False
-                )
-                png_bytes.seek(0)
-
-                # 打开剪贴板（必须在主线程）
-                win32clipboard.OpenClipboard()
-                try:
-                    win32clipboard.EmptyClipboard()
-
-                    # 方法1: 使用 CF_DIBV5（现代应用，支持更多颜色）
-                    try:
-                        win32clipboard.SetClipboardData(win32con.CF_DIBV5, self.result_image.tobytes())
-                        print("[成功] 使用 CF_DIBV5 格式复制图片（最高质量）")
-                    except:
-                        pass
-
-                    # 方法2: 使用 CF_DIB（兼容旧应用）
-                    win32clipboard.SetClipboardData(win32con.CF_DIB, self.result_image.tobytes())
-                    print("[成功] 使用 CF_DIB 格式复制图片（兼容）")
-
-                finally:
-                    win32clipboard.CloseClipboard()
-
-                png_bytes.close()
-
-                messagebox.showinfo(
-                    "Success",
-                    f"图片已复制到剪贴板（最高质量）！\n\n尺寸: {self.result_image.width}x{self.result_image.height}px\n格式: PNG 无损 + CF_DIBV5/CF_DIB 双格式\n\n可以直接粘贴到画图、Word、微信等应用中。"
-                )
-                return
-
-            except ImportError:
-                print("[警告] win32clipboard 未安装，尝试使用其他方法...")
-            except Exception as e:
-                print(f"[错误] 复制图片失败: {e}")
-                import traceback
-                traceback.print_exc()
-
-        # 备选方案：保存临时文件
-        try:
-            import tempfile
-
-            # 保存到临时文件（使用最高质量 PNG）
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-                temp_path = tmp.name
-
-            # 使用最高质量保存
-            self.result_image.save(
-                temp_path,
-                format='PNG',
-                compress_level=0,  # 无压缩
-                optimize=False
-            )
-
-            # macOS/Linux 处理
-            if platform.system() == 'Darwin':
-                # macOS
-                import subprocess
-                subprocess.run(['osascript', '-e',
-                    f'set the clipboard to (read file "{temp_path}" as «class PNGf»)'],
-                    check=True)
-            elif platform.system() == 'Linux':
-                # Linux: 使用 xclip
-                try:
-                    import subprocess
-                    with open(temp_path, 'rb') as f:
-                        png_data = f.read()
-                    subprocess.run(['xclip', '-selection', 'clipboard', '-t', 'image/png'],
-                                 input=png_data, check=True)
-                except:
-                    # 回退方案：复制文件路径
-                    pyperclip.copy(f"file://{temp_path}")
-
-            messagebox.showinfo(
-                "Success",
-                self.lang_manager.get('msg_success_copied')
-            )
-
-        except Exception as e:
-            messagebox.showerror("Error", self.lang_manager.get('msg_error_copy', error=str(e)))
-            import traceback
-            traceback.print_exc()
+        """复制图片到剪贴板的实际实现（必须在主线程调用，后台完成的部分通过 root.after 回到主线程）"""
+        size = self.result_image.size
+        self.clipboard.copy(lambda error, method: self.root.after(0, self.on_clipboard_copied, error, method, size))
+
+    def on_clipboard_copied(self, error, method, size):
+        """剪贴板复制完成"""
+        if error is not None:
+            messagebox.showerror("Error", self.lang_manager.get('msg_error_copy', error=str(error)))
+            return
+        messagebox.showinfo(
+            "Success",
+            f"{self.lang_manager.get('msg_success_copied')}\n\n{size[0]}x{size[1]}px · {method}"
+        )
 
-        except Exception as e:
-            print(f"[错误] 复制失败: {e}")
-            messagebox.showerror("Error", self.lang_manager.get('msg_error_copy', error=str(e)))
+    def set_export_preset(self, preset):
+        """切换导出预设：重建导出管线（沿用当前结果和性能记录），并保存到设置"""
+        if preset == self.export_preset:
+            return
+        self.export_preset = preset
+        exporter = ImageExporter(preset)
+        exporter.profiler = self.exporter.profiler
+        exporter.set_source(self.exporter.source)
+        self.exporter = exporter
+        self.clipboard.exporter = exporter
+        self.settings_manager.set('export_preset', preset)
+        print(f"[导出] 预设切换为 {preset}")
+
+    def release_result_canvas(self):
+        """释放上一次结果占用的画布（删除磁盘画布的临时文件）"""
+        if self.result_canvas is not None:
+            self.result_canvas.close()
+            self.result_canvas = None
 
     def clear_all(self):
         """清空所有内容"""
-        self.screenshots = []
+        self.screenshots.close()
+        self.screenshots = FrameStore(memory_budget=self.frame_memory_budget)
+        self.screenshot_count = 0
+        self.stitcher = None
+        if self.preview_pyramid is not None:
+            self.preview_pyramid.cancel()
+            self.preview_pyramid = None
         self.preview_canvas.delete("all")
+        self.preview_items = {}
         if hasattr(self, 'result_image'):
             del self.result_image
+        self.exporter.set_source(None)
+        self.release_result_canvas()
         self.count_label.config(text=self.lang_manager.get('count_label'))
         self.count_info.config(text="0")
         self.status_indicator.config(fg='gray')
@@ -2026,12 +4915,864 @@ class AutoScrollScreenshotTool:
             
     def on_closing(self):
         """窗口关闭事件"""
-        self.hotkey_manager.unregister_all_hotkeys()
+        if self.deferred_startup_done:
+            self.hotkey_manager.unregister_all_hotkeys()
+        self.release_result_canvas()
+        self.screenshots.close()
+        self.clipboard.close()
+        if self.journal is not None:
+            self.journal.close()
+        if self._capture_backend is not None:
+            self._capture_backend.close()
         self.root.destroy()
 
 
+class HeadlessCapture:
+    """
+    无界面截图 - 不创建 Tk 窗口和预览，直接运行与界面相同的截图、拼接、导出流程
+    供命令行（python 长截图.py capture ...）和脚本批量调用
+    """
+
+    def __init__(self, region, scroll_step=None, stitch_mode='vertical', scroll_delay=0.5,
+                 adaptive_settle=True, settle_timeout=1.0, max_no_change=3, threshold=0.90,
+                 max_frames=None, timeout=None, backend='auto', preset='fast',
+                 canvas_memory_limit=256 * 1024 * 1024, frame_memory_budget=512 * 1024 * 1024,
+                 profile=False, scroll=None, hscroll_step=None, hscroll=None, journal_dir=None, resume=None):
+        """
+        :param region: 截图区域 (x, y, 宽, 高)
+        :param scroll_step: 每次滚动的距离，默认为区域高度（与界面一致）；0 表示不滚动
+        :param stitch_mode: 'vertical'、'grid' 或 'mosaic'（蛇形二维滚动）
+        :param max_no_change: 连续多少帧没有变化时认为到底
+        :param threshold: 判定为没有变化的相似度阈值
+        :param max_frames: 最多保存的帧数，None 表示不限制
+        :param timeout: 最长录制时间（秒），None 表示不限制
+        :param backend: 截图后端名称（见 CAPTURE_BACKENDS，'auto' 自动选择）或 CaptureBackend 实例
+        :param profile: 是否记录各阶段耗时（CaptureProfiler）
+        :param scroll: 滚动函数 (距离)，默认用 pyautogui 模拟鼠标滚轮
+        :param hscroll_step: 二维模式每次横向滚动的距离，默认为区域宽度
+        :param hscroll: 横向滚动函数 (距离，正值向右)，默认为 scroll_horizontally
+        :param journal_dir: 帧日志目录，录制的帧写入其中新建的会话，None 表示不写日志
+        :param resume: 要继续录制的会话目录（恢复其中的帧，新帧追加到该会话，拼接模式沿用会话的设置）
+        """
+        self.region = tuple(region)
+        self.scroll_step = region[3] if scroll_step is None else scroll_step
+        self.hscroll_step = region[2] if hscroll_step is None else hscroll_step
+        self.hscroll_func = hscroll or scroll_horizontally
+        self.journal_dir = journal_dir
+        self.resume = resume
+        self.journal = None
+        if resume is not None:
+            stitch_mode = FrameJournal.read(resume)[0].get('stitch_mode', stitch_mode)
+        self.stitch_mode = stitch_mode
+        self.scroll_delay = scroll_delay
+        self.adaptive_settle = adaptive_settle
+        self.settle_timeout = settle_timeout
+        self.max_no_change = max_no_change
+        self.threshold = threshold
+        self.max_frames = max_frames
+        self.timeout = timeout
+        self.backend_name = backend
+        self.scroll_func = scroll
+        self.canvas_memory_limit = canvas_memory_limit
+        self.frame_memory_budget = frame_memory_budget
+
+        self.backend = None
+        self.stitcher = None
+        self.screenshots = None
+        self.canvas = None
+        self.image = None
+        self.pipeline = None
+        self.stored = 0
+        self.profiler = CaptureProfiler(self.memory_in_use) if profile else None
+        self.exporter = ImageExporter(preset)
+        self.exporter.profiler = self.profiler
+
+    def grab(self):
+        """截取区域（在截图线程调用），快速后端失败时回退到 pyautogui"""
+        try:
+            return self.backend.grab(self.region)
+        except Exception as e:
+            if isinstance(self.backend, PyAutoGUICaptureBackend):
+                print(f"截图错误: {e}")
+                return None
+            print(f"[截图后端] {self.backend.name} 截图失败，回退到 pyautogui: {e}")
+            self.backend.close()
+            self.backend = PyAutoGUICaptureBackend()
+            return self.grab()
+
+    def scroll(self):
+        self.scroll_down(self.scroll_step)
+
+    def scroll_down(self, step):
+        if self.scroll_func is not None:
+            self.scroll_func(step)
+        else:
+            pyautogui.scroll(-step)
+
+    def is_unchanged(self, prev_frame, frame):
+        """当前帧与上一帧是否相同（没有滚动），固定表头/底栏不参与比较"""
+        sticky_bands = self.stitcher.sticky_bands if self.stitcher is not None else (0, 0)
+        return frames_unchanged(prev_frame, frame, self.threshold, sticky_bands)[0]
+
+    def store(self, frame):
+        """保存一帧（在工作线程调用），达到 max_frames 后停止录制"""
+        if self.max_frames is not None and self.stored >= self.max_frames:
+            return
+        offset = None
+        if self.stitcher is not None:
+            offset = self.stitcher.add_frame(frame)
+        else:
+            self.screenshots.append(frame.image)
+        if self.journal is not None:
+            self.journal.append(frame.image, move=getattr(frame, 'move', None), offset=offset)
+        self.stored += 1
+        if self.max_frames is not None and self.stored >= self.max_frames:
+            print(f"[命令行] 已达到最大帧数 {self.max_frames}，停止录制")
+            if self.pipeline is not None:
+                self.pipeline.stop()
+
+    def memory_in_use(self):
+        """录制帧和拼接画布当前占用的内存字节数（磁盘画布不计入）"""
+        usage = self.screenshots.memory_usage if self.screenshots is not None else 0
+        if self.stitcher is not None and isinstance(self.stitcher.canvas, MemoryCanvas):
+            usage += self.stitcher.canvas.nbytes
+        if isinstance(self.stitcher, MosaicStitcher):
+            usage += self.stitcher.tiles.memory_usage
+        return usage
+
+    def run(self):
+        """
+        录制并拼接，直到检测到底部、达到最大帧数、超时或按 Ctrl+C
+        :return: 结果图片（垂直模式的超长结果映射自磁盘画布），没有截到任何帧时返回 None
+        """
+        if isinstance(self.backend_name, CaptureBackend):
+            self.backend = self.backend_name
+        else:
+            self.backend = create_capture_backend(self.backend_name)
+        if self.stitch_mode == 'vertical':
+            self.stitcher = IncrementalStitcher(memory_limit=self.canvas_memory_limit)
+        elif self.stitch_mode == 'mosaic':
+            self.stitcher = MosaicStitcher(memory_limit=self.canvas_memory_limit,
+                                           frame_memory_budget=self.frame_memory_budget)
+        else:
+            self.screenshots = FrameStore(memory_budget=self.frame_memory_budget)
+
+        session = dict(region=list(self.region), stitch_mode=self.stitch_mode)
+        if self.resume is not None:
+            replay_journal(self.resume, self.store)
+            print(f"[帧日志] 已恢复 {self.stored} 帧，继续录制")
+            self.journal = FrameJournal(self.resume)
+            self.journal.write_session(resumed=True, **session)
+        elif self.journal_dir is not None:
+            self.journal = FrameJournal.create(self.journal_dir, **session)
+
+        settle = None
+        if self.scroll_step and self.adaptive_settle:
+            settle = ScrollSettleDetector(
+                lambda region: self.backend.grab(region), self.region,
+                fixed_delay=self.scroll_delay, timeout=self.settle_timeout
+            ).wait
+
+        self.pipeline = CapturePipeline(
+            grab=self.grab,
+            scroll=self.scroll if self.scroll_step else None,
+            consume=self.store,
+            is_bottom=self.is_unchanged,
+            max_no_change=self.max_no_change if self.scroll_step else None,
+            scroll_delay=self.scroll_delay,
+            settle=settle,
+            fingerprint=FrameFingerprint,
+            profiler=self.profiler
+        )
+        if self.stitch_mode == 'mosaic' and self.scroll_step and self.hscroll_step:
+            # 蛇形滚动：截图线程根据到边检测决定下一次滚动方向，走完最后一行后停止
+            serpentine = SerpentineScroller(
+                self.grab, self.hscroll_func, self.scroll_down,
+                self.hscroll_step, self.scroll_step,
+                threshold=self.threshold, on_finish=self.pipeline.stop
+            )
+            self.pipeline.grab = serpentine.grab
+            self.pipeline.scroll = serpentine.scroll
+            self.pipeline.is_bottom = SerpentineScroller.is_duplicate
+            self.pipeline.max_no_change = None
+            self.pipeline.fingerprint = None
+
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        self.pipeline.start()
+        try:
+            while self.pipeline.is_alive():
+                self.pipeline.join(0.05)
+                if deadline is not None and time.perf_counter() > deadline:
+                    print(f"[命令行] 超过 {self.timeout}s，停止录制")
+                    self.pipeline.stop()
+                    deadline = None
+        except KeyboardInterrupt:
+            print("[命令行] 已中断，拼接已截取的帧")
+            self.pipeline.stop()
+            self.pipeline.join()
+        if self.journal is not None:
+            self.journal.close()
+
+        if not self.stored:
+            return None
+
+        stitch_start = time.perf_counter()
+        if self.stitcher is not None:
+            self.image = self.stitcher.result()
+            self.canvas = self.stitcher.canvas
+        else:
+            compositor = GridCompositor(max_columns=6, gap=20, memory_limit=self.canvas_memory_limit)
+            self.image = compositor.compose(self.screenshots)
+            self.canvas = compositor.canvas
+            self.screenshots.close()
+        elapsed_ms = (time.perf_counter() - stitch_start) * 1000
+        print(f"[命令行] {self.stored} 帧拼接为 {self.image.width}x{self.image.height}，耗时 {elapsed_ms:.0f}ms")
+        if self.profiler is not None:
+            self.profiler.record_event('stitch', elapsed_ms, mode=self.stitch_mode)
+
+        self.exporter.set_source(self.canvas or self.image)
+        return self.image
+
+    def save(self, path):
+        """按扩展名保存结果（.jpg/.jpeg 为 JPEG，其余为 PNG）"""
+        save_format = 'JPEG' if os.path.splitext(path)[1].lower() in ('.jpg', '.jpeg') else 'PNG'
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.exporter.save(path, save_format)
+        return path
+
+    def close(self):
+        """释放截图后端、帧存储和画布（删除临时文件），帧日志写完后保留"""
+        if self.journal is not None:
+            self.journal.close()
+        if self.backend is not None:
+            self.backend.close()
+        if self.screenshots is not None:
+            self.screenshots.close()
+        if self.canvas is not None:
+            self.canvas.close()
+        self.exporter.set_source(None)
+        self.image = None
+
+
+def build_cli_parser():
+    """命令行参数（python 长截图.py capture ...）"""
+    parser = argparse.ArgumentParser(
+        prog='长截图.py capture',
+        description='不打开界面，按指定区域自动滚动截图并拼接保存'
+    )
+    parser.add_argument('--region', nargs=4, type=int, metavar=('X', 'Y', 'W', 'H'),
+                        help='截图区域（屏幕坐标），--restitch 时不需要')
+    parser.add_argument('-o', '--output', required=True,
+                        help='输出文件，.jpg/.jpeg 保存为 JPEG，其余保存为 PNG；可使用 {time} 代表时间戳')
+    parser.add_argument('--scroll-step', type=int, default=None,
+                        help='每次滚动的距离，默认为区域高度；0 表示不滚动，只定时截图')
+    parser.add_argument('--mode', choices=('vertical', 'grid', 'mosaic'), default=None,
+                        help='拼接模式，默认 vertical（mosaic 为蛇形横向+纵向滚动的二维拼接）')
+    parser.add_argument('--hscroll-step', type=int, default=None,
+                        help='mosaic 模式每次横向滚动的距离，默认为区域宽度')
+    parser.add_argument('--delay', type=float, default=0.5, help='滚动后的等待时间（秒）')
+    parser.add_argument('--fixed-delay', action='store_true', help='滚动后固定等待 --delay，不检测内容是否稳定')
+    parser.add_argument('--settle-timeout', type=float, default=1.0, help='等待内容稳定的最长时间（秒）')
+    parser.add_argument('--max-no-change', type=int, default=3, help='连续多少帧没有变化时认为到底')
+    parser.add_argument('--threshold', type=float, default=0.90, help='判定为没有变化的相似度阈值')
+    parser.add_argument('--max-frames', type=int, default=None, help='最多保存的帧数')
+    parser.add_argument('--timeout', type=float, default=None, help='最长录制时间（秒）')
+    parser.add_argument('--start-delay', type=float, default=0.0, help='开始前等待的时间（秒），用于切换到目标窗口')
+    parser.add_argument('--backend', choices=['auto'] + list(CAPTURE_BACKENDS), default='auto', help='截图后端')
+    parser.add_argument('--preset', choices=list(EXPORT_PRESETS), default='fast', help='导出预设')
+    parser.add_argument('--no-move', action='store_true', help='不把鼠标移到区域中心（滚轮作用于鼠标所在窗口）')
+    parser.add_argument('--report', default=None, help='写出性能报告（.json 或 .csv）')
+    parser.add_argument('--journal', default=None, metavar='DIR',
+                        help='把录制的帧写入 DIR 下新建的会话，之后可继续录制或重新拼接')
+    parser.add_argument('--resume', default=None, metavar='SESSION',
+                        help='继续录制该会话：恢复已有的帧，新帧追加到该会话')
+    parser.add_argument('--restitch', default=None, metavar='SESSION',
+                        help='不截图，用该会话中的帧按 --mode 重新拼接（未指定 --mode 时沿用录制时的模式）')
+    return parser
+
+
+def run_cli(argv):
+    """
+    命令行截图入口
+    :return: 进程退出码（0 成功，1 没有截到内容或保存失败）
+    """
+    parser = build_cli_parser()
+    args = parser.parse_args(argv)
+    if args.restitch is not None:
+        return run_restitch(args)
+    if args.region is None:
+        parser.error('需要 --region')
+    x, y, width, height = args.region
+    if width <= 0 or height <= 0:
+        print("[命令行] 区域宽高必须大于 0")
+        return 1
+
+    capture = HeadlessCapture(
+        (x, y, width, height),
+        scroll_step=args.scroll_step,
+        hscroll_step=args.hscroll_step,
+        stitch_mode=args.mode or 'vertical',
+        scroll_delay=args.delay,
+        adaptive_settle=not args.fixed_delay,
+        settle_timeout=args.settle_timeout,
+        max_no_change=args.max_no_change,
+        threshold=args.threshold,
+        max_frames=args.max_frames,
+        timeout=args.timeout,
+        backend=args.backend,
+        preset=args.preset,
+        profile=args.report is not None,
+        journal_dir=args.journal,
+        resume=args.resume
+    )
+    try:
+        if args.start_delay > 0:
+            time.sleep(args.start_delay)
+        if capture.scroll_step and not args.no_move:
+            # 滚轮作用于鼠标所在的窗口
+            pyautogui.moveTo(x + width // 2, y + height // 2)
+
+        if capture.run() is None:
+            print("[命令行] 没有截取到任何图片")
+            return 1
+
+        output = args.output.replace('{time}', datetime.now().strftime('%Y%m%d_%H%M%S'))
+        capture.save(output)
+        print(f"[命令行] 已保存: {output}")
+
+        if capture.profiler is not None:
+            capture.profiler.write_report(args.report)
+            print("[性能] " + "\n[性能] ".join(capture.profiler.summary_lines()))
+        return 0
+    except Exception as e:
+        print(f"[命令行] 失败: {e}")
+        return 1
+    finally:
+        capture.close()
+
+
+def run_restitch(args):
+    """命令行重新拼接会话（--restitch）"""
+    exporter = ImageExporter(args.preset)
+    canvas = None
+    try:
+        image, canvas, count = restitch_journal(args.restitch, args.mode)
+        if image is None:
+            print("[命令行] 会话中没有帧")
+            return 1
+        print(f"[命令行] {count} 帧重新拼接为 {image.width}x{image.height}")
+        output = args.output.replace('{time}', datetime.now().strftime('%Y%m%d_%H%M%S'))
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        exporter.set_source(canvas or image)
+        exporter.save(output, 'JPEG' if os.path.splitext(output)[1].lower() in ('.jpg', '.jpeg') else 'PNG')
+        print(f"[命令行] 已保存: {output}")
+        return 0
+    except Exception as e:
+        print(f"[命令行] 失败: {e}")
+        return 1
+    finally:
+        exporter.set_source(None)
+        if canvas is not None:
+            canvas.close()
+
+
+# ========================================
+# 性能基准测试（python 长截图.py --benchmark）
+# ========================================
+
+def _legacy_similarity(img1, img2):
+    """旧版到底检测的逐像素 Python 对比，仅用于基准测试对照"""
+    data1 = list(img1.get_flattened_data())
+    data2 = list(img2.get_flattened_data())
+    same_pixels = sum(1 for p1, p2 in zip(data1, data2) if p1 == p2)
+    return same_pixels / len(data1)
+
+
+def _legacy_stitch_grid(images, max_columns=2, gap=10, bg_color=(255, 255, 255)):
+    """旧版网格拼接（遍历列数、整图填充两次背景、假定尺寸相同），仅用于基准测试对照"""
+    num_images = len(images)
+    img_width = images[0].width
+    img_height = images[0].height
+
+    def calculate_aspect_ratio(cols):
+        rows = (num_images + cols - 1) // cols
+        return abs(img_width * cols / (img_height * rows) - 1.0)
+
+    columns = 2
+    if num_images > 2:
+        columns = min(range(2, max_columns + 1), key=calculate_aspect_ratio)
+    rows = (num_images + columns - 1) // columns
+
+    total_width = img_width * columns + gap * (columns + 1)
+    total_height = img_height * rows + gap * (rows + 1)
+    result = Image.new('RGB', (total_width, total_height), bg_color)
+    result.paste(bg_color, [0, 0, total_width, total_height])
+    for i, img in enumerate(images):
+        row, col = divmod(i, columns)
+        result.paste(img, (gap + col * (img_width + gap), gap + row * (img_height + gap)))
+    return result
+
+
+def _quiet(func, *args):
+    """执行 func 时丢弃其控制台输出（拼接、导出过程的日志不计入基准测试输出）"""
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            return func(*args)
+        finally:
+            sys.stdout = stdout
+
+
+def _time_per_call(func, rounds):
+    """执行 rounds 次，返回平均每次耗时（毫秒）和最后一次的返回值"""
+    result = None
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = func()
+    return (time.perf_counter() - start) * 1000 / rounds, result
+
+
+def benchmark_frame_compare(width=1920, height=1080, rounds=5):
+    """到底检测对比耗时：旧版逐像素对比 vs 向量化对比 vs 快速采样对比"""
+    print(f"[基准测试] 帧对比 {width}x{height}，每项 {rounds} 次")
+
+    # 构造两帧：第二帧是第一帧向上滚动 1/4 后的内容
+    frame1 = Image.frombytes('RGB', (width, height), os.urandom(width * height * 3))
+    frame2 = Image.new('RGB', (width, height))
+    frame2.paste(frame1.crop((0, height // 4, width, height)), (0, 0))
+
+    full = FrameComparator(fast_mode=False)
+    fast = FrameComparator(fast_mode=True)
+
+    cases = [
+        ("旧版逐像素", lambda: _legacy_similarity(frame1, frame2), max(1, rounds // 5)),
+        ("向量化", lambda: full.similarity(frame1, frame2), rounds),
+        ("快速采样", lambda: fast.similarity(frame1, frame2), rounds),
+    ]
+    results = {}
+    for name, func, count in cases:
+        elapsed, similarity = _time_per_call(func, count)
+        results[name] = elapsed
+        print(f"  {name:<8} {elapsed:9.2f} ms/帧  相似度 {similarity:.3f}")
+    return results
+
+
+def benchmark_grid_stitch(width=1280, height=720, frames=36, rounds=3):
+    """网格拼接耗时：旧版实现 vs GridCompositor（内存画布、磁盘分块画布、尺寸不同的帧）"""
+    print(f"[基准测试] 网格拼接 {frames} 帧 {width}x{height}，每项 {rounds} 次")
+    images = [Image.frombytes('RGB', (width, height), os.urandom(width * height * 3)) for _ in range(frames)]
+    mixed = [img.crop((0, 0, width - (i % 4) * 97, height - (i % 3) * 131)) for i, img in enumerate(images)]
+
+    def compose(frame_list, memory_limit):
+        compositor = GridCompositor(6, 20, memory_limit=memory_limit)
+        result = compositor.compose(frame_list)
+        if compositor.canvas is not None:
+            compositor.canvas.close()
+        return result.size
+
+    cases = [
+        ("旧版", lambda: _legacy_stitch_grid(images, 6, 20).size),
+        ("内存画布", lambda: compose(images, None)),
+        ("磁盘画布", lambda: compose(images, 0)),
+        ("尺寸混合", lambda: compose(mixed, None)),
+    ]
+    results = {}
+    for name, func in cases:
+        elapsed, size = _quiet(_time_per_call, func, rounds)
+        results[name] = elapsed
+        print(f"  {name:<8} {elapsed:9.1f} ms  {size[0]}x{size[1]}")
+    return results
+
+
+def benchmark_capture_backends(region=(0, 0, 800, 600), frames=30):
+    """各截图后端的截图帧率（需要图形界面环境）"""
+    print(f"[基准测试] 截图后端，区域 {region}，每个后端 {frames} 帧")
+    results = {}
+    for name, backend_class in CAPTURE_BACKENDS.items():
+        try:
+            backend = backend_class()
+        except Exception as e:
+            print(f"  {name:<10} 不可用: {e}")
+            continue
+        try:
+            backend.grab(region)  # 预热，建立会话
+            elapsed, _ = _time_per_call(lambda: backend.grab(region), frames)
+            results[name] = 1000 / elapsed
+            print(f"  {name:<10} {elapsed:8.2f} ms/帧  {1000 / elapsed:7.1f} FPS")
+        except Exception as e:
+            print(f"  {name:<10} 截图失败: {e}")
+        finally:
+            backend.close()
+    return results
+
+
+def make_synthetic_page(width, height, seed=0, images=True):
+    """
+    生成合成长页面：随机文本行、段落间空白，可选穿插图片块（渐变 + 噪点）
+    同一个 seed 生成的页面完全相同
+    """
+    from PIL import ImageDraw
+
+    rng = random.Random(seed)
+    page = Image.new('RGB', (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(page)
+    letters = 'abcdefghijklmnopqrstuvwxyz      '
+    y = 10
+    while y < height:
+        if images and rng.random() < 0.08:
+            # 图片块：横向渐变叠加噪点，类似照片，压缩率低
+            block_width = rng.randint(width // 3, width - 40)
+            block_height = rng.randint(80, 260)
+            gradient = Image.linear_gradient('L').resize((block_width, block_height))
+            noise = Image.effect_noise((block_width, block_height), 30)
+            block = Image.merge('RGB', (gradient, noise, gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+            page.paste(block, (rng.randint(10, width - block_width - 10), y))
+            y += block_height + 16
+        elif rng.random() < 0.1:
+            y += rng.randint(20, 60)  # 段落间空白
+        else:
+            text = ''.join(rng.choice(letters) for _ in range(rng.randint(10, width // 7)))
+            color = (rng.randint(0, 90), rng.randint(0, 90), rng.randint(0, 150))
+            draw.text((rng.randint(8, 40), y), text, fill=color)
+            y += 18
+    return page
+
+
+class SyntheticCaptureBackend(CaptureBackend):
+    """
+    合成截图后端 - 在合成长页面上模拟滚动和截图，不需要屏幕
+    选区的 x 为页面内的横向偏移；可加固定表头/底栏，滚动距离可在范围内随机变化；页面比选区宽时可横向滚动
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, page, header=None, footer=None, step_range=None, seed=0):
+        """
+        :param page: 合成长页面（可滚动的内容）
+        :param header: 固定在选区顶部的图片
+        :param footer: 固定在选区底部的图片
+        :param step_range: (最小, 最大) 每次滚动的实际距离；None 时按请求的距离滚动
+        """
+        self.page = page
+        self.header = header
+        self.footer = footer
+        self.step_range = step_range
+        self.position = 0
+        self.position_x = 0
+        self._rng = random.Random(seed)
+        self._view_height = None
+        self._view_width = None
+
+    def _band_heights(self):
+        return (self.header.height if self.header else 0), (self.footer.height if self.footer else 0)
+
+    def grab(self, region):
+        x, _, width, height = region
+        header_height, footer_height = self._band_heights()
+        self._view_height = height - header_height - footer_height
+        self._view_width = width
+        frame = Image.new('RGB', (width, height))
+        if self.header:
+            frame.paste(self.header.crop((0, 0, width, header_height)), (0, 0))
+        left = x + self.position_x
+        frame.paste(self.page.crop((left, self.position, left + width, self.position + self._view_height)),
+                    (0, header_height))
+        if self.footer:
+            frame.paste(self.footer.crop((0, 0, width, footer_height)), (0, height - footer_height))
+        return frame
+
+    def scroll(self, step):
+        """滚动页面，到底后不再移动"""
+        if self.step_range is not None:
+            step = self._rng.randint(*self.step_range)
+        limit = self.page.height - (self._view_height or 0)
+        self.position = max(0, min(self.position + step, limit))
+
+    def hscroll(self, step):
+        """横向滚动页面（正值向右），到边后不再移动"""
+        if self.step_range is not None:
+            step = self._rng.randint(*self.step_range) * (1 if step > 0 else -1)
+        limit = self.page.width - (self._view_width or 0)
+        self.position_x = max(0, min(self.position_x + step, limit))
+
+    def reference(self, width):
+        """完整截图的期望结果：表头 + 整个页面 + 底栏"""
+        header_height, footer_height = self._band_heights()
+        result = Image.new('RGB', (width, header_height + self.page.height + footer_height))
+        if self.header:
+            result.paste(self.header.crop((0, 0, width, header_height)), (0, 0))
+        result.paste(self.page.crop((0, 0, width, self.page.height)), (0, header_height))
+        if self.footer:
+            result.paste(self.footer.crop((0, 0, width, footer_height)), (0, result.height - footer_height))
+        return result
+
+
+def _synthetic_bar(width, height, color, text):
+    """合成页面的固定表头/底栏"""
+    from PIL import ImageDraw
+
+    bar = Image.new('RGB', (width, height), color)
+    ImageDraw.Draw(bar).text((12, height // 2 - 6), text, fill=(255, 255, 255))
+    return bar
+
+
+def _process_memory_mb(field):
+    """读取 /proc/self/status 中的内存字段（MB），非 Linux 时返回 None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_memory():
+    """
+    重置进程的峰值内存统计（Linux 写 /proc/self/clear_refs）
+    :return: 重置时的常驻内存（MB），作为之后峰值的基准；无法重置时返回 None
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        return None
+    return _process_memory_mb('VmRSS')
+
+
+def _peak_memory_mb(baseline):
+    """自 _reset_peak_memory 以来峰值常驻内存比基准多出的 MB，无法获取时返回 None"""
+    peak = _process_memory_mb('VmHWM')
+    if peak is None or baseline is None:
+        return None
+    return peak - baseline
+
+
+def _run_synthetic_capture(name, backend, width, view_height, step, stitch_mode='vertical'):
+    """跑一次合成场景的完整截图流程并打印一行结果（单独成函数，结束后帧和结果即可释放）"""
+    mosaic = stitch_mode == 'mosaic'
+    reference = backend.reference(backend.page.width if mosaic else width)
+    capture = HeadlessCapture((0, 0, width, view_height), scroll_step=step, scroll_delay=0,
+                              adaptive_settle=False, backend=backend, scroll=backend.scroll,
+                              stitch_mode=stitch_mode, hscroll=backend.hscroll,
+                              hscroll_step=width * 3 // 5)
+    try:
+        baseline = _reset_peak_memory()
+        start = time.perf_counter()
+        image = _quiet(capture.run)
+        elapsed = time.perf_counter() - start
+        encode_ms, data = _quiet(_time_per_call, lambda: capture.exporter.encode('PNG'), 1)
+        peak = _peak_memory_mb(baseline)
+
+        stitched_ok = image is not None and image.convert('RGB').tobytes() == reference.tobytes()
+        decoded = Image.open(io.BytesIO(data))
+        saved_ok = decoded.size == reference.size and decoded.convert('RGB').tobytes() == reference.tobytes()
+        frames = capture.stored
+        dropped = capture.pipeline.duplicate_count
+        throughput = reference.width * reference.height * 3 / 1024 / 1024 / elapsed
+        status = "正确" if stitched_ok and saved_ok else f"错误（拼接 {stitched_ok}，保存 {saved_ok}）"
+        peak_text = f"{peak:.0f}MB" if peak is not None else "-"
+        print(f"  {name:<8} {frames:>4} {dropped:>4} {frames / elapsed:>7.1f} {throughput:>9.1f} "
+              f"{encode_ms:>6.0f}ms {peak_text:>8}  {status}")
+        return dict(frames=frames, dropped=dropped, fps=frames / elapsed, mb_per_s=throughput,
+                    encode_ms=encode_ms, peak_mb=peak, correct=stitched_ok and saved_ok)
+    finally:
+        capture.close()
+
+
+def benchmark_synthetic(width=1000, page_height=12000, view_height=700, seed=7):
+    """
+    合成页面基准测试（不需要屏幕）：
+    1. 各场景（文本、图文、固定表头、可变步长、二维蛇形）经合成后端跑完整的截图 → 去重/到底检测 → 拼接 → 导出流程，
+       统计吞吐量、峰值内存（相对开始前的增量），并与期望结果逐像素比较
+    2. 用同一组帧分别测试 is_scroll_to_bottom、stitch_simple、stitch_grid 和保存
+    """
+    print(f"[基准测试] 合成页面 {width}x{page_height}，选区高度 {view_height}")
+    step = view_height * 3 // 5
+    header = _synthetic_bar(width, 64, (40, 60, 140), "SYNTHETIC HEADER  File  Edit  View")
+    footer = _synthetic_bar(width, 40, (90, 90, 90), "status: ready")
+    scenarios = [
+        ("文本", (width, page_height), dict(images=False), {}, 'vertical'),
+        ("图文", (width, page_height), dict(images=True), {}, 'vertical'),
+        ("固定表头", (width, page_height), dict(images=True), dict(header=header, footer=footer), 'vertical'),
+        ("可变步长", (width, page_height), dict(images=True),
+         dict(step_range=(view_height // 5, view_height * 4 // 5)), 'vertical'),
+        # 宽页面：横向约 2.5 屏，蛇形滚动后按重叠拼成整页
+        ("二维蛇形", (width * 5 // 2, page_height // 3), dict(images=True), {}, 'mosaic'),
+    ]
+
+    results = {}
+    print(f"  {'场景':<8} {'帧数':>4} {'丢弃':>4} {'帧/秒':>7} {'拼接MB/s':>9} {'PNG编码':>8} {'峰值增量':>8}  结果")
+    for name, page_size, page_options, backend_options, stitch_mode in scenarios:
+        page = make_synthetic_page(*page_size, seed, **page_options)
+        backend = SyntheticCaptureBackend(page, seed=seed, **backend_options)
+        results[name] = _run_synthetic_capture(name, backend, width, view_height, step, stitch_mode)
+        del page, backend
+
+    # 固定步长等于选区高度的一组帧：stitch_simple 的前提
+    page_height -= page_height % view_height
+    page = make_synthetic_page(width, page_height, seed)
+    backend = SyntheticCaptureBackend(page)
+    frames = []
+    for _ in range(page_height // view_height):
+        frames.append(backend.grab((0, 0, width, view_height)))
+        backend.scroll(view_height)
+    duplicate = backend.grab((0, 0, width, view_height))
+
+    # 到底检测：滚动过的相邻帧都不应判为相同，重复帧应判为相同
+    probe = type('BottomProbe', (), {'stitcher': None, 'frame_comparator': FrameComparator()})()
+    fingerprints = [FrameFingerprint(frame) for frame in frames]
+    cases = [
+        ("到底检测(像素)", frames, duplicate),
+        ("到底检测(指纹)", fingerprints, FrameFingerprint(duplicate)),
+    ]
+    for name, frame_list, last in cases:
+        pairs = list(zip(frame_list, frame_list[1:]))
+        start = time.perf_counter()
+        false_bottom = sum(1 for a, b in pairs if _quiet(AutoScrollScreenshotTool.is_scroll_to_bottom, probe, a, b))
+        per_pair = (time.perf_counter() - start) * 1000 / len(pairs)
+        detected = _quiet(AutoScrollScreenshotTool.is_scroll_to_bottom, probe, frame_list[-1], last)
+        ok = false_bottom == 0 and detected
+        print(f"  {name:<12} {per_pair:8.2f} ms/对  误判到底 {false_bottom}/{len(pairs)}  "
+              f"识别重复帧 {'是' if detected else '否'}  {'正确' if ok else '错误'}")
+        results[name] = dict(ms_per_pair=per_pair, false_bottom=false_bottom, correct=ok)
+
+    elapsed, image = _quiet(_time_per_call, lambda: AutoScrollScreenshotTool.stitch_simple(frames), 1)
+    ok = image.tobytes() == page.tobytes()
+    print(f"  {'stitch_simple':<12} {elapsed:8.1f} ms  {image.width}x{image.height}  {'正确' if ok else '错误'}")
+    results['stitch_simple'] = dict(ms=elapsed, correct=ok)
+
+    elapsed, image = _quiet(_time_per_call, lambda: AutoScrollScreenshotTool.stitch_grid(frames, 6, 20), 1)
+    compositor = GridCompositor(6, 20)
+    columns, lefts, tops = compositor.layout([frame.size for frame in frames])[:3]
+    expected = Image.new('RGB', image.size, (255, 255, 255))
+    for index, frame in enumerate(frames):
+        expected.paste(frame, (lefts[index % columns], tops[index // columns]))
+    ok = image.tobytes() == expected.tobytes()
+    print(f"  {'stitch_grid':<12} {elapsed:8.1f} ms  {image.width}x{image.height}  {'正确' if ok else '错误'}")
+    results['stitch_grid'] = dict(ms=elapsed, correct=ok)
+
+    # 保存：各导出预设的 PNG 和 JPEG
+    size_mb = page.width * page.height * 3 / 1024 / 1024
+    for preset in EXPORT_PRESETS:
+        exporter = ImageExporter(preset)
+        exporter.set_source(page)
+        for format in ('PNG', 'JPEG'):
+            elapsed, data = _quiet(_time_per_call, lambda: exporter.encode(format), 1)
+            line = f"  保存 {format:<4} ({preset:<8}) {elapsed:8.1f} ms  {size_mb / elapsed * 1000:7.1f} MB/s  " \
+                   f"{len(data) / 1024 / 1024:6.2f}MB"
+            if format == 'PNG':
+                ok = Image.open(io.BytesIO(data)).tobytes() == page.tobytes()
+                line += f"  {'正确' if ok else '错误'}"
+            print(line)
+            results[f'save_{format}_{preset}'] = elapsed
+
+    # 剪贴板：CF_DIB 由像素直接转换，不经过 PNG 编码；加上 BMP 文件头后应能解码出原图
+    exporter = ImageExporter()
+    exporter.set_source(page)
+    elapsed, dib = _quiet(_time_per_call, exporter.dib, 1)
+    bmp = b'BM' + struct.pack('<IHHI', 14 + len(dib), 0, 0, 14 + ImageExporter.DIB_HEADER.size) + dib
+    ok = Image.open(io.BytesIO(bmp)).convert('RGB').tobytes() == page.tobytes()
+    cached_ms = _time_per_call(exporter.dib, 3)[0]
+    print(f"  剪贴板 DIB       {elapsed:8.1f} ms  {size_mb / elapsed * 1000:7.1f} MB/s  "
+          f"再次复制 {cached_ms:.3f} ms  {'正确' if ok else '错误'}")
+    results['clipboard_dib'] = dict(ms=elapsed, cached_ms=cached_ms, correct=ok)
+    return results
+
+
+_STARTUP_PROBE = """
+import importlib.util, json, os, sys, time
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location('longshot_probe', sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+module.LanguageManager(os.path.join(sys.argv[2], 'language_config.json'))
+module.HotkeyManager(os.path.join(sys.argv[2], 'hotkey_config.json'))
+configured = time.perf_counter()
+eager = [name for name in module.LAZY_MODULES if name in sys.modules]
+deferred = {}
+for name in module.LAZY_MODULES:
+    if name in sys.modules:
+        continue
+    begin = time.perf_counter()
+    try:
+        importlib.import_module(name)
+        deferred[name] = (time.perf_counter() - begin) * 1000
+    except Exception:
+        deferred[name] = None
+print(json.dumps({'import_ms': (imported - start) * 1000, 'config_ms': (configured - imported) * 1000,
+                  'eager': eager, 'deferred': deferred}))
+"""
+
+# 启动耗时预算（毫秒）：模块导入 + 读取配置超过该值时视为启动回归
+STARTUP_BUDGET_MS = 500
+
+
+def benchmark_startup(rounds=3):
+    """
+    启动耗时：在独立进程里导入本模块并创建配置管理器（不创建窗口），
+    检查延迟导入的模块没有被提前导入，并列出推迟到首次使用时的导入耗时
+    """
+    import subprocess
+
+    print(f"[基准测试] 启动耗时，{rounds} 次取最小值")
+    samples = []
+    # 配置写到临时目录，第一次生成配置，之后几次读取已有配置
+    with tempfile.TemporaryDirectory(prefix='longshot_startup_') as config_dir:
+        for _ in range(rounds):
+            output = subprocess.run(
+                [sys.executable, '-c', _STARTUP_PROBE, os.path.abspath(__file__), config_dir],
+                capture_output=True, text=True, encoding='utf-8', check=True
+            ).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    best = min(samples, key=lambda sample: sample['import_ms'] + sample['config_ms'])
+    total = best['import_ms'] + best['config_ms']
+    print(f"  模块导入  {best['import_ms']:8.1f} ms")
+    print(f"  读取配置  {best['config_ms']:8.1f} ms")
+    for name, elapsed in best['deferred'].items():
+        text = "未安装" if elapsed is None else f"{elapsed:8.1f} ms"
+        print(f"  延迟导入 {name:<12} {text}")
+
+    if best['eager']:
+        print(f"  [警告] 以下模块在启动时被提前导入: {', '.join(best['eager'])}")
+    if total > STARTUP_BUDGET_MS:
+        print(f"  [警告] 启动耗时 {total:.1f} ms 超过预算 {STARTUP_BUDGET_MS} ms")
+    return best
+
+
+BENCHMARKS = {
+    'startup': benchmark_startup,
+    'compare': benchmark_frame_compare,
+    'grid': benchmark_grid_stitch,
+    'synthetic': benchmark_synthetic,
+    'backends': benchmark_capture_backends,
+}
+
+
+def run_benchmarks(names=None):
+    """运行基准测试（names 为空时运行全部，可选项见 BENCHMARKS）"""
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            print(f"[基准测试] 未知项目 {name}，可选: {', '.join(BENCHMARKS)}")
+            continue
+        BENCHMARKS[name]()
+
+
 def main():
     """主函数"""
+    if '--benchmark' in sys.argv[1:]:
+        # python 长截图.py --benchmark [startup compare grid synthetic backends]
+        names = sys.argv[sys.argv.index('--benchmark') + 1:]
+        run_benchmarks(names)
+        return
+    if sys.argv[1:2] == ['capture']:
+        # 无界面截图：python 长截图.py capture --region X Y W H -o out.png
+        sys.exit(run_cli(sys.argv[2:]))
+
     root = tk.Tk()
     app = AutoScrollScreenshotTool(root)
     root.mainloop()